@@ -1,18 +1,23 @@
-import csv
-import plotly.express as px
-import plotly.graph_objects as go
-from scipy import interpolate
-import glob, os
+import sys
+import numpy as np
+import os
 import math
+if __name__ == "__main__":
+    # run as a script, the modules of helix_framework are imported as top level modules like inside helix_framework
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "helix_framework"))
+from trajectory_store import read_folder, resample
+from trajectory_animation import MAX_FRAMES, TRACE_TOLERANCE, build_animation
 
 def multi_visualizer (**Input): 
     """
     Draws the path of drones based on the file and animates them in Cartesian coordinate
     Arguments:
-        csv_folder: directory of the folder containing all the csv files created by functions visualize_ulg and visualize_path_following
+        folder_of_input_csvs: directory of the folder containing all the trajectory (npz) or csv files created by functions visualize_ulg and visualize_path_following
         drone_size: size of drones in visualization
         ticks_num: number of ticks for each cartesian axis
-        frame_duration: duratin of each frame of animation (second)
+        frame_duration: duratin of each frame of animation (second), by default the time between the frames
+        max_frames: the samples are decimated to at most this number of frames of animation
+        trace_tolerance: distance in meters for simplifying the traces of drones, 0 to draw all samples
         dt:time step (used for interpolation)
         cubic_space: if True, the whole sapce will be a cube
 
@@ -24,6 +29,8 @@ def multi_visualizer (**Input):
     drone_size=10
     Ticks_num=10
     frame_duration=None
+    max_frames=MAX_FRAMES
+    trace_tolerance=TRACE_TOLERANCE
     cubic_space=True
     for key, value in Input.items():
         if key=="folder_of_input_csvs":
@@ -36,87 +43,43 @@ def multi_visualizer (**Input):
             dt=value
         elif key=='frame_duration':
             frame_duration=value
+        elif key=='max_frames':
+            max_frames=value
+        elif key=='trace_tolerance':
+            trace_tolerance=value
         elif key=='cubic_space':
             cubic_space=value
 
     if folder_of_input_csvs==None:
         print('Error: A directory to folder of containing csv files should be provided')
         return 0
-    def index_checker(input_index, length) -> int:
-        if input_index >= length:
-            return int(input_index % length)
-        return input_index
     x_max=-1*math.inf  #for figure range
     x_min=math.inf     #for figure range  
-    X_total=[]         #total interpolated x
 
     y_max=-1*math.inf  #for figure range
     y_min=math.inf     #for figure range
-    Y_total=[]         #total interpolated y
 
     z_max=-1*math.inf  #for figure range
     z_min=0            #for figure range
-    Z_total=[]         #total interpolated z
     
-    Time_total=[]      #Time span of interpolation used for figure
-    labels_total=[]
-    interp_length=0
     
-    all_drones={}
-    # opening csv files ----------------------
-    os.chdir(folder_of_input_csvs)
-    for csv_file in glob.glob("*.csv"):
-        # Getting data from gps csv file from a csv file ------
-        opened_csv_file=open(folder_of_input_csvs+"/"+csv_file, newline="")
-        Object_of_dictionaries=csv.DictReader(opened_csv_file, delimiter=",")
-        for row_dict in Object_of_dictionaries: # we should create the lists when the file is still open
-            drone_id=row_dict["drone id"]
-            if drone_id not in all_drones:
-                all_drones[drone_id]=[[],[],[],[],[]] # x, y, z, timestamp, type of experiment
-            
-            all_drones[drone_id][0].append(float(row_dict["x(m)"]))
-            x_max=max(x_max, float(row_dict["x(m)"]))
-            x_min=min(x_min, float(row_dict["x(m)"]))
-
-            all_drones[drone_id][1].append(float(row_dict["y(m)"]))
-            y_max=max(y_max, float(row_dict["y(m)"]))
-            y_min=min(y_min, float(row_dict["y(m)"]))
-
-
-            all_drones[drone_id][2].append(float(row_dict["z(m)"]))
-            z_max=max(z_max, float(row_dict["z(m)"]))
-            z_min=min(z_min, float(row_dict["z(m)"]))
-
-            all_drones[drone_id][3].append(float(row_dict["time(s)"]))
-            all_drones[drone_id][4].append(str(row_dict["type of experiment"]))
-        
-        opened_csv_file.close()
+    # opening trajectory files (npz files of trajectory_store.py and csv files) ----------------------
+    trajectories=read_folder(folder_of_input_csvs)
+    drones=[] # to know the order of the drones in interpolation
+    for trajectory in trajectories:
+        # the same drone can be in several files, e.g. a simulation and a real flight
+        drones.append(trajectory.drone_id+' ('+trajectory.experiment_type+')')
+        x_max=max(x_max, trajectory.position[:,0].max())
+        x_min=min(x_min, trajectory.position[:,0].min())
+        y_max=max(y_max, trajectory.position[:,1].max())
+        y_min=min(y_min, trajectory.position[:,1].min())
+        z_max=max(z_max, trajectory.position[:,2].max())
+        z_min=min(z_min, trajectory.position[:,2].min())
 
     # End of opening csv files  --------------------- 
-    #interpolation
-    min_finish_time=math.inf
-    max_start_time=-1*math.inf
-    for drone_id in all_drones:
-        min_finish_time=min(min_finish_time, max(all_drones[drone_id][3]))
-        max_start_time=max(max_start_time, min(all_drones[drone_id][3]))
-        all_drones[drone_id].append(interpolate.interp1d(all_drones[drone_id][3],all_drones[drone_id][0])) # interpolation of time and x position at all_drones[drone_id][5]
-        all_drones[drone_id].append(interpolate.interp1d(all_drones[drone_id][3],all_drones[drone_id][1])) # interpolation of time and y position at all_drones[drone_id][6]
-        all_drones[drone_id].append(interpolate.interp1d(all_drones[drone_id][3],all_drones[drone_id][2])) # interpolation of time and z position at all_drones[drone_id][7]
-    
+    #interpolation of all drones on the same time steps, from the latest start to the earliest finish
+    interp_time, positions=resample(trajectories, dt)
     fig_colors=['red','lightgreen', 'blue', 'orange','aqua', 'silver', 'magenta', 'darkkhaki','dodgerblue','green','black','brown']
-    drones=[] # to know the order of the drones in interpolation
-    for drone_id in all_drones:
-        t=max_start_time
-        drones.append(drone_id)
-        interp_length=0
-        while(t<=min_finish_time):
-            X_total.append(float(all_drones[drone_id][5](t))) # using x interpolation for drone
-            Y_total.append(float(all_drones[drone_id][6](t))) # using y interpolation for drone
-            Z_total.append(float(all_drones[drone_id][7](t))) # using z interpolation for drone
-            Time_total.append(t)
-            labels_total.append(drone_id+' ('+all_drones[drone_id][4][0]+')')
-            t+=dt
-            interp_length+=1
 
 
     x_range=x_max-x_min
@@ -152,27 +115,7 @@ def multi_visualizer (**Input):
         z_max=z_min + max_range
         z_range=max_range
     
-    SIZE=int(drone_size)
-    size=[SIZE for k in range(len(X_total))]
-    fig= px.scatter_3d(x=X_total, range_x=[x_right_margin,x_left_margin], y=Y_total, range_y=[y_up_margin,y_down_margin], z=Z_total, range_z=[z_down_margin,z_up_margin], animation_frame=Time_total, opacity=1, size=size, color=labels_total, size_max=max(size),color_discrete_sequence=fig_colors)
-    
-    #Adding lines to the figure
-    for j in range(len(drones)):
-        fig.add_trace(            #should be an object of go
-            go.Scatter3d(
-                x=X_total[j*interp_length: ((j+1)*interp_length)], 
-                y=Y_total[j*interp_length: ((j+1)*interp_length)],
-                z=Z_total[j*interp_length: ((j+1)*interp_length)], 
-                mode='lines',
-                name="trace of "+ drones[j],
-                marker=dict(color=fig_colors[index_checker(j,len(fig_colors))])
-        )
-    )
-    if frame_duration==None:
-        frame_duration=dt # in seconds
-    
-    fig.layout.updatemenus[0].buttons[0].args[1]['frame']['duration'] = frame_duration*1000 # in milliseconds
-    fig.layout.updatemenus[0].buttons[0].args[1]['transition']['duration'] = 1 # in milliseconds
+    fig=build_animation(interp_time, positions, drones, fig_colors, drone_size=int(drone_size), frame_duration=frame_duration, max_frames=max_frames, tolerance=trace_tolerance)
     fig.update_layout(
         showlegend=True,
         legend=dict(itemsizing='constant',font=dict(family="Times New Roman",size=20), bgcolor="LightSteelBlue", bordercolor="Black", borderwidth=2),
@@ -0,0 +1,253 @@
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import sys
+import tempfile
+import numpy as np
+from ulog_loader import FlightLog
+from flight_segments import label_mode, mode_window
+if __name__ == "__main__":
+    # run as a script, the modules of helix_framework are imported as top level modules like inside helix_framework
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "helix_framework"))
+from geodetic import GeodeticConverter
+from trajectory_store import Trajectory, resample
+
+LOG_FIELDS = ["gps_timestamp", "time", "latitude", "longitude", "altitude", "offboard_timestamp", "offboard_mode_status"]
+CACHE_VERSION = 1  # increased when extract_log changes, so the arrays of older versions are not used
+INDEX_FILE = "index.json"  # {ulog file path: [size, mtime in ns, hash]} in the cache folder
+SUMMARY_NAMES = [
+    "flight",  # folder of the ulog files relative to the campaign folder
+    "drones",  # number of ulog files
+    "start_time",  # Unix time of the first sample of the flight
+    "duration",  # seconds from the first to the last sample of all drones
+    "offboard_start",  # Unix time when the last drone entered offboard mode
+    "offboard_span",  # seconds all drones were in offboard mode together, nan if never
+    "max_speed",  # m/s, the largest speed of a drone between two samples
+    "max_speed_drone",
+    "min_distance",  # meters, the least distance between two drones while all were in offboard mode
+    "min_distance_drones",
+]
+
+
+def file_hash(file_path):
+    # sha256 of the content of a file, a renamed or moved log keeps its cache
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_tag():
+    # part of the names of the cache files, changes with CACHE_VERSION and LOG_FIELDS
+    return hashlib.sha256(json.dumps([CACHE_VERSION, LOG_FIELDS]).encode()).hexdigest()[:8]
+
+
+def log_hashes(ulog_file_paths, cache_folder):
+    """
+    Returns the hashes of ulog files, a file is only hashed again if its size or modification time
+    changed since it was hashed, see INDEX_FILE
+    """
+    index_file_path = os.path.join(cache_folder, INDEX_FILE)
+    try:
+        with open(index_file_path, "r") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+    hashes = []
+    changed = False
+    for ulog_file_path in ulog_file_paths:
+        stat = os.stat(ulog_file_path)
+        key = os.path.abspath(ulog_file_path)
+        entry = index.get(key)
+        if entry is None or entry[:2] != [stat.st_size, stat.st_mtime_ns]:
+            entry = index[key] = [stat.st_size, stat.st_mtime_ns, file_hash(ulog_file_path)]
+            changed = True
+        hashes.append(entry[2])
+    if changed:
+        write_atomic(index_file_path, lambda f: f.write(json.dumps(index).encode()))
+    return hashes
+
+
+def write_atomic(file_path, write):
+    # write(file object) writes a temporary file which is then renamed, so an interrupted process leaves no truncated file
+    (handle, temporary_file_path) = tempfile.mkstemp(dir=os.path.dirname(file_path), suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as f:
+            write(f)
+        os.replace(temporary_file_path, file_path)
+    except BaseException:
+        os.remove(temporary_file_path)
+        raise
+
+
+def extract_log(arguments):
+    """
+    Parses a ulog file in a worker process and saves its arrays to the cache
+    Arguments:
+        arguments: (ulog file path, cache file path or None)
+    Returns:
+        Dict{name in LOG_FIELDS: array}
+    """
+    (ulog_file_path, cache_file_path) = arguments
+    flight = FlightLog(ulog_file_path)
+    arrays = {name: getattr(flight, name) for name in LOG_FIELDS[:-1]}
+    arrays["offboard_mode_status"] = label_mode(flight.gps_timestamp, flight.offboard_timestamp)
+    if cache_file_path is not None:
+        write_atomic(cache_file_path, lambda f: np.savez(f, **arrays))  # a file object, so np.savez does not append .npz to the name
+    return arrays
+
+
+def load_logs(ulog_file_paths, cache_folder=None, processes=None):
+    """
+    Reads the arrays of ulog files, from the cache for the files parsed before (keyed by the hash of
+    their content and cache_tag) and by parsing the others on a pool of processes.
+    Arguments:
+        cache_folder: folder of the cached arrays, nothing is cached if None
+        processes: number of processes, the number of CPUs if None
+    Returns:
+        List[Dict{name in LOG_FIELDS: array}, ...] in the order of ulog_file_paths
+    """
+    output = [None] * len(ulog_file_paths)
+    tasks = []
+    missing = []
+    if cache_folder is not None:
+        os.makedirs(cache_folder, exist_ok=True)
+        hashes = log_hashes(ulog_file_paths, cache_folder)
+        tag = cache_tag()
+    for n, ulog_file_path in enumerate(ulog_file_paths):
+        cache_file_path = None
+        if cache_folder is not None:
+            cache_file_path = os.path.join(cache_folder, hashes[n] + "-" + tag + ".npz")
+            if os.path.exists(cache_file_path):
+                with np.load(cache_file_path) as data:
+                    output[n] = {name: data[name] for name in LOG_FIELDS}
+                continue
+        tasks.append((ulog_file_path, cache_file_path))
+        missing.append(n)
+    if len(tasks) == 1 or processes == 1:
+        results = [extract_log(task) for task in tasks]
+    elif tasks:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.map(extract_log, tasks)
+    else:
+        results = []
+    for n, arrays in zip(missing, results):
+        output[n] = arrays
+    return output
+
+
+def summarize_flight(drone_ids, logs, dt=0.1):
+    """
+    Arguments:
+        drone_ids: List[name of drone (string), ...]
+        logs: List[Dict{name in LOG_FIELDS: array}, ...] of the drones, see load_logs
+        dt: time step in seconds of the interpolation used for the distances between drones
+    Returns:
+        Dict{name in SUMMARY_NAMES except flight: value}
+    """
+    drone_ids = [drone_id for drone_id, log in zip(drone_ids, logs) if len(log["time"]) > 0]
+    logs = [log for log in logs if len(log["time"]) > 0]
+    summary = {"drones": len(logs)}
+    if not logs:
+        return {**{name: math.nan for name in SUMMARY_NAMES[1:]}, **summary}
+    start_time = min(log["time"].min() for log in logs)
+    summary["start_time"] = start_time
+    summary["duration"] = max(log["time"].max() for log in logs) - start_time
+
+    # the geodetic origin is the least latitude, longitude and altitude as in visualize_ulg
+    geodetic_converter = GeodeticConverter(
+        min(log["latitude"].min() for log in logs),
+        min(log["longitude"].min() for log in logs),
+        min(log["altitude"].min() for log in logs),
+    )
+    trajectories = []
+    summary["max_speed"] = 0.0
+    summary["max_speed_drone"] = ""
+    for drone_id, log in zip(drone_ids, logs):
+        order = np.argsort(log["time"], kind="stable")
+        time = log["time"][order]
+        (north, east, down) = geodetic_converter.geodetic2ned(log["latitude"][order], log["longitude"][order], log["altitude"][order])
+        position = np.column_stack([north, east, -down])  # z is up, see Trajectory
+        trajectories.append(Trajectory(drone_id, time, position, log["offboard_mode_status"][order]))
+        steps = np.diff(time)
+        moving = steps > 0  # repeated timestamps have no speed
+        if np.any(moving):
+            speed = (np.linalg.norm(np.diff(position, axis=0), axis=1)[moving] / steps[moving]).max()
+            if speed > summary["max_speed"]:
+                summary["max_speed"] = float(speed)
+                summary["max_speed_drone"] = drone_id
+
+    windows = [mode_window(trajectory.time, trajectory.offboard_mode_status) for trajectory in trajectories]
+    offboard_start = max(start for start, finish in windows)
+    offboard_finish = min(finish for start, finish in windows)
+    summary["offboard_start"] = offboard_start if offboard_start <= offboard_finish else math.nan
+    summary["offboard_span"] = offboard_finish - offboard_start if offboard_start <= offboard_finish else math.nan
+    summary["min_distance"] = math.nan
+    summary["min_distance_drones"] = ""
+    if len(trajectories) > 1 and offboard_start <= offboard_finish:
+        (time, position) = resample(trajectories, dt, offboard_start, offboard_finish)
+        (first, second) = np.triu_indices(len(trajectories), k=1)
+        distances = np.linalg.norm(position[:, first] - position[:, second], axis=2)  # (T, pairs)
+        (step, pair) = np.unravel_index(np.argmin(distances), distances.shape)
+        summary["min_distance"] = float(distances[step, pair])
+        summary["min_distance_drones"] = drone_ids[first[pair]] + " " + drone_ids[second[pair]]
+    return summary
+
+
+def process_campaign(campaign_folder, cache_folder=None, output_CSV_file_dir=None, dt=0.1, processes=None):
+    """
+    Summarizes all flights of a campaign, each folder of the campaign folder tree containing ulog files
+    is a flight of the drones of its files. Only the logs missing from the cache are parsed, so adding
+    one log to a campaign only parses that log.
+    Arguments:
+        cache_folder: folder of the cached arrays of the logs, by default .ulog_cache in the campaign folder
+        output_CSV_file_dir: path of the csv file of the summaries, not written if None
+        dt: time step in seconds of the interpolation used for the distances between drones
+        processes: number of processes parsing the logs, the number of CPUs if None
+    Returns:
+        List[Dict{name in SUMMARY_NAMES: value}, ...] of the flights sorted by folder
+    """
+    if cache_folder is None:
+        cache_folder = os.path.join(campaign_folder, ".ulog_cache")
+    ulog_file_paths = sorted(glob.glob(os.path.join(campaign_folder, "**", "*.ulg"), recursive=True))
+    logs = load_logs(ulog_file_paths, cache_folder, processes)
+
+    flights = {}
+    for ulog_file_path, log in zip(ulog_file_paths, logs):
+        flight = os.path.relpath(os.path.dirname(ulog_file_path), campaign_folder)
+        flights.setdefault(flight, []).append((os.path.basename(ulog_file_path).replace(".ulg", ""), log))
+    output = []
+    for flight, drones in flights.items():
+        summary = summarize_flight([drone_id for drone_id, log in drones], [log for drone_id, log in drones], dt)
+        output.append({"flight": flight, **summary})
+
+    if output_CSV_file_dir is not None:
+        with open(output_CSV_file_dir, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(SUMMARY_NAMES)
+            writer.writerows([[summary[name] for name in SUMMARY_NAMES] for summary in output])
+    return output
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarizes the flights of a folder tree of ulog files")
+    parser.add_argument("campaign_folder")
+    parser.add_argument("output_CSV_file_dir")
+    parser.add_argument("--cache_folder", default=None)
+    parser.add_argument("--dt", type=float, default=0.1)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    process_campaign(
+        args.campaign_folder,
+        cache_folder=args.cache_folder,
+        output_CSV_file_dir=args.output_CSV_file_dir,
+        dt=args.dt,
+        processes=args.processes,
+    )
@@ -0,0 +1,46 @@
+import math
+import numpy as np
+
+
+def label_mode(sample_timestamps, mode_timestamps, max_gap=None):
+    """
+    Finds the samples taken while a mode was active, from the timestamps of the messages the mode
+    publishes (e.g. offboard_control_mode). A sample is in the mode if it is between two consecutive
+    messages, found with binary searches instead of comparing every sample with every pair of messages.
+    Arguments:
+        sample_timestamps: (M,) timestamps of the samples (e.g. gps timestamps)
+        mode_timestamps: (K,) timestamps of the messages of the mode, with the same clock
+        max_gap: if given, two consecutive messages further apart than max_gap do not make an interval
+            (the mode was left between them)
+    Returns:
+        (M,) array of 1 for the samples in the mode and 0 for the others
+    """
+    samples = np.asarray(sample_timestamps, dtype="float64")
+    messages = np.asarray(mode_timestamps, dtype="float64")
+    starts = messages[:-1]
+    ends = messages[1:]
+    valid = starts <= ends
+    if max_gap is not None:
+        valid &= ends - starts <= max_gap
+    (starts, ends) = (starts[valid], ends[valid])
+    if len(starts) == 0:
+        return np.zeros(len(samples), dtype="int64")
+    order = np.argsort(starts, kind="stable")
+    starts = starts[order]
+    reach = np.maximum.accumulate(ends[order])  # the latest end of the intervals starting before each start
+    interval = np.searchsorted(starts, samples, side="right") - 1
+    inside = (interval >= 0) & (reach[np.maximum(interval, 0)] >= samples)
+    return inside.astype("int64")
+
+
+def mode_window(time, status):
+    """
+    Returns:
+        start, finish: the first and the last time of the samples with status 1,
+            inf and -inf if there is none
+    """
+    time = np.asarray(time, dtype="float64")
+    active = time[np.asarray(status) == 1]
+    if len(active) == 0:
+        return math.inf, -math.inf
+    return float(active.min()), float(active.max())
@@ -0,0 +1,73 @@
+import numpy as np
+from pyulog import ULog
+
+
+def load_topics(ulog_file_path, topics, start_time=None, end_time=None, multi_id=0):
+    """
+    Reads topics of a ulog file directly into NumPy arrays, parsing only the requested topics
+    Arguments:
+        ulog_file_path: path to the ulg file
+        topics: Dict{topic name (string): List[field name (string), ...] or None for all fields}
+        start_time, end_time: time window in seconds since turning on (timestamp field), None for no limit
+        multi_id: instance of the topics
+    Returns:
+        Dict{topic name: Dict{field name: array}}, timestamps stay in micro seconds. A topic which
+        is not in the log has empty arrays of its requested fields
+    """
+    ulog = ULog(ulog_file_path, message_name_filter_list=list(topics.keys()))
+    output = {name: None for name in topics}
+    for dataset in ulog.data_list:
+        if dataset.name not in topics or dataset.multi_id != multi_id:
+            continue
+        data = dataset.data
+        timestamp = data["timestamp"]
+        window = np.ones(len(timestamp), dtype=bool)
+        if start_time is not None:
+            window &= timestamp >= start_time * 1000000
+        if end_time is not None:
+            window &= timestamp <= end_time * 1000000
+        fields = topics[dataset.name] or list(data.keys())
+        output[dataset.name] = {field: data[field][window] for field in set(fields) | {"timestamp"}}
+    for name, fields in topics.items():
+        if output[name] is None:
+            output[name] = {field: np.zeros(0) for field in set(fields or []) | {"timestamp"}}
+    return output
+
+
+class FlightLog:
+    """
+    GPS positions and offboard mode messages of one ulog file
+        gps_timestamp: (M,) seconds since turning on (asynchronous)
+        time: (M,) Unix time in seconds (synchronized between drones), the same as gps_timestamp
+            for logs without time_utc_usec
+        latitude, longitude: (M,) in degrees
+        altitude: (M,) in meters, relative to sea level
+        offboard_timestamp: (K,) seconds since turning on of each offboard_control_mode message
+    """
+
+    def __init__(self, ulog_file_path, start_time=None, end_time=None):
+        data = load_topics(
+            ulog_file_path,
+            {"vehicle_gps_position": None, "offboard_control_mode": ["timestamp"]},
+            start_time=start_time,
+            end_time=end_time,
+        )
+        gps = data["vehicle_gps_position"]
+        self.gps_timestamp = gps["timestamp"] / 1000000
+        if "time_utc_usec" in gps:
+            self.time = gps["time_utc_usec"] / 1000000
+        else:
+            # the time since turning on is not synchronized between drones, but keeps the samples in order
+            print(ulog_file_path, "has no time_utc_usec, using the time since turning on")
+            self.time = self.gps_timestamp.copy()
+        if "lat" in gps:  # integer fields of older PX4 versions
+            self.latitude = gps["lat"] / 10000000
+            self.longitude = gps["lon"] / 10000000
+            self.altitude = gps["alt"] / 1000
+        elif "latitude_deg" in gps:
+            self.latitude = gps["latitude_deg"].astype("float64")
+            self.longitude = gps["longitude_deg"].astype("float64")
+            self.altitude = gps["altitude_msl_m"].astype("float64")
+        else:
+            self.latitude = self.longitude = self.altitude = np.zeros(0)
+        self.offboard_timestamp = data["offboard_control_mode"]["timestamp"] / 1000000
@@ -1,11 +1,16 @@
 import csv
-from pyulog.ulog2csv import convert_ulog2csv  # convert_ulog2csv is a function in ulog2csv file in pyulog package
-from pymap3d.ned import geodetic2ned
-import plotly.express as px
-import plotly.graph_objects as go
-from scipy import interpolate
+import sys
+from ulog_loader import FlightLog
+from flight_segments import label_mode, mode_window
+import numpy as np
 import glob, os
 import math
+if __name__ == "__main__":
+    # run as a script, the modules of helix_framework are imported as top level modules like inside helix_framework
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "helix_framework"))
+from geodetic import GeodeticConverter
+from trajectory_store import Trajectory, write_csv, write_trajectories
+from trajectory_animation import MAX_FRAMES, TRACE_TOLERANCE, build_animation
 
 def visualize_ulg (**Input):  # input keyword arguments: ref_lat, ref_long, ref_alt
     """
@@ -19,8 +24,12 @@ def visualize_ulg (**Input):  # input keyword arguments: ref_lat, ref_long, ref_
         ticks_num: number of ticks for each cartesian axis
         dt: time step of animation in seconds
         sitl_or_real: if its value is 'real', it means ulg is for a real experiment and if the value is 'sitl' it means ulg is for a sitl simulation (the default value is 'real'), 
-        frame_duration: duratin of each frame of animation (second)
+        frame_duration: duratin of each frame of animation (second), by default the time between the frames
+        max_frames: the samples are decimated to at most this number of frames of animation
+        trace_tolerance: distance in meters for simplifying the traces of drones, 0 to draw all samples
         cubic_space: if True, the whole sapce will be a cube
+        output_CSV_file_dir: the path to output CSV file containg position, drone id, time stamp, offboard mode status and type of experiment
+        output_trajectory_file_dir: the path to output npz file of trajectory_store.py containg the same data, read at once by multi_visualizer
 
         Note: if a user does not provide one arguments of ref_lat, ref_long and ref_alt, the function considers 
             a point with the least latitude, longitude and altitude as the reference point
@@ -33,10 +42,14 @@ def visualize_ulg (**Input):  # input keyword arguments: ref_lat, ref_long, ref_
     dt=None
     folder_of_ulg=None
     output_CSV_file_dir=None
+    output_trajectory_file_dir=None
     sitl_or_real='real'
     Drone_size=10
     Ticks_num=10
     frame_duration=None
+    max_frames=MAX_FRAMES
+    trace_tolerance=TRACE_TOLERANCE
+    cubic_space=True
     for key, value in Input.items():
         if key=="ref_lat":
             ref_lat=value
@@ -56,16 +69,22 @@ def visualize_ulg (**Input):  # input keyword arguments: ref_lat, ref_long, ref_
             sitl_or_real=value
         elif key=='output_CSV_file_dir':
             output_CSV_file_dir=value
+        elif key=='output_trajectory_file_dir':
+            output_trajectory_file_dir=value
         elif key=='frame_duration':
             frame_duration=value
+        elif key=='max_frames':
+            max_frames=value
+        elif key=='trace_tolerance':
+            trace_tolerance=value
         elif key=='cubic_space':
             cubic_space=value
         
     if folder_of_ulg==None:
         print('Error: A directory to folder of input ulg files should be provided')
         return 0
-    if output_CSV_file_dir== None:
-        print('Error: A directory to output CSV file should be provided')
+    if output_CSV_file_dir== None and output_trajectory_file_dir==None:
+        print('Error: A directory to output CSV file or trajectory file should be provided')
         return 0
     if (sitl_or_real!='real' and sitl_or_real!='sitl'):
         print('Error: argument sitl_or_real can just be real or sitl')
@@ -73,31 +92,19 @@ def visualize_ulg (**Input):  # input keyword arguments: ref_lat, ref_long, ref_
     x=[]
     x_max=-1*math.inf  #for figure range
     x_min=math.inf     #for figure range  
-    fx=[]              #x interpolation 
-    X_total=[]         #total interpolated x
 
     y=[]
     y_max=-1*math.inf  #for figure range
     y_min=math.inf     #for figure range
-    fy=[]              #y interpolation
-    Y_total=[]         #total interpolated y
 
     z=[]
     z_max=-1*math.inf  #for figure range
     z_min=0            #for figure range
-    fz=[]              #z interpolation
-    Z_total=[]         #total interpolated z
-    
-    Time_total=[]      #Time span of interpolation used for figure
-    interp_time=[]     #Time span of interpolation
 
     i=0 # i is the number of a file (drone)
-    interp_length=0
     latitude=[]
     longitude=[]
     altitude=[]
-    Color_total=[]
-    labels_total=[]
     Time=[] # sampling time of each drone (synchronized)
     gps_timestamp=[] # sampling time of each drone since turning on (asynchronous)
     offboard_timestamp=[]
@@ -114,52 +121,28 @@ def visualize_ulg (**Input):  # input keyword arguments: ref_lat, ref_long, ref_
     min_finish_time=math.inf
     
     # opening ulg files ----------------------
-    os.chdir(folder_of_ulg)
-    for ulg_file in glob.glob("*.ulg"):
-        convert_ulog2csv(folder_of_ulg+"/"+ulg_file, 'vehicle_gps_position', folder_of_ulg, delimiter=";") # to get positions of a drone and synchronized time
-        convert_ulog2csv(folder_of_ulg+"/"+ulg_file, 'offboard_control_mode',folder_of_ulg, delimiter=";") # to check when offboard mode is active (timing is asynchronous)
-        file_names.append(ulg_file.replace(".ulg","")) # file names is the name of a ulg file without .ulg
-        latitude.append([])         # new line for latitudes of drone i
-        longitude.append([])        # new line for longitudes of drone i
-        altitude.append([])         # new line for altitudes of drone i
-        Time.append([])             # new line for sampling time of drone i
-        gps_timestamp.append([])       # new line for gps timestamp drone i
-        offboard_timestamp.append([])  # new line for offboard mode timestamp of drone i
-
-        # Getting data from gps csv file created from ulg file ------
-        csv_file_gps=open(folder_of_ulg+"/"+ulg_file.replace(".ulg","")+"_vehicle_gps_position_0.csv", newline="")
-        Object_of_dictionaries_gps=csv.DictReader(csv_file_gps, delimiter=";")
-        for row_dict in Object_of_dictionaries_gps: # we should create the lists when the file is still open
-            gps_timestamp[i].append(float(row_dict["timestamp"])/1000000) # in seconds, since turning on (asynchronous)
-            Time[i].append(float(row_dict["time_utc_usec"])/1000000) # in seconds, Unix (synchronized)
-
-            latitude[i].append(float(row_dict ["lat"])/10000000)
-            min_lat=min(min_lat, float(row_dict ["lat"])/10000000)
-            max_lat=max(max_lat, float(row_dict ["lat"])/10000000)
-
-            longitude[i].append(float(row_dict["lon"])/10000000)
-            min_long=min(min_long, float(row_dict ["lon"])/10000000)
-            max_long=max(max_long, float(row_dict ["lon"])/1000000)
-
-            altitude[i].append(float(row_dict ["alt"])/1000) # in meters, relative to sea level
-            min_alt=min(min_alt, float(row_dict ["alt"])/1000)
-            max_alt=max(max_alt, float(row_dict ["alt"])/1000)
+    for ulg_file in sorted(glob.glob(os.path.join(folder_of_ulg, "*.ulg"))):
+        flight=FlightLog(ulg_file) # positions of a drone with synchronized time, and timestamps of offboard mode messages (timing is asynchronous)
+        file_names.append(os.path.basename(ulg_file).replace(".ulg","")) # file names is the name of a ulg file without .ulg
+        gps_timestamp.append(flight.gps_timestamp.tolist()) # in seconds, since turning on (asynchronous)
+        Time.append(flight.time.tolist()) # in seconds, Unix (synchronized)
+        latitude.append(flight.latitude.tolist())
+        longitude.append(flight.longitude.tolist())
+        altitude.append(flight.altitude.tolist()) # in meters, relative to sea level
+        offboard_timestamp.append(flight.offboard_timestamp.tolist())
+        min_lat=min(min_lat, flight.latitude.min())
+        max_lat=max(max_lat, flight.latitude.max())
+        min_long=min(min_long, flight.longitude.min())
+        max_long=max(max_long, flight.longitude.max())
+        min_alt=min(min_alt, flight.altitude.min())
+        max_alt=max(max_alt, flight.altitude.max())
 
-        csv_file_gps.close()
-        
         if max_start_time<Time[i][0]:
             max_start_time=Time[i][0]
             latest_drone=i
         
         min_finish_time=min(min_finish_time, Time[i][len(Time[i])-1])
 
-        # Getting data from offboard csv file created from ulg file --------
-        csv_file_offboard=open(folder_of_ulg+"/"+ulg_file.replace(".ulg","")+"_offboard_control_mode_0.csv", newline="")
-        Object_of_dictionaries_offboard=csv.DictReader(csv_file_offboard, delimiter=";")  
-        for row_dict in Object_of_dictionaries_offboard: # we should create the lists when the file is still open  
-            offboard_timestamp[i].append(float(row_dict['timestamp'])/1000000)    
-        csv_file_offboard.close()
-
         i+=1 #number of files (drones)
         # End of opening ulg files  ---------------------
 
@@ -171,88 +154,53 @@ def visualize_ulg (**Input):  # input keyword arguments: ref_lat, ref_long, ref_
     else:
         print("Entered geodetic origin is at: latitude=",ref_lat, "longitude=", ref_long, "altitude=", ref_alt)
     
-    def index_checker(input_index, length) -> int:
-        if input_index >= length:
-            return int(input_index % length)
-        return input_index
     # Converting geodetics to Cartesian -------
+    geodetic_converter=GeodeticConverter(ref_lat, ref_long, ref_alt)
     offboard_mode_status=[] # shows the offboard status of a drone
     offboard_finish=[-1*math.inf for j in range(i)]
     offboard_start=[math.inf for j in range(i)]
     for j in range(i):  # j is the number of a drone
-        x.append([])  #new line for x coordinates
-        y.append([])  #new line for y coordinates
-        z.append([])  #new line for z coordinates 
-        for  k in range(len(Time[j])): # k is the number of a sample of drone j
-            n,e,d =geodetic2ned(latitude[j][k], longitude[j][k], altitude[j][k], ref_lat, ref_long, ref_alt, ell=None, deg=True)
-            x[j].append(n)
-            x_max=max(x_max, n)
-            x_min=min(x_min, n)
-
-            y[j].append(e)
-            y_max=max(y_max, e)
-            y_min=min(y_min, e)
-            
-            z[j].append(-1*d)
-            z_max=max(z_max, -1*d)
-            z_min=min(z_min, -1*d)
-            
-        offboard_mode_status.append([0 for n in range(len(gps_timestamp[j]))])
+        n,e,d=geodetic_converter.geodetic2ned(np.array(latitude[j]), np.array(longitude[j]), np.array(altitude[j])) # all samples of drone j at once
+        x.append(n.tolist())
+        x_max=max(x_max, n.max())
+        x_min=min(x_min, n.min())
 
-        for l in range(len(offboard_timestamp[j])-1): # to check when drone j was on offboard mode
-            for m in range (len(gps_timestamp[j])):
-                if (gps_timestamp[j][m] >= offboard_timestamp[j][l] and gps_timestamp[j][m] <= offboard_timestamp[j][l+1]): # drone j were on offboard mode at gps_timestamp [j][m]
-                    offboard_mode_status[j][m]=1
-                    if offboard_start[j]>=Time[j][m]:
-                        offboard_start[j]=Time[j][m] # offboard start for drone j based on synchronized time
-                    if offboard_finish[j]<=Time[j][m]:
-                        offboard_finish[j]=Time[j][m] # offboard finish for drone j based on synchronized time
+        y.append(e.tolist())
+        y_max=max(y_max, e.max())
+        y_min=min(y_min, e.min())
 
-    
-        fx.append(interpolate.interp1d(Time[j], x[j]))
-        fy.append(interpolate.interp1d(Time[j], y[j]))
-        fz.append(interpolate.interp1d(Time[j], z[j]))
+        z.append((-1*d).tolist())
+        z_max=max(z_max, (-1*d).max())
+        z_min=min(z_min, (-1*d).min())
+            
+        offboard_mode_status.append(label_mode(gps_timestamp[j], offboard_timestamp[j]).tolist()) # to check when drone j was on offboard mode
+        offboard_start[j], offboard_finish[j] = mode_window(Time[j], offboard_mode_status[j]) # based on synchronized time
 
     latest_offboard_start=max(offboard_start)
     earliest_offboard_finish=min(offboard_finish)
 
-    # Creating output CSV file --------
-    Output_CSV_file=open(output_CSV_file_dir, 'w')
-    writer = csv.writer(Output_CSV_file)
-    header=['x(m)', 'y(m)', 'z(m)', 'time(s)', 'drone id', 'offboard mode status','type of experiment']
-    writer.writerow(header)
+    # Creating output trajectory and CSV files --------
+    trajectories=[]
     for j in range(i):
-        for k in range(len(Time[j])):
-            if (Time[j][k]>=latest_offboard_start and Time[j][k]<=earliest_offboard_finish): # drone j was on range of offboard mode at Time[j][k]   
-                row=[x[j][k], y[j][k], z[j][k], Time[j][k]-latest_offboard_start, file_names[j], offboard_mode_status[j][k], sitl_or_real] # x, y , z, time (s), id, status of offboard mode, type of experiment
-                writer.writerow(row)
-    Output_CSV_file.close()
+        Time_j=np.array(Time[j])
+        window=(Time_j>=latest_offboard_start) & (Time_j<=earliest_offboard_finish) # drone j was on range of offboard mode
+        position=np.column_stack([x[j], y[j], z[j]])[window]
+        trajectories.append(Trajectory(file_names[j], Time_j[window]-latest_offboard_start, position, np.array(offboard_mode_status[j])[window], sitl_or_real))
+    if output_trajectory_file_dir!=None:
+        write_trajectories(output_trajectory_file_dir, trajectories)
+    if output_CSV_file_dir!=None:
+        write_csv(output_CSV_file_dir, trajectories) # x, y , z, time (s), id, status of offboard mode, type of experiment
     
-    # Creating interpolated positions
-    # Adding positions of the latest drone to the interpolted lists
-    
-    for k in range(len(x[latest_drone])): # k is the number of samples of the latest drone
-        if Time[latest_drone][k]<= min_finish_time:
-            interp_time.append(Time[latest_drone][k])
-            interp_length+=1
-    # Adding positions of the latest drone and calculating & adding interpolated positions of the other drones to the total lists
+    # Creating interpolated positions at the samples of the latest drone
     fig_colors=['blue','red', 'lightgreen', 'orange','aqua', 'silver', 'magenta', 'darkkhaki','dodgerblue','green','black','brown']
+    window=np.array(Time[latest_drone])<=min_finish_time
+    interp_time=np.array(Time[latest_drone])[window] #Time span of interpolation
+    positions=np.zeros((len(interp_time), i, 3)) # interpolated positions of all drones used for drawing figure
     for j in range(i): # j is the number of a drone
         if j==latest_drone:
-            for k in range(len(x[latest_drone])): # k is the number of samples of the latest drone
-                if Time[latest_drone][k]<= min_finish_time:
-                    X_total.append(x[latest_drone][k])
-                    Y_total.append(y[latest_drone][k])
-                    Z_total.append(z[latest_drone][k])
-                    Time_total.append(Time[latest_drone][k]-max_start_time)
-                    labels_total.append(file_names[latest_drone])
+            positions[:,j]=np.column_stack([x[j], y[j], z[j]])[window]
         else:
-            for t in interp_time:
-                X_total.append(float(fx[j](t)))
-                Y_total.append(float(fy[j](t)))
-                Z_total.append(float(fz[j](t)))
-                Time_total.append(t-max_start_time)
-                labels_total.append(file_names[j])
+            positions[:,j]=np.column_stack([np.interp(interp_time, Time[j], x[j]), np.interp(interp_time, Time[j], y[j]), np.interp(interp_time, Time[j], z[j])])
 
     x_range=x_max-x_min
     x_max=x_max+(x_range)*0.05
@@ -288,28 +236,7 @@ def visualize_ulg (**Input):  # input keyword arguments: ref_lat, ref_long, ref_
         z_range=max_range
 
     
-    SIZE=int(Drone_size)
-    size=[SIZE for k in range(len(X_total))]
-    fig= px.scatter_3d(x=X_total, y=Y_total, z=Z_total, animation_frame=Time_total, opacity=1, size=size, color=labels_total, size_max=max(size),color_discrete_sequence=fig_colors)
-    
-    #Adding lines to the figure
-    for j in range(i):
-        
-        fig.add_trace(            #should be an object of go
-            go.Scatter3d(
-                x=X_total[j*interp_length: ((j+1)*interp_length)], 
-                y=Y_total[j*interp_length: ((j+1)*interp_length)],
-                z=Z_total[j*interp_length: ((j+1)*interp_length)], 
-                mode='lines',
-                name="trace of "+file_names[j],
-                marker=dict(color=fig_colors[index_checker(j,len(fig_colors))])
-        )
-    )
-    
-    if frame_duration==None:
-        frame_duration=(interp_time[1]-interp_time[0]) # in seconds
-    fig.layout.updatemenus[0].buttons[0].args[1]['frame']['duration'] = frame_duration*1000 # in milliseconds
-    fig.layout.updatemenus[0].buttons[0].args[1]['transition']['duration'] = 1 # in milliseconds
+    fig=build_animation(interp_time-max_start_time, positions, file_names, fig_colors, drone_size=int(Drone_size), frame_duration=frame_duration, max_frames=max_frames, tolerance=trace_tolerance)
     fig.update_layout(
         showlegend=True,
         legend=dict(itemsizing='constant',font=dict(family="Times New Roman",size=20), bgcolor="LightSteelBlue", bordercolor="Black", borderwidth=2),
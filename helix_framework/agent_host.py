@@ -0,0 +1,194 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import threading
+import paho.mqtt.client as mqtt
+from onboard import Agent
+from telemetry import SwarmManager
+
+
+class SharedConnection:
+    """
+    One MQTT connection shared by the agents of a process. Each topic filter has one paho callback which
+    calls the callbacks of all agents for that filter, so messages are received and decoded once per
+    process instead of once per agent. Callbacks writing the telemetry of the swarm are only called once
+    per SwarmManager, as the agents of a host share it.
+    """
+
+    def __init__(self, broker_ip, port=1883, keepalive=5):
+        self.broker_ip = broker_ip
+        self.port = port
+        self.keepalive = keepalive
+        self.client = mqtt.Client()
+        self.client.on_connect = self.on_connect
+        self.client.on_disconnect = self.on_disconnect
+        self.routes = {}  # {topic filter: {key: callback}}
+        self.connect_callbacks = {}  # {AgentClient: on_connect of the agent}
+        self.disconnect_callbacks = {}  # {AgentClient: on_disconnect of the agent}
+        self.connection_args = None  # (flags, rc) of the current connection, None if disconnected
+        self.will = None
+        self.started = False
+        self.lock = threading.Lock()
+
+    def route(self, topic, key, callback):
+        with self.lock:
+            if topic not in self.routes:
+                self.routes[topic] = {}
+                self.client.message_callback_add(topic, lambda client, userdata, msg: self.dispatch(topic, userdata, msg))
+            self.routes[topic].setdefault(key, callback)
+
+    def dispatch(self, topic, userdata, msg):
+        for callback in list(self.routes[topic].values()):
+            callback(self.client, userdata, msg)
+
+    def start(self):
+        # connects once, with the will of the first agent (a connection has only one will)
+        if self.started:
+            return
+        self.started = True
+        if self.will is not None:
+            self.client.will_set(*self.will)
+        self.client.connect_async(self.broker_ip, self.port, keepalive=self.keepalive)
+        self.client.loop_start()
+
+    def stop(self):
+        self.client.disconnect()
+        self.client.loop_stop()
+        self.started = False
+
+    def add_connect_callback(self, agent_client, callback):
+        self.connect_callbacks[agent_client] = callback
+        if self.connection_args is not None:  # an agent joining an open connection subscribes at once
+            threading.Thread(target=callback, args=(agent_client, None) + self.connection_args, daemon=True).start()
+
+    def on_connect(self, client, userdata, flags, rc):
+        self.connection_args = (flags, rc)
+        # in threads, as the callback of each agent waits before publishing its status
+        for agent_client, callback in list(self.connect_callbacks.items()):
+            threading.Thread(target=callback, args=(agent_client, userdata, flags, rc), daemon=True).start()
+
+    def on_disconnect(self, client, userdata, rc):
+        self.connection_args = None
+        for agent_client, callback in list(self.disconnect_callbacks.items()):
+            callback(agent_client, userdata, rc)
+
+    def remove(self, agent_client):
+        # removes the callbacks of an agent, the connection is closed with the last agent
+        with self.lock:
+            for callbacks in self.routes.values():
+                # the callbacks writing the shared SwarmManager (tuple keys) stay for the other agents
+                for key in [key for key in callbacks if not isinstance(key, tuple) and getattr(key, "__self__", None) in agent_client.owners]:
+                    del callbacks[key]
+            self.connect_callbacks.pop(agent_client, None)
+            self.disconnect_callbacks.pop(agent_client, None)
+            last = not self.connect_callbacks
+        if last and self.started:
+            self.stop()
+
+
+class AgentClient:
+    """
+    The methods of mqtt.Client used by DroneCommunication and TelemetryUpdater, for one agent of a
+    SharedConnection
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.owners = set()  # objects whose bound methods are routed for this agent
+
+    def message_callback_add(self, topic, callback):
+        owner = getattr(callback, "__self__", None)
+        self.owners.add(owner)
+        if topic.startswith("+/telemetry/") and hasattr(owner, "swarm_manager"):
+            # the telemetry of the other agents is written once in the shared SwarmManager
+            key = (callback.__func__, id(owner.swarm_manager))
+        else:
+            key = callback
+        self.connection.route(topic, key, callback)
+
+    def will_set(self, topic, payload=None, qos=0, retain=False):
+        if self.connection.will is None:
+            self.connection.will = (topic, payload, qos, retain)
+
+    def connect_async(self, host, port=1883, keepalive=60):
+        pass  # the connection is opened by loop_start with the broker of the host
+
+    def loop_start(self):
+        self.connection.start()
+
+    def loop_stop(self):
+        pass  # the network loop of the connection stops with its last agent
+
+    def disconnect(self):
+        self.connection.remove(self)
+
+    @property
+    def on_connect(self):
+        return self.connection.connect_callbacks.get(self)
+
+    @on_connect.setter
+    def on_connect(self, callback):
+        self.connection.add_connect_callback(self, callback)
+
+    @property
+    def on_disconnect(self):
+        return self.connection.disconnect_callbacks.get(self)
+
+    @on_disconnect.setter
+    def on_disconnect(self, callback):
+        self.connection.disconnect_callbacks[self] = callback
+
+    def subscribe(self, topic, qos=0):
+        return self.connection.client.subscribe(topic, qos)
+
+    def unsubscribe(self, topic):
+        pass  # other agents of the host may still need the topic
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        return self.connection.client.publish(topic, payload, qos, retain)
+
+
+async def run_agents(parameters_file_paths):
+    """
+    Runs an Agent for each parameters file in the running event loop, with one MQTT connection, one
+    SwarmManager and one copy of the compiled corridors (corridor_cache.load_shared) for all of them
+    Returns
+    -----------
+    agents: List[Agent, ...]
+    """
+    with open(parameters_file_paths[0], "r") as f:
+        broker_ip = json.load(f)["broker_ip"]
+    connection = SharedConnection(broker_ip)
+    swarm_manager = SwarmManager()
+    agents = [Agent(path, swarm_manager, AgentClient(connection)) for path in parameters_file_paths]
+    await asyncio.gather(*[agent.run() for agent in agents])
+    return agents
+
+
+def run_host(parameters_file_paths):
+    # runs the agents until the program is canceled with e.g. CTRL-C
+    event_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(event_loop)
+    asyncio.ensure_future(run_agents(parameters_file_paths), loop=event_loop)
+    event_loop.run_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs several onboard agents in one process, for SITL swarms")
+    parser.add_argument("parameters_file_paths", nargs="*", help="json parameters file of each agent")
+    parser.add_argument("--sitl", type=int, default=0, help="number of SITL agents, using SITL_Parameters/S00<n>_parameters.json")
+    parser.add_argument("--processes", type=int, default=1, help="number of processes sharing the agents")
+    args = parser.parse_args()
+
+    paths = args.parameters_file_paths + [
+        "SITL_Parameters/S" + str(i + 1).zfill(3) + "_parameters.json" for i in range(args.sitl)
+    ]
+    if args.processes <= 1:
+        run_host(paths)
+    else:
+        hosts = [multiprocessing.Process(target=run_host, args=(paths[n :: args.processes],)) for n in range(args.processes)]
+        for host in hosts:
+            host.start()
+        for host in hosts:
+            host.join()
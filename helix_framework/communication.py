@@ -3,12 +3,15 @@ import time
 import paho.mqtt.client as mqtt
 import gtools
 from data_structures import AgentTelemetry
+from telemetry_packet import TelemetryDecoder
 
 
 class DroneCommunication:
     client = mqtt.Client()
 
-    def __init__(self, agent, swarm_manager):
+    def __init__(self, agent, swarm_manager, client=None):
+        if client is not None:  # e.g. an AgentClient of agent_host.py sharing one connection between agents
+            self.client = client
         self.agent = agent
         self.swarm_manager = swarm_manager
         self.broker_ip = agent.broker_ip
@@ -17,8 +20,12 @@ class DroneCommunication:
         self.id = agent.id
         self.command_functions = {}
         self.current_command = "none"
+        self.telemetry_decoder = TelemetryDecoder(swarm_manager)
+        self.known_agents = {self.id}  # agents this agent has replied to, the swarm manager may be shared by several agents
 
     async def run_comms(self):
+        # the callbacks run on the network thread of paho, they hand the messages over to this event loop
+        self.swarm_manager.inbox.bind(asyncio.get_running_loop())
         self.client.message_callback_add(
             "+/telemetry/geodetic", self.on_message_geodetic
         )
@@ -28,6 +35,9 @@ class DroneCommunication:
         self.client.message_callback_add(
             "+/telemetry/velocity_ned", self.on_message_velocity
         )
+        self.client.message_callback_add(
+            "+/telemetry/packed", self.on_message_packed
+        )
         self.client.message_callback_add(
             self.id + "/home/altitude", self.on_message_home
         )
@@ -84,7 +94,7 @@ class DroneCommunication:
         self.activate_callback("disconnect")
 
     def on_message_detection(self, mosq, obj, msg):
-        self.add_agent(msg.payload.decode())
+        self.swarm_manager.inbox.call(self.add_agent, msg.payload.decode())
 
     def on_message_stop(self, mosq, obj, msg):
         print("STOPPING")
@@ -116,7 +126,7 @@ class DroneCommunication:
         geodetic = [float(i) for i in string_list]
         # time.sleep(1)  # simulating comm latency
         # replace reference to first 4 characters of topic with splitting topic at /
-        self.swarm_manager.telemetry[msg.topic[0:4]].geodetic = geodetic
+        self.swarm_manager.inbox.put(msg.topic, self.set_geodetic, msg.topic[0:4], geodetic)
 
     def on_message_position(self, mosq, obj, msg):
         # Remove none numeric parts of string and then split into north east and down
@@ -124,7 +134,7 @@ class DroneCommunication:
         string_list = received_string.split(", ")
         position = [float(i) for i in string_list]
         # time.sleep(1)  # simulating comm latency
-        self.swarm_manager.telemetry[msg.topic[0:4]].position_ned = position
+        self.swarm_manager.inbox.put(msg.topic, self.set_position, msg.topic[0:4], position, time.monotonic())
 
     def on_message_velocity(self, mosq, obj, msg):
         # Remove none numeric parts of string and then split into north east and down
@@ -132,11 +142,31 @@ class DroneCommunication:
         string_list = received_string.split(", ")
         velocity = [float(i) for i in string_list]
         # time.sleep(1)  # simulating comm latency
-        self.swarm_manager.telemetry[msg.topic[0:4]].velocity_ned = velocity
+        self.swarm_manager.inbox.put(msg.topic, self.set_velocity, msg.topic[0:4], velocity)
+
+    def on_message_packed(self, mosq, obj, msg):
+        # binary telemetry, see telemetry_packet.py
+        self.swarm_manager.inbox.put(msg.topic, self.telemetry_decoder.decode, msg.payload, time.monotonic())
+
+    # the latest telemetry of each agent is applied on the event loop by swarm_manager.inbox
+    def set_geodetic(self, agent, geodetic):
+        if agent in self.swarm_manager.telemetry:
+            self.swarm_manager.telemetry[agent].geodetic = geodetic
+
+    def set_position(self, agent, position, receipt_time):
+        # the receipt time is kept to extrapolate the position, see SwarmTelemetry.predict_positions
+        if agent in self.swarm_manager.telemetry:
+            self.swarm_manager.telemetry[agent].position_ned = position
+            self.swarm_manager.telemetry[agent].timestamp = receipt_time
+            self.swarm_manager.neighbour_grid.update(agent, position)
+
+    def set_velocity(self, agent, velocity):
+        if agent in self.swarm_manager.telemetry:
+            self.swarm_manager.telemetry[agent].velocity_ned = velocity
 
     def on_message_update_parameters(self, mosq, obj, msg):
         print("received updated parameter")
-        self.agent.update_parameter(msg.payload.decode())
+        self.swarm_manager.inbox.call(self.agent.update_parameter, msg.payload.decode())
 
     def bind_command_functions(self, command_functions, event_loop):
         self.command_functions = command_functions
@@ -144,13 +174,16 @@ class DroneCommunication:
 
     def activate_callback(self, command):
         print("activating callback")
-        asyncio.ensure_future(self.command_functions[command](), loop=self.event_loop)
+        # called on the network thread of paho
+        asyncio.run_coroutine_threadsafe(self.command_functions[command](), self.event_loop)
 
     def add_agent(self, new_id):
         # adds a new agent to the swarm if they are not already present
         if new_id not in self.swarm_manager.telemetry:
             self.swarm_manager.telemetry[new_id] = AgentTelemetry()
             self.client.subscribe(new_id + "/telemetry/+")
+        if new_id not in self.known_agents:
+            self.known_agents.add(new_id)
             # publish ID so that new agent can add it to their dict
             self.client.publish(
                 "detection",
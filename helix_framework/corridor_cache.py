@@ -0,0 +1,306 @@
+import copy
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import numpy as np
+from spatial_index import PointGrid
+
+CACHE_FOLDER = "__corridor_cache__"  # created next to the experiment json files
+CACHE_VERSION = 1  # increased when compile_corridors changes, so the caches of older versions are not used
+CACHE_GRACE_PERIOD = 60  # seconds an older version of a cache is kept, as another process may be loading it
+ARRAY_NAMES = [
+    "points",  # (M,3) corridor points of all paths one after another
+    "offsets",  # (paths+1,) points of path j are points[offsets[j]:offsets[j+1]]
+    "directions",  # (M,3) unit vector from each point to the next point of its path
+    "segment_lengths",  # (M,) distance from each point to the next point of its path
+    "radii",  # (M,) corridor radius at each point
+    "adjacency",  # (E,4) [path, switching point, next path, index of the nearest point of next path]
+    "adjacency_distance",  # (E,) distance between the switching point and the point of next path
+    "adjacency_vector",  # (E,3) unit vector from the point of next path to the switching point
+]
+
+
+loaded_experiments = {}  # {(experiment file path, digest): (experiment_parameters, CompiledCorridors)} of load_shared
+
+
+class CompiledCorridors:
+    """
+    Contiguous float64 arrays of the corridors of an experiment. The arrays are memory mapped from
+    the cache, so every process flying the same experiment shares the same pages.
+    """
+
+    def __init__(self, arrays):
+        for name in ARRAY_NAMES:
+            # plain arrays viewing the memory map, indexing np.memmap objects is much slower
+            setattr(self, name, np.asarray(arrays[name]))
+        self.length = [int(l) for l in np.diff(self.offsets)]
+        # {(path, switching point, next path): [index of point of next path, distance, pass vector]}
+        self.adjacency_dict = {}
+        for (path, switching_point, next_path, k), distance, pass_vector in zip(
+            self.adjacency.tolist(), self.adjacency_distance.tolist(), self.adjacency_vector
+        ):
+            self.adjacency_dict[(path, switching_point, next_path)] = [k, distance, pass_vector]
+        self.segment_trees = {}  # {path: SegmentTree}, built by the first experiment which needs it
+
+    def split(self, name):
+        # returns a list with a view of the array for each path
+        array = getattr(self, name)
+        return [array[self.offsets[j] : self.offsets[j + 1]] for j in range(len(self.length))]
+
+
+def load(experiment_file_path):
+    """
+    Parameters
+    ------------
+    experiment_file_path: path to the json file of the experiment
+
+    Returns
+    -----------
+    experiment_parameters: Dict of the json file without corridor_points and corridor_radius
+    corridors: CompiledCorridors of the experiment, compiled and saved in the cache if it was not there
+    """
+    (content, digest) = read_experiment(experiment_file_path)
+    return load_content(experiment_file_path, content, digest)
+
+
+def read_experiment(experiment_file_path):
+    # returns the content of the json file and its digest, which names its cache and changes with the
+    # content, CACHE_VERSION and ARRAY_NAMES
+    with open(experiment_file_path, "rb") as f:
+        content = f.read()
+    digest = hashlib.sha256(json.dumps([CACHE_VERSION, ARRAY_NAMES]).encode())
+    digest.update(content)
+    return content, digest.hexdigest()[:16]
+
+
+def load_content(experiment_file_path, content, digest):
+    # load with the json file already read by read_experiment
+    folder = get_cache_folder(experiment_file_path, digest)
+
+    try:
+        with open(os.path.join(folder, "parameters.json"), "r") as f:
+            experiment_parameters = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(folder, name + ".npy"), mmap_mode="r")
+            for name in ARRAY_NAMES
+        }
+        return experiment_parameters, CompiledCorridors(arrays)
+    except (OSError, ValueError):
+        pass
+
+    experiment_parameters = json.loads(content)
+    arrays = compile_corridors(experiment_parameters)
+    for key in ["corridor_points", "corridor_radius"]:
+        del experiment_parameters[key]
+    try:
+        save(folder, experiment_parameters, arrays)
+    except OSError as error:
+        print("could not save compiled corridors:", error)
+    return experiment_parameters, CompiledCorridors(arrays)
+
+
+def load_shared(experiment_file_path):
+    """
+    The same as load, but the experiments of all agents of a process (see agent_host.py) get the same
+    CompiledCorridors, so the corridors and their segment trees are built once per process
+    """
+    (content, digest) = read_experiment(experiment_file_path)
+    key = (os.path.abspath(experiment_file_path), digest)
+    if key not in loaded_experiments:
+        loaded_experiments[key] = load_content(experiment_file_path, content, digest)
+    (experiment_parameters, corridors) = loaded_experiments[key]
+    return copy.deepcopy(experiment_parameters), corridors
+
+
+def get_cache_folder(experiment_file_path, digest):
+    (directory, file_name) = os.path.split(os.path.abspath(experiment_file_path))
+    name = os.path.splitext(file_name)[0]
+    return os.path.join(directory, CACHE_FOLDER, name + "-" + digest)
+
+
+def save(folder, experiment_parameters, arrays):
+    parent = os.path.dirname(folder)
+    os.makedirs(parent, exist_ok=True)
+    # written in a temporary folder and renamed, so other processes never see a half written cache
+    temporary_folder = tempfile.mkdtemp(dir=parent)
+    try:
+        with open(os.path.join(temporary_folder, "parameters.json"), "w") as f:
+            json.dump(experiment_parameters, f)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(temporary_folder, name + ".npy"), arrays[name])
+        os.rename(temporary_folder, folder)
+    except OSError:
+        shutil.rmtree(temporary_folder, ignore_errors=True)
+        if not os.path.isdir(folder):  # another process may have saved the same cache first
+            raise
+        return
+
+    # removing caches of older versions of the same experiment, only the folders named by get_cache_folder
+    # for this experiment (not e.g. of experiment name-other) which were not written in the grace period
+    (name, digest) = os.path.basename(folder).rsplit("-", 1)
+    pattern = re.escape(name) + r"-[0-9a-f]{16}"
+    for old_folder in os.listdir(parent):
+        if old_folder == os.path.basename(folder) or not re.fullmatch(pattern, old_folder):
+            continue
+        old_path = os.path.join(parent, old_folder)
+        try:
+            if time.time() - os.path.getmtime(old_path) < CACHE_GRACE_PERIOD:
+                continue
+        except OSError:
+            continue
+        shutil.rmtree(old_path, ignore_errors=True)
+
+
+def compile_corridors(experiment_parameters):
+    # Converts the corridors of an experiment json into the arrays of ARRAY_NAMES
+    corridor_points = experiment_parameters["corridor_points"]
+    repeat = experiment_parameters["repeat"]
+    lengths = [len(corridor_points[j]) for j in range(len(corridor_points))]
+    offsets = np.zeros(len(lengths) + 1, dtype="int64")
+    offsets[1:] = np.cumsum(lengths)
+    points = np.array(
+        [point for path in corridor_points for point in path], dtype="float64"
+    ).reshape(-1, 3)
+    radii = np.array(
+        [radius for path in experiment_parameters["corridor_radius"] for radius in path],
+        dtype="float64",
+    )
+
+    # the next point of the last point of a path is its first point, unless the drone stays at the last point
+    next_point = np.arange(len(points)) + 1
+    stay = []  # last points of the paths where the drone stays
+    for j in range(len(lengths)):
+        next_point[offsets[j + 1] - 1] = offsets[j]
+        if repeat[j] == "STAY":
+            stay.append(offsets[j + 1] - 1)
+    stay = np.array(stay, dtype="int64")
+    segments = points[next_point] - points
+    segment_lengths = row_norms(segments)
+    segment_lengths[stay] = 0
+    segments[stay] = points[stay] - points[stay - 1]  # staying at the last point keeps the direction of the last segment
+    directions = segments / row_norms(segments)[:, None]
+
+    arrays = {
+        "points": points,
+        "offsets": offsets,
+        "directions": directions,
+        "segment_lengths": segment_lengths,
+        "radii": radii,
+    }
+    arrays.update(compile_adjacency(experiment_parameters, points, offsets, radii))
+    return arrays
+
+
+def compile_adjacency(experiment_parameters, points, offsets, radii):
+    """
+    Finds the nearest point of next_path for each switching point of path, for every (path, next_path)
+    permitted to any drone. Two points are adjacent if their distance is at most 1.01 times the sum
+    of their corridor radii (this 1 percent is to compensate numerical calculation inaccuracies).
+    Only the points in the grid cells around each switching point are compared with it.
+    """
+    (switches, switching_points) = get_switches(experiment_parameters)
+    path_num = len(offsets) - 1
+    permitted = np.zeros((path_num, path_num), dtype=bool)  # permitted[path, next_path]
+    query_path = []
+    query_switching_point = []
+    for (path, next_path) in switches:
+        permitted[path, next_path] = True
+    for path in sorted(set(path for (path, next_path) in switches)):
+        query_path.extend([path] * len(switching_points[path]))
+        query_switching_point.extend(switching_points[path])
+    query_path = np.array(query_path, dtype="int64")
+    query_point = offsets[query_path] + np.array(query_switching_point, dtype="int64")
+    point_path = np.repeat(np.arange(path_num), np.diff(offsets))
+
+    # no two points farther than the cell size can be adjacent
+    grid = PointGrid(points, 2 * 1.01 * (np.max(radii) if len(radii) else 0))
+    (query_index, point_index) = grid.candidate_pairs(points[query_point])
+    next_path = point_path[point_index]
+    candidates = permitted[query_path[query_index], next_path]
+    query_index = query_index[candidates]
+    point_index = point_index[candidates]
+    next_path = next_path[candidates]
+    vectors = points[query_point[query_index]] - points[point_index]
+    distances = row_norms(vectors)
+    adjacent = distances <= (radii[query_point[query_index]] + radii[point_index]) * 1.01
+
+    # sorting by (path, next path, switching point, distance, k) and keeping the first of each switch
+    query_index = query_index[adjacent]
+    next_path = next_path[adjacent]
+    k = point_index[adjacent] - offsets[next_path]
+    vectors = vectors[adjacent]
+    distances = distances[adjacent]
+    order = np.lexsort((k, distances, query_index, next_path, query_path[query_index]))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = (query_index[order][1:] != query_index[order][:-1]) | (next_path[order][1:] != next_path[order][:-1])
+    order = order[first]
+
+    norms = distances[order]
+    pass_vectors = vectors[order]
+    pass_vectors[norms != 0] /= norms[norms != 0][:, None]
+    return {
+        "adjacency": np.stack(
+            [
+                query_path[query_index[order]],
+                np.array(query_switching_point, dtype="int64").reshape(-1)[query_index[order]],
+                next_path[order],
+                k[order],
+            ],
+            axis=1,
+        ).reshape(-1, 4),
+        "adjacency_distance": distances[order],
+        "adjacency_vector": pass_vectors.reshape(-1, 3),
+    }
+
+
+def compile_adjacency_brute_force(experiment_parameters, points, offsets, radii):
+    # Same as compile_adjacency, comparing each switching point with every point of next_path
+    (switches, switching_points) = get_switches(experiment_parameters)
+    adjacency = []
+    adjacency_distance = []
+    adjacency_vector = []
+    for (path, next_path) in switches:
+        if len(switching_points[path]) == 0:
+            continue
+        switching = offsets[path] + np.array(switching_points[path], dtype="int64")
+        next_points = points[offsets[next_path] : offsets[next_path + 1]]
+        vectors = points[switching][:, None, :] - next_points[None, :, :]
+        distances = row_norms(vectors)
+        limits = (radii[switching][:, None] + radii[offsets[next_path] : offsets[next_path + 1]][None, :]) * 1.01
+        distances[distances > limits] = np.inf
+        nearest = np.argmin(distances, axis=1)  # the first of the nearest points is kept
+        for s in np.flatnonzero(np.isfinite(distances[np.arange(len(switching)), nearest])):
+            k = nearest[s]
+            pass_vector = vectors[s, k]
+            if np.linalg.norm(pass_vector) != 0:
+                pass_vector = pass_vector / np.linalg.norm(pass_vector)
+            adjacency.append([path, switching_points[path][s], next_path, k])
+            adjacency_distance.append(distances[s, k])
+            adjacency_vector.append(pass_vector)
+
+    return {
+        "adjacency": np.array(adjacency, dtype="int64").reshape(-1, 4),
+        "adjacency_distance": np.array(adjacency_distance, dtype="float64"),
+        "adjacency_vector": np.array(adjacency_vector, dtype="float64").reshape(-1, 3),
+    }
+
+
+def get_switches(experiment_parameters):
+    # returns the sorted (path, next_path) permitted to any drone and the switching points of each path
+    switching_points = experiment_parameters["switching_points"]
+    switches = set()
+    for pass_permission in experiment_parameters["pass_permission_list"]:
+        for j, next_paths in pass_permission.items():
+            for next_path in next_paths:
+                switches.add((int(j), next_path))
+    return sorted(switches), switching_points
+
+
+def row_norms(vectors):
+    # norms along the last axis, computed with the same dot product as np.linalg.norm of a single
+    # vector, so compiled values are identical to the ones computed point by point
+    return np.sqrt(np.matmul(vectors[..., None, :], vectors[..., :, None])[..., 0, 0])
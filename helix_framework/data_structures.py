@@ -1,3 +1,7 @@
+import time
+import numpy as np
+
+
 class AgentTelemetry:
     def __init__(self):
         self.arm_status = False
@@ -7,3 +11,162 @@ class AgentTelemetry:
         self.position_ned = [0, 0, 0]
         self.velocity_ned = [0, 0, 0]
         self.current_time=0
+
+
+class SwarmTelemetry:
+    """
+    Telemetry of the swarm kept in preallocated arrays with one row (slot) per agent, in the order the
+    agents were added. It is used like a dict of AgentTelemetry: swarm_telem[id] returns an
+    AgentTelemetryView reading and writing the slot of the agent, and assigning an AgentTelemetry to
+    swarm_telem[id] copies its values into the slot. Whole-swarm calculations can use the first
+    len(swarm_telem) rows of the arrays directly.
+    """
+
+    def __init__(self, capacity=16):
+        self.slots = {}  # {agent id: slot}
+        self.views = {}  # {agent id: AgentTelemetryView}
+        self.arm_status = np.zeros(capacity, dtype=bool)
+        self.flight_mode = ["NONE"] * capacity
+        self.geodetic = np.zeros((capacity, 3), dtype="float64")
+        self.heading = np.zeros(capacity, dtype="float64")
+        self.position_ned = np.zeros((capacity, 3), dtype="float64")
+        self.velocity_ned = np.zeros((capacity, 3), dtype="float64")
+        self.current_time = np.zeros(capacity, dtype="int64")
+        self.timestamp = np.zeros(capacity, dtype="float64")  # time.monotonic() of the receipt of the last position
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, id):
+        return id in self.slots
+
+    def __iter__(self):
+        return iter(self.slots)
+
+    def __getitem__(self, id):
+        return self.views[id]
+
+    def __setitem__(self, id, telemetry):
+        if id not in self.slots:
+            if len(self.slots) == len(self.timestamp):
+                self.grow()
+            self.slots[id] = len(self.slots)
+            self.views[id] = AgentTelemetryView(self, self.slots[id])
+        slot = self.slots[id]
+        self.arm_status[slot] = telemetry.arm_status
+        self.flight_mode[slot] = telemetry.flight_mode
+        self.geodetic[slot] = telemetry.geodetic
+        self.heading[slot] = telemetry.heading
+        self.velocity_ned[slot] = telemetry.velocity_ned
+        self.current_time[slot] = telemetry.current_time
+        self.views[id].position_ned = telemetry.position_ned
+
+    def keys(self):
+        return self.slots.keys()
+
+    def values(self):
+        return self.views.values()
+
+    def items(self):
+        return self.views.items()
+
+    def predict_positions(self, ids, now, horizon):
+        """
+        Extrapolates the positions of agents to the time now with their velocities, the age of a position
+        is clipped to [0, horizon] so old telemetry is not extrapolated far
+            ids: List[agent id, ...]
+            now: time.monotonic() to extrapolate to
+            horizon: seconds
+        Returns
+        -----------
+        positions: np.array[[north, east, down], ...] in the order of ids
+        """
+        slots = np.fromiter((self.slots[id] for id in ids), dtype="int64", count=len(ids))
+        age = np.clip(now - self.timestamp[slots], 0, horizon)
+        return self.position_ned[slots] + self.velocity_ned[slots] * age[:, None]
+
+    def grow(self):
+        # doubles the number of slots
+        capacity = 2 * len(self.timestamp)
+        for name in ["arm_status", "geodetic", "heading", "position_ned", "velocity_ned", "current_time", "timestamp"]:
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[: len(old)] = old
+            setattr(self, name, new)
+        self.flight_mode.extend(["NONE"] * (capacity - len(self.flight_mode)))
+
+
+class AgentTelemetryView:
+    # Has the attributes of AgentTelemetry, stored in the slot of an agent in a SwarmTelemetry
+    __slots__ = ("store", "slot")
+
+    def __init__(self, store, slot):
+        self.store = store
+        self.slot = slot
+
+    @property
+    def arm_status(self):
+        return bool(self.store.arm_status[self.slot])
+
+    @arm_status.setter
+    def arm_status(self, value):
+        self.store.arm_status[self.slot] = value
+
+    @property
+    def flight_mode(self):
+        return self.store.flight_mode[self.slot]
+
+    @flight_mode.setter
+    def flight_mode(self, value):
+        self.store.flight_mode[self.slot] = value
+
+    @property
+    def heading(self):
+        return float(self.store.heading[self.slot])
+
+    @heading.setter
+    def heading(self, value):
+        self.store.heading[self.slot] = value
+
+    @property
+    def current_time(self):
+        return int(self.store.current_time[self.slot])
+
+    @current_time.setter
+    def current_time(self, value):
+        self.store.current_time[self.slot] = value
+
+    @property
+    def timestamp(self):
+        return float(self.store.timestamp[self.slot])
+
+    @timestamp.setter
+    def timestamp(self, value):
+        # set after position_ned when the position was received before it was applied
+        self.store.timestamp[self.slot] = value
+
+    # vectors are returned as copies, so they do not change when new telemetry arrives
+    @property
+    def geodetic(self):
+        return self.store.geodetic[self.slot].copy()
+
+    @geodetic.setter
+    def geodetic(self, value):
+        self.store.geodetic[self.slot] = value
+
+    @property
+    def position_ned(self):
+        return self.store.position_ned[self.slot].copy()
+
+    @position_ned.setter
+    def position_ned(self, value):
+        self.store.position_ned[self.slot] = value
+        self.store.timestamp[self.slot] = time.monotonic()
+
+    @property
+    def velocity_ned(self):
+        return self.store.velocity_ned[self.slot].copy()
+
+    @velocity_ned.setter
+    def velocity_ned(self, value):
+        self.store.velocity_ned[self.slot] = value
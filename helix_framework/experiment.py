@@ -1,5 +1,5 @@
 from __future__ import annotations
-import json
+import corridor_cache
 import flocking
 from mavsdk import System
 from mavsdk.action import ActionError
@@ -7,6 +7,7 @@ from mavsdk.offboard import OffboardError, VelocityNedYaw
 import pymap3d as pm
 from communication import DroneCommunication
 from data_structures import AgentTelemetry
+from spatial_index import SegmentTree
 import math
 import numpy as np
 from string import digits
@@ -42,12 +43,14 @@ class Experiment:
         self.target_direction = np.array([1, 1, 1], dtype="float64")
         self.min_distance=[math.inf, 0, 0, np.array([0, 0, 0], dtype="float64"), np.array([0, 0, 0], dtype="float64")] # [distance, self.id (id of the current drone), id of the other drone, position of current drone, position of the other drone]
         self.switched_positions=[] # to save the positions where the drone switches
+        self.profiler = None # StageProfiler timing the stages of path_following, None to not time them
         self.load(experiment_file_path, swarm_telem)
 
     def load(self, experiment_file_path, swarm_telem):
 
-        with open(experiment_file_path, "r") as f:
-            experiment_parameters = json.load(f)
+        # the corridors are compiled into arrays once and then loaded from the cache next to the json file
+        experiment_parameters, self.corridors = corridor_cache.load_shared(experiment_file_path)
+        self.segment_trees = self.corridors.segment_trees # self.segment_trees[j]: bounding volume hierarchy over the segments of path j, shared by the agents of a process
 
         self.k_migration = experiment_parameters["k_migration"]
         self.k_lane_cohesion = experiment_parameters["k_lane_cohesion"]
@@ -62,13 +65,11 @@ class Experiment:
         ]  # the permission to go to another path
         self.pre_start_positions = experiment_parameters["pre_start_positions"]
         self.initial_paths = experiment_parameters["initial_paths"]
-        self.lane_radius = experiment_parameters["corridor_radius"]
-        self.points = experiment_parameters["corridor_points"]
+        self.lane_radius = self.corridors.split("radii")
+        self.points = self.corridors.split("points")
         self.rotation_dir = experiment_parameters["path_rotation_dir"]
         self.start_delay_list=experiment_parameters["start_delay_list"]
-        self.length = [
-            len(self.points[j]) for j in range(len(self.points))
-        ]  # j is the number of a path
+        self.length = self.corridors.length  # self.length[j] is the number of points of path j
         self.passed_last_point=[False for j in range(len(self.points))] # to see if the drone has passed the last point of path j or not
         self.create_directions()
         self.ready_flag = True
@@ -107,60 +108,35 @@ class Experiment:
         return swarm_priorities
 
     def create_directions(self):
-        for j in range(len(self.points)):
-            self.directions.append([])
-            for i in range(len(self.points[j])):
-                # All points must be converted to np arrays
-                self.points[j][i] = np.array(self.points[j][i], dtype="float64")
-                if i == len(self.points[j]) - 1:
-                    if self.repeat[j]=="STAY": # if we want to stay at the last point
-                        self.directions[j].append((self.points[j][i] - self.points[j][i-1])/ np.linalg.norm(self.points[j][i] - self.points[j][i-1]))
-                    else:    
-                        self.directions[j].append((self.points[j][0] - self.points[j][i])/ np.linalg.norm(self.points[j][0] - self.points[j][i]))
-                else:
-                    self.directions[j].append(
-                        (self.points[j][i + 1] - self.points[j][i])
-                        / np.linalg.norm(self.points[j][i + 1] - self.points[j][i])
-                    )
-        print("done creating directions")
+        # self.directions[j][i] is the unit vector from point i of path j to its next point
+        self.directions = self.corridors.split("directions")
 
     def create_adjacent_points(self) -> None:
         self.adjacent_points = [{} for j in range(len(self.points))] # jth dictionary is for jth path
         for path in self.pass_permission:  # path is the number of path in dictionary self.pass_permission
             for switching_point in self.switching_points[path]:
                 shortest_dist_switch=math.inf # the shortest distance for switching point to switch
-                for next_path in self.pass_permission[path]:
-                    for k in range(len(self.points[next_path])): # self.pass_permission[j] shows the path we can switch from path j
-                        switching_points_distance = np.linalg.norm(
-                            self.points[path][switching_point]
-                            - self.points[next_path][k])
-                            
-                        if (
-                            switching_points_distance <= (self.lane_radius[path][switching_point] + self.lane_radius[next_path][k])*1.01 and switching_points_distance < shortest_dist_switch # this 1 percent is to compensate numerical calculation inaccuracies
-    
-                        ):
-                            shortest_dist_switch = switching_points_distance
-                            pass_vector = (
-                                self.points[path][switching_point]
-                                - self.points[next_path][k]
-                            )
-                            if np.linalg.norm(pass_vector)!=0:
-                                pass_vector = pass_vector / np.linalg.norm(pass_vector)
-                            
-                            self.adjacent_points[path].update(
-                                {switching_point: [k, next_path, pass_vector]} # each switching point in path j can just switch to one path, if we add the same key with different value, the last key with the last value would be considered
-                            )  # jth dictionary is {adj. point of path j: [point of next_path, next_path, vector from adj. point of path j to adj. point of next_path]}
+                for next_path in self.pass_permission[path]: # self.pass_permission[j] shows the path we can switch from path j
+                    # the nearest point of next_path is compiled in self.corridors if it is close enough to switch
+                    adjacent = self.corridors.adjacency_dict.get((path, switching_point, next_path))
+                    if adjacent is not None and adjacent[1] < shortest_dist_switch:
+                        shortest_dist_switch = adjacent[1]
+                        self.adjacent_points[path].update(
+                            {switching_point: [adjacent[0], next_path, adjacent[2]]} # each switching point in path j can just switch to one path
+                        )  # jth dictionary is {adj. point of path j: [point of next_path, next_path, vector from adj. point of path j to adj. point of next_path]}
+
+    def get_segment_tree(self, path):
+        if path not in self.segment_trees:
+            # only repeating paths have a segment from the last point back to the first point
+            self.segment_trees[path] = SegmentTree(self.points[path], self.repeat[path] == "REPEAT")
+        return self.segment_trees[path]
 
     def initial_nearest_point(self, swarm_telem) -> None:
-        lnitial_least_distance = math.inf
-        for i in range(len(self.points[self.current_path])):
-            range_to_point_i = np.linalg.norm(
-                np.array(swarm_telem[self.id].position_ned, dtype="float64")
-                - self.points[self.current_path][i]
-            )
-            if range_to_point_i <= lnitial_least_distance:
-                lnitial_least_distance = range_to_point_i
-                self.current_index = i
+        # the current index is the first point of the segment of the current path nearest to the drone,
+        # this is also used to re-acquire the corridor when the experiment is resumed
+        self.current_index, arc_length, distance = self.get_segment_tree(self.current_path).nearest(
+            swarm_telem[self.id].position_ned
+        )
 
     def switch(self, switching_point):
         print(self.id, 'switched from',self.current_path, "at index", self.current_index)
@@ -176,7 +152,13 @@ class Experiment:
         self.target_point = self.points[self.current_path][self.current_index]
         self.target_direction = self.directions[self.current_path][self.current_index]
 
-    def path_following(self, swarm_telem, max_speed, time_step, max_accel):
+    def path_following(self, swarm_telem, max_speed, time_step, max_accel, neighbour_grid=None, prediction_horizon=0.0):
+        # prediction_horizon: seconds the positions of the neighbours are extrapolated at most (swarm_telem is then a SwarmTelemetry), see SwarmTelemetry.predict_positions
+        profiler = self.profiler
+        if profiler is not None and not profiler.sample():
+            profiler = None # this call is not timed
+        if profiler is not None:
+            profiler.start()
         self.target_point = self.points[self.current_path][self.current_index]
         self.target_direction = self.directions[self.current_path][self.current_index]
         if (
@@ -200,6 +182,8 @@ class Experiment:
             if cos_of_angle >= 0.9:
                 self.switched_positions.append(np.array(swarm_telem[self.id].position_ned, dtype="float64"))
                 self.switch(self.current_index)
+        if profiler is not None:
+            profiler.lap(0) # switching
         # Finding the next bigger Index ----------
         dot_next_point = 0
             
@@ -224,6 +208,8 @@ class Experiment:
         self.target_direction = self.directions[self.current_path][
             self.current_index
         ]
+        if profiler is not None:
+            profiler.lap(1) # index advance
         # Calculating migration velocity (normalized)---------------------
         limit_v_migration = 1
         v_migration = self.target_direction / np.linalg.norm(self.target_direction)
@@ -259,6 +245,8 @@ class Experiment:
                 * limit_v_lane_cohesion
                 / np.linalg.norm(v_lane_cohesion)
             )
+        if profiler is not None:
+            profiler.lap(2) # migration and lane cohesion
         # Calculating v_rotation (normalized)---------------------
         limit_v_rotation = 1
         if lane_cohesion_position_error_magnitude==0 or self.lane_radius[self.current_path][self.current_index]==0:
@@ -287,38 +275,53 @@ class Experiment:
 
         if np.linalg.norm(v_rotation) > limit_v_rotation:
             v_rotation = v_rotation * limit_v_rotation / np.linalg.norm(v_rotation)
+        if profiler is not None:
+            profiler.lap(3) # rotation
         # Calculating v_separation (normalized) -----------------------------
         limit_v_separation = 5
-        r_conflict = 5
-        r_collision = 2.5
+        r_conflict = self.r_conflict
+        r_collision = self.r_collision
         v_separation = np.array([0, 0, 0], dtype="float64")
-        for key in swarm_telem:
-            if key == self.id:
-                continue
-            p = np.array(swarm_telem[key].position_ned, dtype="float64")
-            x = np.array(swarm_telem[self.id].position_ned, dtype="float64") - p
-            d = np.linalg.norm(x)
-            
+        if neighbour_grid is None:
+            neighbours = swarm_telem
+        else:
+            # only the drones in the cells around this drone can be closer than r_conflict, so the minimum distance is only found among them
+            neighbours = neighbour_grid.neighbours(swarm_telem[self.id].position_ned)
+        neighbours = [key for key in neighbours if key != self.id and key in swarm_telem]
+        if neighbours:
+            position = np.array(swarm_telem[self.id].position_ned, dtype="float64")
+            if prediction_horizon > 0:
+                # the neighbours have moved since their last telemetry was received, their positions are extrapolated to now with their velocities
+                predicted_positions = swarm_telem.predict_positions(neighbours, time.monotonic(), prediction_horizon)
+            else:
+                predicted_positions = np.array([swarm_telem[key].position_ned for key in neighbours], dtype="float64")
+            offsets = position - predicted_positions
+            distances = np.linalg.norm(offsets, axis=1)
+
             # finding the minimum distance
-            if d<=self.min_distance[0]:
-                self.min_distance[0]=d
+            closest = int(np.argmin(distances))
+            if distances[closest]<=self.min_distance[0]:
+                self.min_distance[0]=float(distances[closest])
                 self.min_distance[1]=self.id
-                self.min_distance[2]=key
-                self.min_distance[3]=np.array(swarm_telem[self.id].position_ned, dtype="float64")
-                self.min_distance[4]=np.array(swarm_telem[key].position_ned, dtype="float64")
-
-
-
-            if d <= r_conflict and d > r_collision and d != 0:
-                v_separation = v_separation + (
-                    (x / d) * (r_conflict - d / r_conflict - r_collision)
-                )
-            if d <= r_collision and d != 0:
-                v_separation = v_separation + 1 * (x / d)
-            if np.linalg.norm(v_separation) > limit_v_separation:
-                v_separation = (
-                    v_separation * limit_v_separation / np.linalg.norm(v_separation)
-                )
+                self.min_distance[2]=neighbours[closest]
+                self.min_distance[3]=position
+                self.min_distance[4]=predicted_positions[closest]
+
+            for n in np.flatnonzero(distances <= r_conflict): # the other neighbours do not change v_separation
+                x = offsets[n]
+                d = distances[n]
+                if d <= r_conflict and d > r_collision and d != 0:
+                    v_separation = v_separation + (
+                        (x / d) * (r_conflict - d / r_conflict - r_collision)
+                    )
+                if d <= r_collision and d != 0:
+                    v_separation = v_separation + 1 * (x / d)
+                if np.linalg.norm(v_separation) > limit_v_separation:
+                    v_separation = (
+                        v_separation * limit_v_separation / np.linalg.norm(v_separation)
+                    )
+        if profiler is not None:
+            profiler.lap(4) # separation
 
         # checking for start delay time
         if (swarm_telem[self.id].current_time-self.start_time <= self.start_delay and swarm_telem[self.id].current_time!=0): # if it is true, it is not the time to start the mission
@@ -359,4 +362,7 @@ class Experiment:
         output_vel = flocking.check_velocity(
             desired_vel, swarm_telem[self.id], max_speed, yaw, time_step, max_accel
         )
+        if profiler is not None:
+            profiler.lap(5) # combining the velocities and checking the velocity
+            profiler.finish()
         return output_vel
@@ -0,0 +1,106 @@
+import math
+import numpy as np
+
+# WGS-84 ellipsoid
+SEMIMAJOR_AXIS = 6378137.0
+SEMIMINOR_AXIS = 6356752.31424518
+ECCENTRICITY_SQUARED = 1 - (SEMIMINOR_AXIS / SEMIMAJOR_AXIS) ** 2
+
+
+class GeodeticConverter:
+    """
+    Converts between geodetic coordinates (degrees, meters above the WGS-84 ellipsoid) and NED
+    coordinates around a fixed origin. The ECEF position of the origin and the rotation from ECEF to
+    NED are calculated once, so each conversion only transforms the points. geodetic2ned and
+    ned2geodetic take scalars or arrays of any shape, geodetic2ned_scalar is a faster path for single
+    floats (e.g. one position fix of the onboard telemetry). Results match pymap3d.
+    """
+
+    def __init__(self, ref_lat, ref_lon, ref_alt):
+        self.ref_lat = ref_lat
+        self.ref_lon = ref_lon
+        self.ref_alt = ref_alt
+        self.origin = geodetic2ecef(ref_lat, ref_lon, ref_alt)
+        lat = math.radians(ref_lat)
+        lon = math.radians(ref_lon)
+        # rows are the north, east and down unit vectors in ECEF
+        self.rotation = np.array(
+            [
+                [-math.sin(lat) * math.cos(lon), -math.sin(lat) * math.sin(lon), math.cos(lat)],
+                [-math.sin(lon), math.cos(lon), 0.0],
+                [-math.cos(lat) * math.cos(lon), -math.cos(lat) * math.sin(lon), -math.sin(lat)],
+            ]
+        )
+        self.origin_tuple = tuple(self.origin.tolist())
+        self.rotation_tuple = tuple(tuple(row) for row in self.rotation.tolist())
+
+    def geodetic2ned(self, lat, lon, alt):
+        """
+        Returns
+        -----------
+        north, east, down: arrays with the shape of the inputs, in meters
+        """
+        ecef = geodetic2ecef(lat, lon, alt)
+        ecef -= self.origin.reshape((3,) + (1,) * (ecef.ndim - 1))
+        (north, east, down) = np.tensordot(self.rotation, ecef, axes=1)
+        return north, east, down
+
+    def geodetic2ned_scalar(self, lat, lon, alt):
+        # the same as geodetic2ned for floats, with the math module instead of arrays
+        lat = math.radians(lat)
+        lon = math.radians(lon)
+        sin_lat = math.sin(lat)
+        cos_lat = math.cos(lat)
+        n = SEMIMAJOR_AXIS / math.sqrt(1 - ECCENTRICITY_SQUARED * sin_lat * sin_lat)
+        x = (n + alt) * cos_lat * math.cos(lon) - self.origin_tuple[0]
+        y = (n + alt) * cos_lat * math.sin(lon) - self.origin_tuple[1]
+        z = (n * (1 - ECCENTRICITY_SQUARED) + alt) * sin_lat - self.origin_tuple[2]
+        (r_north, r_east, r_down) = self.rotation_tuple
+        return (
+            r_north[0] * x + r_north[1] * y + r_north[2] * z,
+            r_east[0] * x + r_east[1] * y,
+            r_down[0] * x + r_down[1] * y + r_down[2] * z,
+        )
+
+    def ned2geodetic(self, north, east, down):
+        """
+        Returns
+        -----------
+        lat, lon, alt: arrays with the shape of the inputs, in degrees and meters
+        """
+        ned = np.array(np.broadcast_arrays(north, east, down), dtype="float64")
+        ecef = np.tensordot(self.rotation.T, ned, axes=1) + self.origin.reshape((3,) + (1,) * (ned.ndim - 1))
+        return ecef2geodetic(ecef[0], ecef[1], ecef[2])
+
+
+def geodetic2ecef(lat, lon, alt):
+    # returns a (3, ...) array of ECEF x, y, z in meters
+    (lat, lon, alt) = np.broadcast_arrays(np.asarray(lat, dtype="float64"), lon, alt)
+    lat = np.radians(lat)
+    lon = np.radians(lon)
+    sin_lat = np.sin(lat)
+    cos_lat = np.cos(lat)
+    n = SEMIMAJOR_AXIS / np.sqrt(1 - ECCENTRICITY_SQUARED * sin_lat**2)  # radius of curvature of the prime vertical
+    return np.array(
+        [
+            (n + alt) * cos_lat * np.cos(lon),
+            (n + alt) * cos_lat * np.sin(lon),
+            (n * (1 - ECCENTRICITY_SQUARED) + alt) * sin_lat,
+        ]
+    )
+
+
+def ecef2geodetic(x, y, z, iterations=5):
+    # iterates the latitude from its geocentric value, which converges below a micro meter near the surface
+    lon = np.arctan2(y, x)
+    p = np.hypot(x, y)
+    lat = np.arctan2(z, p * (1 - ECCENTRICITY_SQUARED))
+    for i in range(iterations):
+        sin_lat = np.sin(lat)
+        n = SEMIMAJOR_AXIS / np.sqrt(1 - ECCENTRICITY_SQUARED * sin_lat**2)
+        alt = np.hypot(p, z + ECCENTRICITY_SQUARED * n * sin_lat) - n
+        lat = np.arctan2(z, p * (1 - ECCENTRICITY_SQUARED * n / (n + alt)))
+    sin_lat = np.sin(lat)
+    n = SEMIMAJOR_AXIS / np.sqrt(1 - ECCENTRICITY_SQUARED * sin_lat**2)
+    alt = np.hypot(p, z + ECCENTRICITY_SQUARED * n * sin_lat) - n
+    return np.degrees(lat), np.degrees(lon), alt
@@ -1,4 +1,7 @@
 import numpy as np
+from spatial_index import PointGrid
+
+GRID_SWARM_SIZE = 200  # above this number of agents, proximity_check only compares agents in neighbouring cells
 
 
 def alt_calc(alt_dict, site_elevation):
@@ -54,21 +57,46 @@ def proximity_check(swarm_telemetry, min_proximity):
     Returns
     -----------
     output_dict: List[[drone_index (string), drone_index (string), distance],[...]
+        each pair once, in the order of the keys
+    """
+    keys = list(swarm_telemetry.keys())
+    positions = np.array(
+        [swarm_telemetry[key].position_ned for key in keys], dtype="float64"
+    ).reshape(-1, 3)
+    (first, second, seperation) = close_pairs(positions, min_proximity)
+    return [
+        [keys[i], keys[j], distance]
+        for i, j, distance in zip(first.tolist(), second.tolist(), seperation.tolist())
+    ]
+
+
+def close_pairs(positions, min_proximity, use_grid=None):
+    """
+    Parameters
+    ------------
+    positions: (N,3) array
+    use_grid: compare only positions in neighbouring grid cells instead of all pairs,
+        by default for swarms of more than GRID_SWARM_SIZE agents
+
+    Returns
+    -----------
+    first, second, seperation: arrays of the pairs i < j closer than min_proximity, sorted by (i, j)
     """
-    swarm_positions = {}
-    output = []
-    for key in swarm_telemetry.keys():
-        swarm_positions[key] = np.array(swarm_telemetry[key].position_ned)
-
-    for key_1 in swarm_positions.keys():
-        for key_2 in swarm_positions.keys():
-            if key_1 == key_2:
-                continue
-            seperation = np.linalg.norm(swarm_positions[key_2] - swarm_positions[key_1])
-            if seperation < min_proximity and [key_2, key_1, seperation] not in output:
-                output.append([key_1, key_2, seperation])
-
-    return output
+    n = len(positions)
+    if use_grid is None:
+        use_grid = n > GRID_SWARM_SIZE
+    if use_grid:
+        (first, second) = PointGrid(positions, min_proximity).candidate_pairs(positions)
+        upper = first < second
+        (first, second) = (first[upper], second[upper])
+        order = np.lexsort((second, first))
+        (first, second) = (first[order], second[order])
+    else:
+        (first, second) = np.triu_indices(n, k=1)
+    vectors = positions[second] - positions[first]
+    seperation = np.sqrt(np.sum(vectors**2, axis=1))
+    close = seperation < min_proximity
+    return first[close], second[close], seperation[close]
 
 
 def create_swarm_dict(real_swarm_size, sitl_swarm_size):
@@ -10,10 +10,13 @@ import flocking
 from mavsdk import System
 from mavsdk.action import ActionError
 from mavsdk.offboard import OffboardError, VelocityNedYaw
-import pymap3d as pm
 from communication import DroneCommunication
 from data_structures import AgentTelemetry
 from experiment import Experiment
+from geodetic import GeodeticConverter
+from publish_rate import ProximityRate
+from rate_scheduler import FixedRateScheduler
+from stage_profiler import StageProfiler
 import math
 import gtools
 import numpy as np
@@ -22,13 +25,16 @@ from telemetry import SwarmManager, TelemetryUpdater
 
 # Class containing all methods for the drones.
 class Agent:
-    def __init__(self):
+    def __init__(self, parameters_file_path, swarm_manager=None, client=None):
+        # swarm_manager and client are shared by the agents of agent_host.py, each agent has its own by default
         # Open the json file where the config parameters are stored and read them
         print("opening json file")
-        with open(CONST_JSON_PATH, "r") as f:
+        self.parameters_file_path = parameters_file_path
+        with open(self.parameters_file_path, "r") as f:
             parameters = json.load(f)
         self.load_parameters(parameters)
-        self.swarm_manager = SwarmManager()
+        self.swarm_manager = swarm_manager if swarm_manager is not None else SwarmManager()
+        self.client = client
         self.swarm_manager.telemetry[self.id] = AgentTelemetry()
         self.current_experiment = "Same_level_vertiport"
         self.return_alt: float = 10
@@ -55,6 +61,7 @@ class Agent:
         self.comms = DroneCommunication(
             self,
             self.swarm_manager,
+            self.client,
         )
         asyncio.ensure_future(self.comms.run_comms())
         await asyncio.sleep(2)
@@ -71,6 +78,7 @@ class Agent:
         }
 
         # Bind the callbacks
+        event_loop = asyncio.get_running_loop()
         self.comms.bind_command_functions(command_functions, event_loop)
         self.telemetry_updater = TelemetryUpdater(
             self.id,
@@ -80,7 +88,19 @@ class Agent:
             event_loop,
             [self.ref_lat, self.ref_lon, self.ref_alt],
             self.download_ulog,
+            self.telemetry_format,
+            self.telemetry_rate,
+            ProximityRate(
+                self.id,
+                self.swarm_manager.telemetry,
+                self.telemetry_base_rate,
+                self.telemetry_heartbeat,
+                self.telemetry_proximity_factor,
+            ),
+            self.swarm_manager.neighbour_grid,
         )
+        # waiting for the first telemetry without blocking the other agents of agent_host.py
+        await asyncio.sleep(10)
 
     async def on_disconnect(self):
         print("connection lost, timeout in 5s")
@@ -101,19 +121,32 @@ class Agent:
         self.ref_lat: float = parameters["ref_lat"]
         self.ref_lon: float = parameters["ref_lon"]
         self.ref_alt: float = parameters["ref_alt"]
+        self.geodetic_converter = GeodeticConverter(self.ref_lat, self.ref_lon, self.ref_alt)
+        # "text" publishes each telemetry value on its own topic, "binary" publishes packets of telemetry_packet.py;
+        # only "binary" publishes one frame per tick, updated atomically on receipt (see README.md)
+        self.telemetry_format: str = parameters.get("telemetry_format", "text")
+        self.telemetry_rate: float = parameters.get("telemetry_rate", 10)  # frames per second in binary format, unused in text format
+        # with adaptive_telemetry, the telemetry is published at telemetry_base_rate while no other agent is within telemetry_proximity_factor * r_conflict
+        self.adaptive_telemetry: bool = parameters.get("adaptive_telemetry", False)
+        self.telemetry_base_rate: float = parameters.get("telemetry_base_rate", 2)  # publications per second of each topic
+        self.telemetry_heartbeat: float = parameters.get("telemetry_heartbeat", 1.0)  # longest time in seconds between two publications
+        self.telemetry_proximity_factor: float = parameters.get("telemetry_proximity_factor", 3)
+        self.loop_statistics_interval: float = parameters.get("loop_statistics_interval", 5)  # seconds between reports of the offboard loop timing
+        self.prediction_horizon: float = parameters.get("prediction_horizon", 0.5)  # seconds the positions of the other agents are extrapolated at most
+        self.profile_path_following: bool = parameters.get("profile_path_following", False)  # times the stages of path_following, reported with the loop timing
 
     def update_parameter(self, new_parameters_json):
 
         new_parameters = json.loads(new_parameters_json)
 
         # load old parameters and insert new ones
-        with open(CONST_JSON_PATH, "r") as f:
+        with open(self.parameters_file_path, "r") as f:
             parameters = json.load(f)
 
         for key in new_parameters.keys():
             parameters[key] = new_parameters[key]
         # write new parameters to file
-        with open(CONST_JSON_PATH, "w") as f:
+        with open(self.parameters_file_path, "w") as f:
             json.dump(parameters, f)
 
         self.load_parameters(parameters)
@@ -162,13 +195,10 @@ class Agent:
         await self.drone.action.hold()
         await asyncio.sleep(1)
 
-        (desired_lat, desired_lon, desired_alt) = pm.ned2geodetic(
+        (desired_lat, desired_lon, desired_alt) = self.geodetic_converter.ned2geodetic(
             desired_positions_ned[self.id][0],
             desired_positions_ned[self.id][1],
             desired_positions_ned[self.id][2],
-            self.ref_lat,
-            self.ref_lon,
-            self.ref_alt,
         )
 
         # Go to the deconflicted travel altitude
@@ -252,6 +282,11 @@ class Agent:
         self.experiment = Experiment(
             self.id, self.swarm_manager.telemetry, experiment_file_path
         )
+        self.swarm_manager.neighbour_grid.set_cell_size(self.experiment.r_conflict)
+        if self.adaptive_telemetry == True:
+            self.telemetry_updater.publish_rate.r_conflict = self.experiment.r_conflict
+        if self.profile_path_following == True:
+            self.experiment.profiler = StageProfiler()
 
         await asyncio.sleep(1)
 
@@ -286,12 +321,26 @@ class Agent:
 
         # Loop in which the velocity command outputs are generated
         self.experiment.start_time=self.swarm_manager.telemetry[self.id].current_time
+        # re-acquiring the corridor, the drone may have moved during a hold
+        self.experiment.initial_nearest_point(self.swarm_manager.telemetry)
+        # the telemetry of the other agents is applied at the start of each loop
+        self.swarm_manager.inbox.start_ticks()
+        try:
+            await self.follow_paths(offboard_loop_duration)
+        finally:
+            self.swarm_manager.inbox.stop_ticks()
+
+    async def follow_paths(self, offboard_loop_duration):
+        # the loop runs at a fixed rate, its timing statistics are reported every loop_statistics_interval seconds
+        scheduler = FixedRateScheduler(offboard_loop_duration)
+        report_ticks = max(1, round(self.loop_statistics_interval / offboard_loop_duration))
+        scheduler.start()
         # Calling method path_following
         while (
             self.comms.current_command == "Experiment"
             and self.experiment.ready_flag == True
         ):
-            offboard_loop_start_time = time.time()
+            self.swarm_manager.inbox.apply()
 
             await self.drone.offboard.set_velocity_ned(
                 self.experiment.path_following(
@@ -299,15 +348,32 @@ class Agent:
                     self.max_speed,
                     offboard_loop_duration,
                     10,
+                    self.swarm_manager.neighbour_grid,
+                    self.prediction_horizon,
                 )
             )
 
             await self.check_altitude()
 
             # Checking frequency of the loop
-            await asyncio.sleep(
-                offboard_loop_duration - (time.time() - offboard_loop_start_time)
-            )
+            await scheduler.wait()
+            if scheduler.ticks == report_ticks:
+                self.report_loop_statistics(scheduler)
+        self.report_loop_statistics(scheduler)
+
+    def report_loop_statistics(self, scheduler):
+        # publishes and logs the timing of the offboard loop since the last report
+        statistics = json.dumps(scheduler.statistics())
+        self.comms.client.publish(self.id + "/loop_statistics", statistics)
+        if self.logging == True:
+            self.logger.info("offboard loop: " + statistics)
+        scheduler.reset_statistics()
+        if self.experiment.profiler is not None:
+            # rolling percentiles of the stages of path_following over the last ticks
+            profile = json.dumps(self.experiment.profiler.summary())
+            self.comms.client.publish(self.id + "/path_following_profile", profile)
+            if self.logging == True:
+                self.logger.info("path following profile: " + profile)
 
     async def return_to_home(self):
         rtl_start_lat = self.swarm_manager.telemetry[self.id].geodetic[0]
@@ -381,14 +447,14 @@ def setup_logger(id):
     log_format = "%(levelname)s %(asctime)s - %(message)s"
     log_date = time.strftime("%d-%m-%y_%H-%M")
 
-    logging.basicConfig(
-        filename="logs/" + id + "_" + log_date + ".log",
-        filemode="w",
-        format=log_format,
-        level=logging.INFO,
-    )
+    # a logger and file for each agent, as agent_host.py runs several agents in one process
+    handler = logging.FileHandler("logs/" + id + "_" + log_date + ".log", mode="w")
+    handler.setFormatter(logging.Formatter(log_format))
 
-    logger = logging.getLogger()
+    logger = logging.getLogger(id)
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    logger.propagate = False
     return logger
 
 
@@ -425,8 +491,8 @@ if __name__ == "__main__":
     CONST_JSON_PATH = str(sys.argv[1])
     # CONST_JSON_PATH = "parameters.json"
     # Start the main function
-    agent = Agent()
-    asyncio.ensure_future(agent.run())
+    agent = Agent(CONST_JSON_PATH)
     # Runs the event loop until the program is canceled with e.g. CTRL-C
     event_loop = asyncio.get_event_loop()
+    asyncio.ensure_future(agent.run(), loop=event_loop)
     event_loop.run_forever()
@@ -0,0 +1,123 @@
+import argparse
+import csv
+import itertools
+import math
+import multiprocessing
+import numpy as np
+import corridor_cache
+from simulation import simulate
+from swarm_experiment import GAIN_ATTRIBUTES
+
+RESULT_NAMES = [
+    "min_separation",  # the least distance between two drones
+    "mean_lane_error",  # mean over all drones and samples of the distance from the lane
+    "max_completion_time",  # time the last drone passed the last point of a path, nan if one never did
+]
+
+
+def grid_combinations(values):
+    """
+    Parameters
+    ------------
+    values: Dict{name of a gain (string): List[value, ...]}
+
+    Returns
+    -----------
+    output: List[Dict{name of a gain: value}, ...] of every combination of the values
+    """
+    names = list(values.keys())
+    return [dict(zip(names, combination)) for combination in itertools.product(*values.values())]
+
+
+def random_combinations(ranges, sample_num, seed=0):
+    """
+    Parameters
+    ------------
+    ranges: Dict{name of a gain (string): [min, max]}
+    sample_num: number of combinations, each gain is sampled uniformly in its range
+
+    Returns
+    -----------
+    output: List[Dict{name of a gain: value}, ...]
+    """
+    rng = np.random.default_rng(seed)
+    samples = {name: rng.uniform(low, high, sample_num).tolist() for name, (low, high) in ranges.items()}
+    return [{name: samples[name][i] for name in ranges} for i in range(sample_num)]
+
+
+def run_combination(arguments):
+    # runs one simulation in a worker process and returns its row of the results table
+    (experiment_file_path, drone_num, simulation_time, dt, gains) = arguments
+    result = simulate(experiment_file_path, drone_num, simulation_time=simulation_time, dt=dt, gains=gains)
+    return [
+        result.min_separation,
+        float(np.mean(result.lane_error)),
+        float(np.max(result.completion_time)) if not np.any(np.isnan(result.completion_time)) else math.nan,
+    ]
+
+
+def sweep(experiment_file_path, combinations, drone_num, simulation_time=300, dt=0.1, output_CSV_file_dir=None, processes=None):
+    """
+    Runs the offline path following simulation of an experiment for each combination of gains
+    on a pool of processes.
+
+    Parameters
+    ------------
+    combinations: List[Dict{name in the experiment json (k_migration, k_seperation, r_conflict, ...): value}, ...],
+        see grid_combinations and random_combinations
+    output_CSV_file_dir: path of the csv file of the results table, not written if None
+    processes: number of processes, the number of CPUs if None
+
+    Returns
+    -----------
+    output: List[row, ...] of the results table, one row per combination in the same order:
+        the values of the gains followed by the values of RESULT_NAMES
+    """
+    names = sorted(set(name for gains in combinations for name in gains), key=list(GAIN_ATTRIBUTES).index)
+    # compiling the corridors once, the workers then share the memory mapped cache
+    corridor_cache.load(experiment_file_path)
+    tasks = [(experiment_file_path, drone_num, simulation_time, dt, gains) for gains in combinations]
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.map(run_combination, tasks, chunksize=max(1, len(tasks) // (4 * (processes or multiprocessing.cpu_count()))))
+
+    output = [[gains.get(name, math.nan) for name in names] + result for gains, result in zip(combinations, results)]
+    if output_CSV_file_dir is not None:
+        with open(output_CSV_file_dir, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(names + RESULT_NAMES)
+            writer.writerows(output)
+    return output
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweeps the gains of an experiment with the offline path following simulation")
+    parser.add_argument("experiment_file_path")
+    parser.add_argument("output_CSV_file_dir")
+    parser.add_argument("--drone_num", type=int, default=8)
+    parser.add_argument("--simulation_time", type=float, default=300)
+    parser.add_argument("--dt", type=float, default=0.1)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument(
+        "--gain", nargs="+", action="append", default=[], metavar=("NAME", "VALUE"),
+        help="values of a gain in the grid, for example --gain k_seperation 1 2 4",
+    )
+    parser.add_argument(
+        "--random", nargs=3, action="append", default=[], metavar=("NAME", "MIN", "MAX"),
+        help="range of a randomly sampled gain, used instead of the grid",
+    )
+    parser.add_argument("--sample_num", type=int, default=100)
+    args = parser.parse_args()
+
+    if args.random:
+        combinations = random_combinations({name: [float(low), float(high)] for name, low, high in args.random}, args.sample_num)
+    else:
+        combinations = grid_combinations({gain[0]: [float(value) for value in gain[1:]] for gain in args.gain})
+    sweep(
+        args.experiment_file_path,
+        combinations,
+        args.drone_num,
+        simulation_time=args.simulation_time,
+        dt=args.dt,
+        output_CSV_file_dir=args.output_CSV_file_dir,
+        processes=args.processes,
+    )
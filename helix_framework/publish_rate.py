@@ -0,0 +1,50 @@
+import math
+import time
+import numpy as np
+
+
+class ProximityRate:
+    """
+    Decides which telemetry updates of an agent are published. While another agent is within
+    proximity_factor * r_conflict, every update is published (the full rate of the telemetry streams).
+    Otherwise each topic is published at base_rate, and at least every heartbeat seconds so the other
+    agents still see the agent when base_rate is 0. Until r_conflict is set (by the experiment), every
+    update is published.
+        id: id of the agent
+        swarm_telem: SwarmTelemetry of the swarm
+        base_rate: publications per second of each topic without a close agent
+        heartbeat: longest time in seconds between two publications of a topic
+        proximity_factor: multiple of r_conflict within which another agent is close
+    """
+
+    def __init__(self, id, swarm_telem, base_rate=2, heartbeat=1.0, proximity_factor=3):
+        self.id = id
+        self.swarm_telem = swarm_telem
+        self.proximity_factor = proximity_factor
+        self.r_conflict = None
+        self.interval = heartbeat if base_rate <= 0 else min(1 / base_rate, heartbeat)
+        self.last_published = {}  # {topic: time.monotonic() of the last publication}
+        self.published = 0
+        self.skipped = 0  # updates not published as no other agent was close
+
+    def close_agent(self):
+        # True if another agent is within proximity_factor * r_conflict
+        if self.r_conflict is None:
+            return True
+        n = len(self.swarm_telem)
+        if n < 2 or self.id not in self.swarm_telem:
+            return False
+        slot = self.swarm_telem.slots[self.id]
+        distances = np.linalg.norm(self.swarm_telem.position_ned[:n] - self.swarm_telem.position_ned[slot], axis=1)
+        distances[slot] = math.inf
+        return bool(np.any(distances <= self.proximity_factor * self.r_conflict))
+
+    def due(self, topic):
+        # True if the current update of topic is published
+        now = time.monotonic()
+        if now - self.last_published.get(topic, -math.inf) < self.interval and not self.close_agent():
+            self.skipped += 1
+            return False
+        self.last_published[topic] = now
+        self.published += 1
+        return True
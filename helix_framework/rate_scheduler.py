@@ -0,0 +1,89 @@
+import asyncio
+import bisect
+import math
+import time
+
+JITTER_EDGES = [0, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1]  # seconds a tick starts after its deadline
+COMPUTE_EDGES = [0, 0.1, 0.25, 0.5, 0.75, 1, 1.5, 2]  # compute time of a tick as a fraction of the period
+
+
+class FixedRateScheduler:
+    """
+    Runs a loop at a fixed rate with absolute deadlines on the monotonic clock, so the rate does not drift
+    with the compute time of the ticks. A tick which overruns its period starts the next tick at once and
+    the deadlines it missed are skipped, keeping the phase of the loop. Records the compute time and the
+    jitter (delay of the start of a tick after its deadline) of each tick in histograms with the edges
+    JITTER_EDGES and COMPUTE_EDGES, the last bin of each is for larger values.
+        period: seconds between the starts of two ticks
+    Usage:
+        scheduler.start()
+        while ...:
+            (compute)
+            await scheduler.wait()
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self.deadline = None
+        self.tick_start = None
+        self.reset_statistics()
+
+    def reset_statistics(self):
+        self.ticks = 0
+        self.overruns = 0  # ticks whose compute time was longer than the period
+        self.missed_deadlines = 0  # deadlines skipped because of overruns
+        self.compute_time_sum = 0.0
+        self.compute_time_max = 0.0
+        self.jitter_sum = 0.0
+        self.jitter_max = 0.0
+        self.compute_histogram = [0] * len(COMPUTE_EDGES)
+        self.jitter_histogram = [0] * len(JITTER_EDGES)
+
+    def start(self):
+        # the first tick starts now
+        self.tick_start = time.monotonic()
+        self.deadline = self.tick_start
+
+    async def wait(self):
+        # records the tick which just finished and sleeps until the deadline of the next tick
+        now = time.monotonic()
+        compute_time = now - self.tick_start
+        self.ticks += 1
+        self.compute_time_sum += compute_time
+        self.compute_time_max = max(self.compute_time_max, compute_time)
+        self.compute_histogram[bisect.bisect_right(COMPUTE_EDGES, compute_time / self.period) - 1] += 1
+
+        self.deadline += self.period
+        if now > self.deadline:
+            self.overruns += 1
+            missed = math.floor((now - self.deadline) / self.period)
+            self.missed_deadlines += missed
+            self.deadline += missed * self.period  # the latest deadline which has passed, the next tick starts at once
+        else:
+            await asyncio.sleep(self.deadline - now)
+
+        self.tick_start = time.monotonic()
+        jitter = max(0.0, self.tick_start - self.deadline)
+        self.jitter_sum += jitter
+        self.jitter_max = max(self.jitter_max, jitter)
+        self.jitter_histogram[bisect.bisect_right(JITTER_EDGES, jitter) - 1] += 1
+
+    def statistics(self):
+        """
+        Returns
+        -----------
+        Dict of the statistics since the last reset_statistics, times in seconds
+        """
+        ticks = max(self.ticks, 1)
+        return {
+            "period": self.period,
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "missed_deadlines": self.missed_deadlines,
+            "compute_time_mean": self.compute_time_sum / ticks,
+            "compute_time_max": self.compute_time_max,
+            "jitter_mean": self.jitter_sum / ticks,
+            "jitter_max": self.jitter_max,
+            "compute_histogram": {"edges": COMPUTE_EDGES, "counts": list(self.compute_histogram)},
+            "jitter_histogram": {"edges": JITTER_EDGES, "counts": list(self.jitter_histogram)},
+        }
@@ -0,0 +1,124 @@
+from __future__ import annotations
+import math
+import numpy as np
+from geodetic import GeodeticConverter
+from swarm_experiment import SwarmExperiment
+
+
+class SimulationResult:
+    """
+    Output of simulate. Positions are NED, rows of the per-drone arrays are in the order of drone_ids.
+
+    time: (steps,) time of each sample in seconds
+    positions: (steps, N, 3) position of each drone at each sample
+    lane_error: (steps, N) distance of each drone from the surface of its lane (from its radius around the corridor)
+    min_separation: the least distance between two drones during the simulation
+    min_separation_time: time of min_separation
+    min_separation_drones: [id, id] of the two closest drones
+    switch_events: List[[time, id, previous path, next path, position], ...] in the order they happened
+    completion_time: (N,) time each drone passed the last point of a path for the first time, nan if never
+    swarm_experiment: SwarmExperiment (object) after the last step
+    """
+
+    def __init__(self, drone_ids, time, positions, lane_error):
+        self.drone_ids = drone_ids
+        self.time = time
+        self.positions = positions
+        self.lane_error = lane_error
+        self.min_separation = math.inf
+        self.min_separation_time = math.nan
+        self.min_separation_drones = [None, None]
+        self.switch_events = []
+        self.completion_time = np.full(len(drone_ids), math.nan)
+        self.swarm_experiment = None
+
+    def mean_lane_error(self):
+        return np.mean(self.lane_error, axis=0)
+
+    def max_lane_error(self):
+        return np.max(self.lane_error, axis=0)
+
+    def geodetic_positions(self, ref_lat, ref_lon, ref_alt):
+        # returns (steps, N, 3) latitudes, longitudes and altitudes of the positions around a geodetic origin
+        (lat, lon, alt) = GeodeticConverter(ref_lat, ref_lon, ref_alt).ned2geodetic(
+            self.positions[:, :, 0], self.positions[:, :, 1], self.positions[:, :, 2]
+        )
+        return np.stack([lat, lon, alt], axis=2)
+
+
+def simulate(experiment_file_path, drone_num, simulation_time=300, dt=0.1, max_speed=5, gains=None):
+    """
+    Runs the path following of an experiment for a swarm of drones without any rendering. Drones start
+    at their pre start positions and move with their target velocities, which are zero until the
+    start delay of each drone.
+
+    Parameters
+    ------------
+    experiment_file_path: path to the json file of the experiment
+    drone_num: number of drones, named S001, S002, ...
+    simulation_time: duration in seconds
+    dt: time step in seconds
+    gains: Dict{name in the experiment json (k_migration, r_conflict, ...): value} overriding the json
+
+    Returns
+    -----------
+    output: SimulationResult (object)
+    """
+    drone_ids = ["S" + str(n + 1).zfill(3) for n in range(drone_num)]
+    swarm_experiment = SwarmExperiment(drone_ids, experiment_file_path)
+    if gains:
+        swarm_experiment.set_gains(gains)
+    steps = int(round(simulation_time / dt)) + 1
+    rows = np.arange(drone_num)
+    result = SimulationResult(
+        drone_ids,
+        np.round(dt * np.arange(1, steps + 1), 3),
+        np.zeros((steps, drone_num, 3), dtype="float64"),
+        np.zeros((steps, drone_num), dtype="float64"),
+    )
+    result.swarm_experiment = swarm_experiment
+
+    paths = np.zeros((steps, drone_num), dtype="int64")  # path and index of each drone at each sample
+    indices = np.zeros((steps, drone_num), dtype="int64")
+    passed_last_point = np.zeros((steps, drone_num), dtype=bool)  # if each drone has passed the last point of its path
+    initial_path = swarm_experiment.current_path.copy()
+    positions = swarm_experiment.get_pre_start_positions()
+    start_delay = swarm_experiment.start_delay / 1000000  # in seconds
+    last_start = np.max(start_delay)
+    for (step, t) in enumerate(result.time.tolist()):
+        velocities = swarm_experiment.path_following(positions, max_speed)
+        if t <= last_start:
+            velocities[t <= start_delay] = 0
+        velocities *= dt
+        positions = np.add(positions, velocities, out=result.positions[step])
+
+        path = swarm_experiment.current_path
+        paths[step] = path
+        indices[step] = swarm_experiment.current_index
+        passed_last_point[step] = swarm_experiment.passed_last_point[rows, path]
+
+        # the distances of path following are of the positions before the step
+        n = swarm_experiment.min_distance.argmin()
+        if swarm_experiment.min_distance[n] < result.min_separation:
+            result.min_separation = swarm_experiment.min_distance[n]
+            result.min_separation_time = round(t - dt, 3)
+            result.min_separation_drones = [drone_ids[n], drone_ids[swarm_experiment.min_distance_drone[n]]]
+
+    # each change of path is a switch, the positions of the switches of each drone are in order
+    previous_paths = np.concatenate([initial_path[None, :], paths[:-1]])
+    switched_positions = [iter(p) for p in swarm_experiment.switched_positions]
+    for (step, n) in zip(*np.nonzero(paths != previous_paths)):
+        result.switch_events.append(
+            [result.time[step], drone_ids[n], int(previous_paths[step, n]), int(paths[step, n]), next(switched_positions[n])]
+        )
+    completed = np.any(passed_last_point, axis=0)
+    result.completion_time[completed] = result.time[np.argmax(passed_last_point, axis=0)[completed]]
+
+    # distance from the lane, the same position error as path following
+    target_direction = swarm_experiment.directions[paths, indices]
+    position_error = swarm_experiment.points[paths, indices] - result.positions
+    position_error -= np.sum(position_error * target_direction, axis=2)[:, :, None] * target_direction
+    result.lane_error[:] = np.abs(
+        np.linalg.norm(position_error, axis=2) - swarm_experiment.lane_radius[paths, indices]
+    )
+    return result
@@ -7,7 +7,6 @@ import sys
 import subprocess
 import threading
 from tkinter.constants import N
-import mavsdk
 import os
 import signal
 import asyncio
@@ -18,6 +17,7 @@ from tkinter import filedialog
 from tkinter import messagebox
 import paho.mqtt.client as mqtt
 from communication import GroundCommunication
+from sitl_launcher import SitlLauncher
 
 
 class App:
@@ -36,8 +36,7 @@ class App:
             "Another type of Flocking",
         ]
         self.gazebo_process = None
-        self.mavsdk_process = [None]
-        self.script_process = [None]
+        self.launcher = None
 
         # This is the section of code which creates the main window
         master.rowconfigure(tuple(range(2)), minsize=100)
@@ -271,8 +270,7 @@ class App:
         else:
             tk.messagebox.showinfo("Error", "Please enter an Int")
         self.start_gazebo()
-        self.start_mavsdk_servers()
-        self.start_scripts()
+        self.start_launcher_thread()
 
     def on_click_select(self):
         print("select")
@@ -298,12 +296,8 @@ class App:
         self.start_gazebo()
 
     def on_click_relaunch_scripts(self):
-        if self.script_process != None:
-            sig = signal.SIGTERM
-            for i in range(0, len(self.script_process)):
-                os.killpg(os.getpgid(self.script_process[i].pid), sig)
-
-        self.start_scripts()
+        if self.launcher != None:
+            self.launcher.restart_scripts()
 
     def on_click_confirm(self):
         # set new swarm size and then restart comms thread
@@ -362,34 +356,13 @@ class App:
             preexec_fn=os.setsid,
         )  # last argument important to allow process to be killed
 
-    def start_mavsdk_servers(self):
-        self.mavsdk_process = [None] * self.sitl_swarm_size
-        for i in range(0, self.sitl_swarm_size):
-            self.mavsdk_process[i] = subprocess.Popen(
-                [
-                    "./mavsdk_server",
-                    "-p",
-                    str(50041 + i),
-                    "udp://:" + str(14540 + i),
-                ],
-                cwd=os.path.split(mavsdk.__file__)[0] + "/bin",
-                stdin=None,
-                stdout=None,
-                stderr=None,
-                preexec_fn=os.setsid,
-            )
-
-    def start_scripts(self):
-        self.script_process = [None] * self.sitl_swarm_size
-        for i in range(0, self.sitl_swarm_size):
-            self.script_process[i] = subprocess.Popen(
-                [
-                    sys.executable,
-                    "onboard.py",
-                ],
-                cwd=os.getcwd(),
-                preexec_fn=os.setsid,
-            )
+    # Start the mavsdk servers and the scripts of the drones in a new thread, each script starts once its server is ready
+    def start_launcher_thread(self):
+        if self.launcher != None:
+            self.launcher.stop()
+        self.launcher = SitlLauncher(self.sitl_swarm_size)
+        self.launcher_thread = threading.Thread(target=self.launcher.launch, daemon=True)
+        self.launcher_thread.start()
 
     def generate_status_elements(self):
         if self.status_element_frame != {}:
@@ -518,9 +491,8 @@ class App:
         if self.gazebo_process != None:
             sig = signal.SIGTERM
             os.killpg(os.getpgid(self.gazebo_process.pid), sig)
-            for i in range(0, len(self.script_process)):
-                os.killpg(os.getpgid(self.mavsdk_process[i].pid), sig)
-                os.killpg(os.getpgid(self.script_process[i].pid), sig)
+        if self.launcher != None:
+            self.launcher.stop()
         root.destroy()
 
 
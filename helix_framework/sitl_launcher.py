@@ -0,0 +1,133 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import mavsdk
+
+GRPC_BASE_PORT = 50041  # gRPC port of the mavsdk_server of the first drone
+UDP_BASE_PORT = 14540  # MAVLink UDP port of the first PX4 SITL instance
+HELIX_FRAMEWORK_PATH = os.path.dirname(os.path.abspath(__file__))
+
+
+def tcp_port_open(port, host="localhost", timeout=0.2):
+    # True if a server accepts connections on the port
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+class SitlLauncher:
+    """
+    Starts the mavsdk_server of every SITL drone at once and starts the onboard.py script of each drone
+    as soon as its own backend is ready, instead of waiting a fixed time for all of them. A mavsdk_server
+    is ready when it accepts connections on its gRPC port, which it opens after binding its MAVLink UDP
+    port, once it has discovered its PX4 instance. The UDP port is not probed, binding it even briefly
+    could take it from a mavsdk_server which is starting.
+        sitl_swarm_size: number of drones, drone i uses the ports grpc_base_port + i and udp_base_port + i
+            and SITL_Parameters/S00<i+1>_parameters.json
+        timeout: seconds to wait for the backends, the drones which are not ready are reported by launch
+        poll_interval: seconds between two readiness checks of the waiting drones
+    launch may run in a background thread (see sitl_gui.py) while restart_scripts and stop are called
+    from another thread, the processes are only started and killed while holding the lock.
+    """
+
+    def __init__(self, sitl_swarm_size, timeout=300, poll_interval=0.1, grpc_base_port=GRPC_BASE_PORT, udp_base_port=UDP_BASE_PORT):
+        self.sitl_swarm_size = sitl_swarm_size
+        self.grpc_base_port = grpc_base_port
+        self.udp_base_port = udp_base_port
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.mavsdk_process = []
+        self.script_process = {}  # {number of drone: onboard.py process} of the drones whose backend was ready
+        self.stopped = False
+        self.lock = threading.Lock()
+
+    def start_mavsdk_server(self, i):
+        return subprocess.Popen(
+            [
+                "./mavsdk_server",
+                "-p",
+                str(self.grpc_base_port + i),
+                "udp://:" + str(self.udp_base_port + i),
+            ],
+            cwd=os.path.split(mavsdk.__file__)[0] + "/bin",
+            stdin=None,
+            stdout=None,
+            stderr=None,
+            preexec_fn=os.setsid,
+        )  # last argument important to allow process to be killed
+
+    def start_script(self, i):
+        return subprocess.Popen(
+            [
+                sys.executable,
+                "onboard.py",
+                "SITL_Parameters/S" + str(i + 1).zfill(3) + "_parameters.json",
+            ],
+            cwd=HELIX_FRAMEWORK_PATH,
+            preexec_fn=os.setsid,
+        )
+
+    def is_ready(self, i):
+        return tcp_port_open(self.grpc_base_port + i)
+
+    def launch(self):
+        """
+        Starts all mavsdk_servers, then polls the waiting drones and starts the script of each drone
+        when its backend is ready
+        Returns
+        -----------
+        waiting: List[number of a drone, ...] whose backend was not ready before the timeout or stop
+        """
+        with self.lock:
+            self.stopped = False
+            self.mavsdk_process = [self.start_mavsdk_server(i) for i in range(self.sitl_swarm_size)]
+            self.script_process = {}
+        waiting = list(range(self.sitl_swarm_size))
+        deadline = time.monotonic() + self.timeout
+        while waiting and not self.stopped and time.monotonic() < deadline:
+            for i in [i for i in waiting if self.is_ready(i)]:
+                with self.lock:
+                    if self.stopped:
+                        break
+                    self.script_process[i] = self.start_script(i)
+                waiting.remove(i)
+                print("S" + str(i + 1).zfill(3) + " backend ready, script started")
+            if waiting:
+                time.sleep(self.poll_interval)
+        if waiting and not self.stopped:
+            print("Backends not ready after", self.timeout, "s:", ["S" + str(i + 1).zfill(3) for i in waiting])
+        return waiting
+
+    def restart_scripts(self):
+        # the backends stay up, so the scripts of the drones whose backend was ready are started again without waiting
+        with self.lock:
+            started = list(self.script_process)
+            self.kill_scripts()
+            self.script_process = {i: self.start_script(i) for i in started}
+
+    def stop_scripts(self):
+        with self.lock:
+            self.kill_scripts()
+
+    def kill_scripts(self):
+        # called with the lock
+        for process in self.script_process.values():
+            if process.poll() is None:
+                os.killpg(os.getpgid(process.pid), signal.SIGTERM)
+        self.script_process = {}
+
+    def stop(self):
+        # stops the launch and kills all processes started by it
+        with self.lock:
+            self.stopped = True
+            self.kill_scripts()
+            for process in self.mavsdk_process:
+                if process.poll() is None:
+                    os.killpg(os.getpgid(process.pid), signal.SIGTERM)
+            self.mavsdk_process = []
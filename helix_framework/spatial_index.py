@@ -0,0 +1,205 @@
+import itertools
+import math
+import threading
+import numpy as np
+
+
+class NeighbourGrid:
+    """
+    Uniform grid of cubic cells holding the ids of the agents inside each cell. With the cell size
+    equal to r_conflict, all agents closer than r_conflict to a position are in the 27 cells around it.
+    Positions are updated one agent at a time as telemetry arrives, from any thread.
+    """
+
+    def __init__(self, cell_size=5):
+        self.cell_size = cell_size
+        self.cells = {}  # {cell (tuple): set of agent ids}
+        self.agent_cells = {}  # {agent id: cell (tuple)}
+        self.positions = {}  # {agent id: last position}
+        self.lock = threading.Lock()
+
+    def get_cell(self, position):
+        return (
+            math.floor(position[0] / self.cell_size),
+            math.floor(position[1] / self.cell_size),
+            math.floor(position[2] / self.cell_size),
+        )
+
+    def update(self, agent, position):
+        cell = self.get_cell(position)
+        with self.lock:
+            self.positions[agent] = position
+            previous_cell = self.agent_cells.get(agent)
+            if previous_cell == cell:
+                return
+            if previous_cell is not None:
+                self.cells[previous_cell].discard(agent)
+                if not self.cells[previous_cell]:
+                    del self.cells[previous_cell]
+            self.cells.setdefault(cell, set()).add(agent)
+            self.agent_cells[agent] = cell
+
+    def remove(self, agent):
+        with self.lock:
+            cell = self.agent_cells.pop(agent, None)
+            self.positions.pop(agent, None)
+            if cell is not None:
+                self.cells[cell].discard(agent)
+                if not self.cells[cell]:
+                    del self.cells[cell]
+
+    def set_cell_size(self, cell_size):
+        # rebuilds the grid with a new cell size
+        with self.lock:
+            if cell_size == self.cell_size:
+                return
+            self.cell_size = cell_size
+            self.cells = {}
+            for agent, position in self.positions.items():
+                cell = self.get_cell(position)
+                self.cells.setdefault(cell, set()).add(agent)
+                self.agent_cells[agent] = cell
+
+    def neighbours(self, position):
+        """
+        Returns
+        -----------
+        output: List[agent id (string), ...] of the agents in the cell of position and the 26 cells around it
+        """
+        (i, j, k) = self.get_cell(position)
+        output = []
+        with self.lock:
+            for di in (-1, 0, 1):
+                for dj in (-1, 0, 1):
+                    for dk in (-1, 0, 1):
+                        cell = self.cells.get((i + di, j + dj, k + dk))
+                        if cell:
+                            output.extend(cell)
+        return output
+
+
+class PointGrid:
+    """
+    Fixed points sorted by the cubic cell they are in, so the points near many query positions
+    can be found at once with binary searches instead of comparing every query with every point.
+    """
+
+    def __init__(self, points, cell_size):
+        self.points = np.asarray(points, dtype="float64").reshape(-1, 3)
+        self.cell_size = cell_size if cell_size > 0 else 1
+        cells = np.floor(self.points / self.cell_size).astype("int64")
+        # cells are shifted by one and the grid is one cell bigger on each side, so the
+        # neighbouring cells of any point have a unique key
+        self.origin = cells.min(axis=0) - 1 if len(cells) else np.zeros(3, dtype="int64")
+        self.shape = cells.max(axis=0) - self.origin + 2 if len(cells) else np.ones(3, dtype="int64")
+        keys = self.get_keys(cells)
+        self.order = np.argsort(keys, kind="stable")
+        self.keys = keys[self.order]
+
+    def get_keys(self, cells):
+        cells = cells - self.origin
+        return (cells[:, 0] * self.shape[1] + cells[:, 1]) * self.shape[2] + cells[:, 2]
+
+    def candidate_pairs(self, queries):
+        """
+        Parameters
+        ------------
+        queries: (Q,3) array of positions inside the grid
+
+        Returns
+        -----------
+        query_index, point_index: arrays of all pairs of a query and a point in the same or a
+            neighbouring cell, which contain every point closer than cell_size to the query
+        """
+        queries = np.asarray(queries, dtype="float64").reshape(-1, 3)
+        cells = np.floor(queries / self.cell_size).astype("int64")
+        query_index = []
+        point_index = []
+        for offset in itertools.product((-1, 0, 1), repeat=3):
+            keys = self.get_keys(cells + np.array(offset, dtype="int64"))
+            start = np.searchsorted(self.keys, keys, side="left")
+            counts = np.searchsorted(self.keys, keys, side="right") - start
+            total = np.sum(counts)
+            if total == 0:
+                continue
+            # positions of all found points in the sorted keys, range start[q] to start[q]+counts[q] for each query q
+            first = np.cumsum(counts) - counts
+            sorted_index = np.arange(total) - np.repeat(first - start, counts)
+            query_index.append(np.repeat(np.arange(len(queries)), counts))
+            point_index.append(self.order[sorted_index])
+        if not query_index:
+            return np.zeros(0, dtype="int64"), np.zeros(0, dtype="int64")
+        return np.concatenate(query_index), np.concatenate(point_index)
+
+
+class SegmentTree:
+    """
+    Bounding volume hierarchy over the segments of a path. Finds the nearest segment to a position
+    by visiting only the boxes which can be nearer than the nearest segment found so far.
+    """
+
+    def __init__(self, points, closed, leaf_size=4):
+        points = np.asarray(points, dtype="float64").reshape(-1, 3)
+        if closed:  # the last segment goes from the last point back to the first point
+            ends = np.roll(points, -1, axis=0)
+        else:
+            ends = points[1:]
+            points = points[:-1]
+        self.starts = points
+        self.vectors = ends - points
+        self.lengths = np.linalg.norm(self.vectors, axis=1)
+        self.arc_lengths = np.cumsum(self.lengths) - self.lengths  # arc length at the start of each segment
+        self.squared_lengths = self.lengths**2
+        box_min = np.minimum(points, ends)
+        box_max = np.maximum(points, ends)
+
+        # nodes are [box min, box max, left child, right child, segments of a leaf]
+        self.nodes = []
+        if len(points) == 0:
+            return
+        stack = [(np.arange(len(points)), None, 0)]
+        while stack:
+            (segments, parent, side) = stack.pop()
+            node = [box_min[segments].min(axis=0), box_max[segments].max(axis=0), None, None, None]
+            self.nodes.append(node)
+            if parent is not None:
+                parent[2 + side] = len(self.nodes) - 1
+            if len(segments) <= leaf_size:
+                node[4] = segments
+                continue
+            # splitting at the median centre along the longest side of the box
+            axis = np.argmax(node[1] - node[0])
+            centres = box_min[segments, axis] + box_max[segments, axis]
+            order = segments[np.argsort(centres, kind="stable")]
+            stack.append((order[: len(order) // 2], node, 0))
+            stack.append((order[len(order) // 2 :], node, 1))
+
+    def nearest(self, position):
+        """
+        Returns
+        -----------
+        segment: index of the nearest segment (the index of its first point)
+        arc_length: distance along the path from its first point to the projection of position
+        distance: distance from position to the nearest segment
+        """
+        position = np.asarray(position, dtype="float64")
+        best = [math.inf, 0, 0.0]  # [distance, segment, arc length]
+        stack = [0] if self.nodes else []
+        while stack:
+            node = self.nodes[stack.pop()]
+            box_distance = np.linalg.norm(np.maximum(np.maximum(node[0] - position, position - node[1]), 0))
+            if box_distance >= best[0]:
+                continue
+            if node[4] is None:
+                stack.extend(node[2:4])
+                continue
+            segments = node[4]
+            relative = position - self.starts[segments]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                t = np.sum(relative * self.vectors[segments], axis=1) / self.squared_lengths[segments]
+            t = np.clip(np.nan_to_num(t), 0, 1)  # zero length segments are their first point
+            distances = np.linalg.norm(relative - t[:, None] * self.vectors[segments], axis=1)
+            n = np.argmin(distances)
+            if distances[n] < best[0] or (distances[n] == best[0] and segments[n] < best[1]):
+                best = [distances[n], segments[n], self.arc_lengths[segments[n]] + t[n] * self.lengths[segments[n]]]
+        return int(best[1]), best[2], best[0]
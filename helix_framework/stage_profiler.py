@@ -0,0 +1,80 @@
+from time import perf_counter
+import numpy as np
+
+# stages of Experiment.path_following in the order they run
+STAGES = [
+    "switching",  # checking if the drone can switch to another path
+    "index_advance",  # finding the next point of the path
+    "lane_cohesion",  # migration and lane cohesion velocities
+    "rotation",
+    "separation",
+    "check_velocity",  # combining the velocities and flocking.check_velocity
+]
+PERCENTILES = [50, 90, 99]
+
+
+class StageProfiler:
+    """
+    Times the stages of a function called in a loop, keeping the times of the last window timed calls
+    from which rolling percentiles are calculated. Only one call in sample_every is timed, the timing of
+    a call (about a micro second) is then spread over sample_every calls. A timed call marks its start
+    with start and the end of each stage, in order, with lap; finish records the call.
+        stages: List[name of stage (string), ...]
+        window: number of timed calls kept for the percentiles
+        sample_every: one call in sample_every is timed
+    Usage:
+        if profiler.sample():
+            profiler.start()
+            (stage 0)
+            profiler.lap(0)
+            ...
+            profiler.finish()
+    """
+
+    def __init__(self, stages=STAGES, window=300, sample_every=4):
+        self.stages = stages
+        self.window = window
+        self.sample_every = sample_every
+        self.records = [None] * window  # ring buffer of the marks of the timed calls
+        self.calls = 0  # calls timed since the start
+        self.countdown = 0
+        self.marks = [0.0] * (len(stages) + 1)  # perf_counter at the start and at the end of each stage
+
+    def sample(self):
+        # returns True if this call is timed
+        if self.countdown > 0:
+            self.countdown -= 1
+            return False
+        self.countdown = self.sample_every - 1
+        return True
+
+    def start(self):
+        self.marks[0] = perf_counter()
+
+    def lap(self, stage):
+        self.marks[stage + 1] = perf_counter()
+
+    def finish(self):
+        self.records[self.calls % self.window] = self.marks
+        self.calls += 1
+        self.marks = [0.0] * (len(self.stages) + 1)
+
+    def summary(self):
+        """
+        Returns
+        -----------
+        Dict{"calls": number of timed calls, name of stage or "total": Dict{"p50", "p90", "p99", "max": micro seconds}}
+            over the last window timed calls
+        """
+        output = {"calls": self.calls, "sample_every": self.sample_every}
+        if self.calls == 0:
+            return output
+        marks = np.array(self.records[: min(self.calls, self.window)], dtype="float64")
+        times = np.diff(marks, axis=1)
+        times = np.column_stack([times, marks[:, -1] - marks[:, 0]]) * 1e6
+        percentiles = np.percentile(times, PERCENTILES, axis=0)
+        maxima = times.max(axis=0)
+        for n, stage in enumerate(self.stages + ["total"]):
+            output[stage] = {"p" + str(p): float(percentiles[k, n]) for k, p in enumerate(PERCENTILES)}
+            output[stage]["max"] = float(maxima[n])
+        return output
@@ -0,0 +1,305 @@
+from __future__ import annotations
+import math
+import numpy as np
+from experiment import Experiment
+
+# {name of a gain in the experiment json: attribute of SwarmExperiment}
+GAIN_ATTRIBUTES = {
+    "k_migration": "k_migration",
+    "k_lane_cohesion": "k_lane_cohesion",
+    "k_rotation": "k_rotation",
+    "k_seperation": "k_separation",
+    "r_conflict": "r_conflict",
+    "r_collision": "r_collision",
+}
+
+
+class SwarmExperiment:
+    """
+    Path following for a whole swarm at once. The geometry of the experiment is loaded a single
+    time and the velocities of all drones are calculated with array operations, so offline tools
+    can call path_following once per tick instead of once per drone.
+
+    The terms follow Experiment.path_following. The only difference is that the separation term
+    of a drone is limited once after summing all neighbours instead of after each neighbour.
+    """
+
+    def __init__(self, drone_ids, experiment_file_path) -> None:
+        self.ids = list(drone_ids)
+        self.drone_num = len(self.ids)
+        self.start_time = 0
+        # the geometry is shared by all drones, so it is loaded once
+        self.experiment = Experiment(self.ids[0], None, experiment_file_path)
+        self.k_migration = self.experiment.k_migration
+        self.k_lane_cohesion = self.experiment.k_lane_cohesion
+        self.k_rotation = self.experiment.k_rotation
+        self.k_separation = self.experiment.k_separation
+        self.r_conflict = self.experiment.r_conflict
+        self.r_collision = self.experiment.r_collision
+        self.create_geometry_arrays()
+
+        # per-drone state
+        self.rows = np.arange(self.drone_num)
+        self.current_path = np.zeros(self.drone_num, dtype="int64")
+        self.current_index = np.zeros(self.drone_num, dtype="int64")
+        self.start_delay = np.zeros(self.drone_num, dtype="float64")
+        self.passed_last_point = np.zeros((self.drone_num, self.path_num), dtype=bool)
+        self.min_distance = np.full(self.drone_num, math.inf) # the least distance to another drone
+        self.min_distance_drone = np.zeros(self.drone_num, dtype="int64") # row of the closest drone
+        self.min_distance_positions = np.zeros((self.drone_num, 2, 3), dtype="float64") # [position of the drone, position of the closest drone]
+        self.switched_positions = [[] for n in range(self.drone_num)] # to save the positions where each drone switches
+        self.get_path_and_permission()
+
+    def set_gains(self, gains):
+        # overrides the gains of the experiment json, gains is Dict{name in the json: value}
+        for name, value in gains.items():
+            setattr(self, GAIN_ATTRIBUTES[name], value)
+
+    def create_geometry_arrays(self):
+        # Pads the corridors of the experiment into (paths, longest path) arrays
+        experiment = self.experiment
+        self.path_num = len(experiment.points)
+        self.max_length = max(experiment.length)
+        self.length = np.array(experiment.length, dtype="int64")
+        self.last_index = self.length - 1
+        # [point, direction, unit direction, lane radius, norm of direction, next point, cross product matrix] of
+        # each point, so path_following gathers them at once
+        self.segments = np.zeros((self.path_num, self.max_length, 23), dtype="float64")
+        self.points = self.segments[:, :, 0:3]
+        self.directions = self.segments[:, :, 3:6]
+        self.unit_directions = self.segments[:, :, 6:9]
+        self.lane_radius = self.segments[:, :, 9]
+        self.direction_norm = self.segments[:, :, 10]
+        self.next_points = self.segments[:, :, 11:14]
+        self.cross_matrices = self.segments[:, :, 14:23].reshape(self.path_num, self.max_length, 3, 3)
+        self.next_index = np.zeros((self.path_num, self.max_length), dtype="int64")  # the index after each point
+        for j in range(self.path_num):
+            self.points[j, : self.length[j]] = experiment.points[j]
+            self.directions[j, : self.length[j]] = experiment.directions[j]
+            self.lane_radius[j, : self.length[j]] = experiment.lane_radius[j]
+            self.next_index[j, : self.length[j]] = (np.arange(self.length[j]) + 1) % self.length[j]
+            self.next_points[j, : self.length[j]] = self.points[j, self.next_index[j, : self.length[j]]]
+        self.direction_norm[:] = row_norms(self.directions)
+        self.unit_directions[:] = self.directions / np.maximum(self.direction_norm, 1e-300)[:, :, None]
+        # cross_matrices @ v is the cross product of v and the direction
+        (x, y, z) = (self.directions[:, :, 0], self.directions[:, :, 1], self.directions[:, :, 2])
+        self.cross_matrices[:, :, 0, 1] = z
+        self.cross_matrices[:, :, 0, 2] = -y
+        self.cross_matrices[:, :, 1, 0] = -z
+        self.cross_matrices[:, :, 1, 2] = x
+        self.cross_matrices[:, :, 2, 0] = y
+        self.cross_matrices[:, :, 2, 1] = -x
+        self.rotation_dir = np.array(experiment.rotation_dir, dtype="float64")
+        self.repeat_stay = np.array([r == "STAY" for r in experiment.repeat], dtype=bool)
+        self.repeat_stop = np.array([r == "STOP" for r in experiment.repeat], dtype=bool)
+        self.repeat_end = self.repeat_stay | self.repeat_stop  # paths without migration after the last point
+
+    def get_path_and_permission(self):
+        # Assigns initial paths, start delays and switching points to each drone by its priority
+        experiment = self.experiment
+        swarm_priorities = experiment.get_swarm_priorities(dict.fromkeys(self.ids))
+        self.permission_row = np.zeros(self.drone_num, dtype="int64")  # row of self.switch_entry of each drone
+        adjacency_rows = {}  # {pass permission: row of self.switch_entry}
+        adjacent_points = []
+        for n, id in enumerate(self.ids):
+            priority = swarm_priorities.index(id)
+            self.current_path[n] = experiment.initial_paths[priority]
+            self.start_delay[n] = experiment.start_delay_list[priority]
+            pass_permission = {
+                int(j): next_path
+                for j, next_path in experiment.pass_permission_list[priority].items()
+            }
+            # drones with the same permissions have the same adjacent points
+            signature = repr(sorted(pass_permission.items()))
+            if signature not in adjacency_rows:
+                experiment.pass_permission = pass_permission
+                experiment.create_adjacent_points()
+                adjacency_rows[signature] = len(adjacent_points)
+                adjacent_points.append(experiment.adjacent_points)
+            self.permission_row[n] = adjacency_rows[signature]
+
+        # entry of the switching point at [permission row, path, index], -1 if the point is not a switching point,
+        # so the switching points of all drones are looked up at once
+        self.switch_entry = np.full((len(adjacent_points), self.path_num, self.max_length), -1, dtype="int64")
+        switch_entries = []
+        for row, adjacent_paths in enumerate(adjacent_points):
+            for path, adjacent in enumerate(adjacent_paths):
+                for switching_point, (k, next_path, pass_vector) in adjacent.items():
+                    self.switch_entry[row, path, switching_point] = len(switch_entries)
+                    switch_entries.append([k, next_path, *pass_vector])
+        switch_entries = np.array(switch_entries, dtype="float64").reshape(-1, 5)
+        self.switch_index = switch_entries[:, 0].astype("int64")
+        self.switch_path = switch_entries[:, 1].astype("int64")
+        self.switch_vector = switch_entries[:, 2:]
+
+    def get_pre_start_positions(self, positions=None):
+        # returns the (N,3) pre start positions of the drones in the order of self.ids, if there isnt enough
+        # pre start positions, the drones without one start from their current positions (the origin by default)
+        swarm_priorities = self.experiment.get_swarm_priorities(dict.fromkeys(self.ids))
+        pre_start_positions = np.zeros((self.drone_num, 3), dtype="float64")
+        if positions is not None:
+            pre_start_positions[:] = positions
+        for n, id in enumerate(self.ids):
+            priority = swarm_priorities.index(id)
+            if priority < len(self.experiment.pre_start_positions):
+                pre_start_positions[n] = self.experiment.pre_start_positions[priority]
+        return pre_start_positions
+
+    def initial_nearest_point(self, positions) -> None:
+        # the segment trees of the paths are shared by all drones
+        for n in range(self.drone_num):
+            self.current_index[n] = self.experiment.get_segment_tree(self.current_path[n]).nearest(positions[n])[0]
+
+    def check_switching(self, positions):
+        entry = self.switch_entry[self.permission_row, self.current_path, self.current_index]
+        candidates = (entry >= 0).nonzero()[0]
+        if len(candidates) == 0:
+            return
+        entries = entry[candidates]
+        path = self.current_path[candidates]
+        index = self.current_index[candidates]
+        target_direction = self.directions[path, index]
+        position_error = self.points[path, index] - positions[candidates]
+        position_error -= np.sum(position_error * target_direction, axis=1)[:, None] * target_direction
+        pass_vector = self.switch_vector[entries]
+        pass_vector_norm = row_norms(pass_vector)
+        position_error_norm = row_norms(position_error)
+        aligned = (pass_vector_norm <= 0.05) | (position_error_norm <= 0.05)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cos_of_angle = np.sum(pass_vector * position_error, axis=1) / (pass_vector_norm * position_error_norm)
+        switching = aligned | (cos_of_angle >= 0.9)
+        for n, entry in zip(candidates[switching], entries[switching]):
+            self.switched_positions[n].append(positions[n].copy())
+            self.current_index[n] = self.switch_index[entry]
+            self.current_path[n] = self.switch_path[entry]
+
+    def advance_index(self, positions):
+        # Finding the next bigger index of every drone ----------
+        # returns the segments (rows of self.segments) of the drones at their new indices
+        path = self.current_path
+        index = self.current_index
+        moving = ~(self.passed_last_point[self.rows, path] & self.repeat_stay[path])
+        while True:
+            segment = self.segments[path, index]
+            range_to_next = positions - segment[:, 11:14]
+            passed = moving & (np.einsum("ij,ij->i", range_to_next, segment[:, 3:6]) >= 0)
+            if not passed.any():
+                return segment
+            drones = passed.nonzero()[0]
+            next_point = self.next_index[path[drones], index[drones]]
+            self.current_index[drones] = next_point
+            last = next_point == self.last_index[path[drones]]
+            self.passed_last_point[drones[last], path[drones[last]]] = True
+            moving[drones] = ~(self.passed_last_point[drones, path[drones]] & self.repeat_stay[path[drones]])
+
+    def path_following(self, positions, max_speed, current_time=0):
+        """
+        Parameters
+        ------------
+        positions: (N,3) array of NED positions of the drones in the order of self.ids
+        max_speed: the limit of the norm of each output velocity
+        current_time: current time in micro seconds, used to check the start delays
+
+        Returns
+        -----------
+        output_vel: (N,3) array of NED velocities, the path and index of each drone are kept
+            in self.current_path and self.current_index
+        """
+        positions = np.asarray(positions, dtype="float64")
+        self.check_switching(positions)
+        segment = self.advance_index(positions)
+
+        path = self.current_path
+        target_direction = segment[:, 3:6]
+        lane_radius = segment[:, 9]
+
+        # Calculating migration velocity (normalized)---------------------
+        v_migration = segment[:, 6:9]
+
+        # Calculating lane Cohesion Velocity ---------------
+        position_error = segment[:, 0:3] - positions
+        position_error -= np.einsum("ij,ij->i", position_error, target_direction)[:, None] * target_direction
+        position_error_magnitude = row_norms(position_error)
+        on_lane = position_error_magnitude == 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            # the norm of the lane cohesion velocity is |position_error_magnitude - lane_radius|, limited to 1
+            v_lane_cohesion = (
+                np.minimum(np.maximum(position_error_magnitude - lane_radius, -1), 1) / position_error_magnitude
+            )[:, None] * position_error
+            v_lane_cohesion[on_lane] = 0.01
+
+            # Calculating v_rotation (normalized)---------------------
+            # not bigger than 1, so v_rotation is not limited, and 0 if lane_radius is 0
+            v_rotation_magnitude = np.where(
+                position_error_magnitude < lane_radius,
+                position_error_magnitude / lane_radius,
+                lane_radius / position_error_magnitude,
+            )
+            # position_error is normal to target_direction, so the norm of their cross product is the product of their norms
+            cross_prod_norm = position_error_magnitude * segment[:, 10]
+            cross_prod = np.matmul(segment[:, 14:23].reshape(-1, 3, 3), position_error[:, :, None])[:, :, 0]
+            v_rotation = (self.rotation_dir[path] * v_rotation_magnitude / cross_prod_norm)[:, None] * cross_prod
+        v_rotation[cross_prod_norm == 0] = 0
+
+        # Calculating v_separation (normalized) -----------------------------
+        v_separation = self.separation(positions)
+
+        # checking for start delay time
+        if current_time != 0:
+            waiting = current_time - self.start_time <= self.start_delay
+            v_lane_cohesion[waiting] = 0
+            v_migration[waiting] = 0
+            v_rotation[waiting] = 0
+            v_separation[waiting] = 0
+
+        # checking the last point of the current path
+        passed_last_point = self.passed_last_point[self.rows, path]
+        stop = passed_last_point & self.repeat_stop[path]
+        v_lane_cohesion[stop] = 0
+        v_rotation[stop] = 0
+        v_migration[passed_last_point & self.repeat_end[path]] = 0
+
+        desired_vel = (
+            self.k_lane_cohesion * v_lane_cohesion
+            + self.k_migration * v_migration
+            + self.k_rotation * v_rotation
+            + self.k_separation * v_separation
+        )
+        return limit_norm(desired_vel, max_speed)
+
+    def separation(self, positions):
+        limit_v_separation = 5
+        x = positions[:, None, :] - positions[None, :, :] # x[n, m] is the vector from drone m to drone n
+        d = np.sqrt(np.einsum("nmi,nmi->nm", x, x))
+        d.flat[:: self.drone_num + 1] = math.inf # the diagonal
+
+        # finding the minimum distance
+        closest = self.drone_num - 1 - d[:, ::-1].argmin(axis=1)
+        closest_distance = d[self.rows, closest]
+        updated = closest_distance <= self.min_distance
+        if updated.any():
+            self.min_distance[updated] = closest_distance[updated]
+            self.min_distance_drone[updated] = closest[updated]
+            self.min_distance_positions[updated, 0] = positions[updated]
+            self.min_distance_positions[updated, 1] = positions[closest[updated]]
+        if not (closest_distance <= self.r_conflict).any():
+            return np.zeros_like(positions)
+
+        gain = self.r_conflict - d / self.r_conflict - self.r_collision
+        gain[d > self.r_conflict] = 0 # also the diagonal
+        gain[d <= self.r_collision] = 1
+        # gain / d scales x to a unit vector, x is zero for two drones at the same position
+        v_separation = np.matmul((gain / np.maximum(d, 1e-300))[:, None, :], x)[:, 0]
+        return limit_norm(v_separation, limit_v_separation)
+
+
+def limit_norm(vectors, limit):
+    # scales down the rows of vectors with a norm bigger than limit
+    scale = limit / np.maximum(row_norms(vectors), limit)  # 1 for the rows which are not bigger than limit
+    return vectors * scale[:, None]
+
+
+def row_norms(vectors):
+    # norms along the last axis
+    return np.sqrt(np.einsum("...i,...i->...", vectors, vectors))
+
@@ -1,67 +1,38 @@
 from __future__ import annotations  # compatibility with older python versions than 3.9
 import asyncio
-import time
 from mavsdk import System
 from mavsdk.action import ActionError
 from mavsdk.offboard import OffboardError, VelocityNedYaw
-import pymap3d as pm
-from data_structures import AgentTelemetry
+from data_structures import SwarmTelemetry
+from geodetic import GeodeticConverter
+from publish_rate import ProximityRate
+from rate_scheduler import FixedRateScheduler
+from spatial_index import NeighbourGrid
+from telemetry_inbox import TelemetryInbox
+from telemetry_packet import pack_telemetry
 import numpy as np
 
 
 class SwarmManager:
     def __init__(self):
-        self.telemetry: dict[str, type[AgentTelemetry]] = {}
+        self.telemetry = SwarmTelemetry()
+        self.neighbour_grid = NeighbourGrid()  # positions of the other agents hashed into cells of size r_conflict
+        self.inbox = TelemetryInbox()  # telemetry of the other agents received on the MQTT thread
 
     def check_swarm_positions(self, required_positions, check_alt=True):
         # takes required positions as NED and checks positions of swarm
-        if check_alt == True:
-            for agent in self.telemetry.keys():
-                if (
-                    np.sqrt(
-                        (
-                            required_positions[agent][0]
-                            - self.telemetry[agent].position_ned[0]
-                        )
-                        ** 2
-                        + (
-                            required_positions[agent][1]
-                            - self.telemetry[agent].position_ned[1]
-                        )
-                        ** 2
-                        + (
-                            required_positions[agent][2]
-                            - self.telemetry[agent].position_ned[2]
-                        )
-                        ** 2
-                    )
-                ) > 0.3:
-                    return False
-        else:
-            for agent in self.telemetry.keys():
-                if (
-                    np.sqrt(
-                        (
-                            required_positions[agent][0]
-                            - self.telemetry[agent].position_ned[0]
-                        )
-                        ** 2
-                        + (
-                            required_positions[agent][1]
-                            - self.telemetry[agent].position_ned[1]
-                        )
-                        ** 2
-                    )
-                ) > 0.3:
-                    return False
-        return True
+        n = len(self.telemetry)
+        required = np.array([required_positions[agent] for agent in self.telemetry.keys()], dtype="float64").reshape(n, 3)
+        errors = required - self.telemetry.position_ned[:n]
+        if check_alt == False:
+            errors = errors[:, :2]
+        return bool(np.all(np.sqrt(np.sum(errors**2, axis=1)) <= 0.3))
 
     def check_swarm_altitudes(self, required_altitudes):
         # takes required altitudes and checks positions of swarm
-        for agent in self.telemetry.keys():
-            if abs(self.telemetry[agent].geodetic[2] - required_altitudes[agent]) > 0.5:
-                return False
-        return True
+        n = len(self.telemetry)
+        required = np.array([required_altitudes[agent] for agent in self.telemetry.keys()], dtype="float64")
+        return bool(np.all(np.abs(self.telemetry.geodetic[:n, 2] - required) <= 0.5))
 
 
 class TelemetryUpdater:
@@ -74,10 +45,23 @@ class TelemetryUpdater:
         event_loop,
         geodetic_ref,
         ulog_callback,
+        telemetry_format="text",
+        telemetry_rate=10,
+        publish_rate=None,
+        neighbour_grid=None,
     ):
         self.id = id
         self.drone = drone
         self.client = client
+        self.telemetry_format = telemetry_format  # "text" or "binary" (see telemetry_packet.py)
+        self.telemetry_rate = telemetry_rate  # frames per second in binary format
+        # no frame is published before the first position, the agent would be seen at the origin
+        self.position_received = False
+        # publishes fewer updates while no other agent is close, every update until its r_conflict is set
+        self.publish_rate = ProximityRate(id, swarm_telem) if publish_rate is None else publish_rate
+        # the own position is also written into the NeighbourGrid, which other agents of the same host
+        # (agent_host.py) read as they do not receive it over MQTT
+        self.neighbour_grid = neighbour_grid
         asyncio.ensure_future(
             self.get_position(swarm_telem, geodetic_ref),
             loop=event_loop,
@@ -90,36 +74,45 @@ class TelemetryUpdater:
         asyncio.ensure_future(self.get_battery_level(), loop=event_loop)
         asyncio.ensure_future(self.get_flight_mode(swarm_telem), loop=event_loop)
         asyncio.ensure_future(self.get_time(swarm_telem), loop=event_loop) # to get the cuurent time
-        time.sleep(10)
+        if self.telemetry_format == "binary":
+            asyncio.ensure_future(self.publish_frames(swarm_telem), loop=event_loop)
 
     async def get_position(self, swarm_telem, geodetic_ref):
         # set the rate of telemetry updates to 10Hz
         await self.drone.telemetry.set_rate_position(10)
+        geodetic_converter = GeodeticConverter(geodetic_ref[0], geodetic_ref[1], geodetic_ref[2])
         async for position in self.drone.telemetry.position():
 
-            swarm_telem[self.id].geodetic = (
+            geodetic = (
                 position.latitude_deg,
                 position.longitude_deg,
                 position.absolute_altitude_m,
             )
-
-            swarm_telem[self.id].position_ned = pm.geodetic2ned(
+            position_ned = geodetic_converter.geodetic2ned_scalar(
                 position.latitude_deg,
                 position.longitude_deg,
                 position.absolute_altitude_m,
-                geodetic_ref[0],
-                geodetic_ref[1],
-                geodetic_ref[2],
             )
-
+            swarm_telem[self.id].geodetic = geodetic
+            swarm_telem[self.id].position_ned = position_ned
+            self.position_received = True
+            if self.neighbour_grid is not None:
+                self.neighbour_grid.update(self.id, position_ned)
+
+            if self.telemetry_format == "binary":  # published by publish_frames
+                continue
+            if not self.publish_rate.due("position"):
+                continue
+
+            # published from the tuples, as the swarm telemetry returns arrays
             self.client.publish(
                 self.id + "/telemetry/geodetic",
-                str(swarm_telem[self.id].geodetic).strip("()"),
+                str(geodetic).strip("()"),
             )
 
             self.client.publish(
                 self.id + "/telemetry/position_ned",
-                str(swarm_telem[self.id].position_ned).strip("()"),
+                str(position_ned).strip("()"),
             )
 
             # if (
@@ -133,11 +126,15 @@ class TelemetryUpdater:
         # await drone.telemetry.set_rate_heading(10)
         async for heading in self.drone.telemetry.heading():
 
-            swarm_telem[self.id].heading = heading
+            swarm_telem[self.id].heading = heading.heading_deg
 
+            if self.telemetry_format == "binary":  # published by publish_frames
+                continue
+            if not self.publish_rate.due("heading"):
+                continue
             self.client.publish(
                 self.id + "/telemetry/heading",
-                str(swarm_telem[self.id].heading.heading_deg).strip("()"),
+                str(swarm_telem[self.id].heading).strip("()"),
             )
 
     async def get_velocity(self, swarm_telem):
@@ -145,16 +142,33 @@ class TelemetryUpdater:
         await self.drone.telemetry.set_rate_position_velocity_ned(10)
         async for position_velocity_ned in self.drone.telemetry.position_velocity_ned():
             # changed from list to tuple so formatting for all messages is the same
-            swarm_telem[self.id].velocity_ned = (
+            velocity_ned = (
                 position_velocity_ned.velocity.north_m_s,
                 position_velocity_ned.velocity.east_m_s,
                 position_velocity_ned.velocity.down_m_s,
             )
+            swarm_telem[self.id].velocity_ned = velocity_ned
+            if self.telemetry_format == "binary":  # published by publish_frames
+                continue
+            if not self.publish_rate.due("velocity"):
+                continue
             self.client.publish(
                 self.id + "/telemetry/velocity_ned",
-                str(swarm_telem[self.id].velocity_ned).strip("()"),
+                str(velocity_ned).strip("()"),
             )
 
+    async def publish_frames(self, swarm_telem):
+        # publishes the latest geodetic, position, velocity and heading together in one frame per tick
+        scheduler = FixedRateScheduler(1 / self.telemetry_rate)
+        scheduler.start()
+        while True:
+            if self.position_received and self.publish_rate.due("packed"):
+                self.client.publish(
+                    self.id + "/telemetry/packed",
+                    pack_telemetry(self.id, swarm_telem[self.id]),
+                )
+            await scheduler.wait()
+
     async def get_arm_status(self, swarm_telem, ulog_callback):
         async for is_armed in self.drone.telemetry.armed():
             if is_armed != swarm_telem[self.id].arm_status:
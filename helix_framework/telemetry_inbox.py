@@ -0,0 +1,92 @@
+import collections
+import threading
+import time
+
+
+class TelemetryInbox:
+    """
+    Hands messages of the MQTT network thread over to the asyncio event loop. Telemetry is kept per key
+    (the topic, so per agent and field) and only the latest value of a key is applied, so the buffer
+    holds at most one value per agent and topic however many messages arrive. Events which must not be
+    merged (e.g. detection of a new agent) are queued in order. The network thread wakes the event loop
+    with one call_soon_threadsafe per batch; while a control loop runs (start_ticks), nothing is applied
+    until the loop calls apply at the start of its tick, so a tick reads telemetry which does not change
+    under it.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}  # {key: (apply function, args, receipt time of time.monotonic())}
+        self.events = collections.deque()  # (function, args) in order of receipt
+        self.event_loop = None
+        self.wakeup_scheduled = False
+        self.ticking = 0  # number of control loops applying the inbox at their ticks
+        self.latency = 0.0  # seconds from receipt to use of the oldest value of the last apply
+        self.coalesced = 0  # number of values replaced by a later value of the same key before being applied
+
+    def bind(self, event_loop):
+        # sets the loop applying the inbox, values received before are applied at once
+        self.event_loop = event_loop
+        self.schedule_wakeup()
+
+    def put(self, key, function, *args):
+        # called on the network thread, function(*args) is called on the event loop
+        with self.lock:
+            if key in self.pending:
+                self.coalesced += 1
+            self.pending[key] = (function, args, time.monotonic())
+        self.schedule_wakeup()
+
+    def call(self, function, *args):
+        # called on the network thread, function(*args) is called on the event loop after the earlier events
+        with self.lock:
+            self.events.append((function, args))
+        self.schedule_wakeup()
+
+    def schedule_wakeup(self):
+        with self.lock:
+            if self.wakeup_scheduled or self.event_loop is None:
+                return
+            if not self.events and (self.ticking or not self.pending):
+                return
+            self.wakeup_scheduled = True
+        self.event_loop.call_soon_threadsafe(self.wakeup)
+
+    def wakeup(self):
+        with self.lock:
+            self.wakeup_scheduled = False
+            telemetry = not self.ticking
+        self.apply(telemetry)
+
+    def apply(self, telemetry=True):
+        """
+        Applies the queued events and, if telemetry, the latest value of each key on the event loop
+        Returns
+        -----------
+        number of applied values and events
+        """
+        with self.lock:
+            events = list(self.events)
+            self.events.clear()
+            if telemetry:
+                (pending, self.pending) = (self.pending, {})
+            else:
+                pending = {}
+        for function, args in events:
+            function(*args)
+        if pending:
+            now = time.monotonic()
+            self.latency = now - min(receipt_time for function, args, receipt_time in pending.values())
+            for function, args, receipt_time in pending.values():
+                function(*args)
+        return len(events) + len(pending)
+
+    def start_ticks(self):
+        # a control loop applies the telemetry at its ticks from now on
+        with self.lock:
+            self.ticking += 1
+
+    def stop_ticks(self):
+        with self.lock:
+            self.ticking -= 1
+        self.schedule_wakeup()
@@ -0,0 +1,97 @@
+import struct
+import time
+
+# Binary telemetry frame published on <id>/telemetry/packed once per tick, little endian with a fixed layout:
+# id (4 ascii bytes), timestamp (uint64, micro seconds), geodetic (3 float64), position_ned (3 float64),
+# velocity_ned (3 float64), heading (float64, degrees), flight mode (uint8), arm status (uint8)
+PACKET = struct.Struct("<4sQ10dBB")
+FLIGHT_MODES = [
+    "NONE",
+    "UNKNOWN",
+    "READY",
+    "TAKEOFF",
+    "HOLD",
+    "MISSION",
+    "RETURN_TO_LAUNCH",
+    "LAND",
+    "OFFBOARD",
+    "FOLLOW_ME",
+    "MANUAL",
+    "ALTCTL",
+    "POSCTL",
+    "ACRO",
+    "STABILIZED",
+    "RATTITUDE",
+]
+FLIGHT_MODE_NUMBERS = {flight_mode: i for i, flight_mode in enumerate(FLIGHT_MODES)}
+
+
+def pack_telemetry(id, telemetry):
+    """
+    Parameters
+    ------------
+    id: agent id (string) of at most 4 ascii characters
+    telemetry: AgentTelemetry (object) of the agent
+
+    Returns
+    -----------
+    output: bytes of PACKET
+    """
+    return PACKET.pack(
+        id.encode(),
+        int(telemetry.current_time),
+        *telemetry.geodetic,
+        *telemetry.position_ned,
+        *telemetry.velocity_ned,
+        telemetry.heading,
+        FLIGHT_MODE_NUMBERS.get(telemetry.flight_mode, 1),
+        telemetry.arm_status,
+    )
+
+
+class TelemetryDecoder:
+    """
+    Writes each received packet into the slot of its sender in the SwarmTelemetry of the swarm
+    manager, all values of the frame at once. The ids of the senders are kept as bytes, so decoding a
+    packet only unpacks numbers.
+    """
+
+    def __init__(self, swarm_manager):
+        self.swarm_manager = swarm_manager
+        self.ids = {}  # {id (bytes): id (string)}
+
+    def decode(self, payload, receipt_time=None):
+        # receipt_time: time.monotonic() when the packet was received, now by default
+        (
+            raw_id,
+            timestamp,
+            lat,
+            lon,
+            alt,
+            north,
+            east,
+            down,
+            velocity_north,
+            velocity_east,
+            velocity_down,
+            heading,
+            flight_mode,
+            arm_status,
+        ) = PACKET.unpack(payload)
+        id = self.ids.get(raw_id)
+        if id is None:
+            id = self.ids[raw_id] = raw_id.rstrip(b"\0").decode()
+        if id not in self.swarm_manager.telemetry:  # agents are only added by detection
+            return None
+        store = self.swarm_manager.telemetry
+        slot = store.slots[id]
+        store.current_time[slot] = timestamp
+        store.geodetic[slot] = (lat, lon, alt)
+        store.position_ned[slot] = (north, east, down)
+        store.velocity_ned[slot] = (velocity_north, velocity_east, velocity_down)
+        store.heading[slot] = heading
+        store.flight_mode[slot] = FLIGHT_MODES[flight_mode]
+        store.arm_status[slot] = arm_status
+        store.timestamp[slot] = time.monotonic() if receipt_time is None else receipt_time
+        self.swarm_manager.neighbour_grid.update(id, (north, east, down))
+        return id
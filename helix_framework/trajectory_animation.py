@@ -0,0 +1,126 @@
+import numpy as np
+import plotly.graph_objects as go
+
+MAX_FRAMES = 300  # default number of frames of an animation, more frames make browsers slow
+TRACE_TOLERANCE = 0.1  # default distance in meters a simplified trace may be from the samples
+
+
+def decimate(frame_num, max_frames):
+    """
+    Returns:
+        indices of at most max_frames evenly spaced frames out of frame_num, always with the first and the last frame
+    """
+    if frame_num <= max_frames:
+        return np.arange(frame_num)
+    return np.unique(np.round(np.linspace(0, frame_num - 1, max_frames)).astype("int64"))
+
+
+def simplify_polyline(points, tolerance):
+    """
+    Douglas-Peucker simplification: keeps the points which are further than tolerance from the
+    segment between the points kept around them.
+    Arguments:
+        points: (M,3) array
+    Returns:
+        sorted indices of the kept points, always with the first and the last point
+    """
+    points = np.asarray(points, dtype="float64")
+    if len(points) <= 2:
+        return np.arange(len(points))
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        (first, last) = stack.pop()
+        if last - first < 2:
+            continue
+        segment = points[last] - points[first]
+        relative = points[first + 1 : last] - points[first]
+        squared_length = np.dot(segment, segment)
+        if squared_length == 0:
+            distances = np.linalg.norm(relative, axis=1)
+        else:
+            t = np.clip(relative @ segment / squared_length, 0, 1)
+            distances = np.linalg.norm(relative - t[:, None] * segment, axis=1)
+        farthest = np.argmax(distances)
+        if distances[farthest] > tolerance:
+            middle = first + 1 + farthest
+            keep[middle] = True
+            stack.append((first, middle))
+            stack.append((middle, last))
+    return np.flatnonzero(keep)
+
+
+def build_animation(time, positions, labels, colors, drone_size=10, frame_duration=None, max_frames=MAX_FRAMES, tolerance=TRACE_TOLERANCE):
+    """
+    Builds the animated figure of drones directly with go.Frame, one marker trace per drone moved
+    by the frames and one simplified line trace per drone showing its whole path.
+    Arguments:
+        time: (T,) time of each sample in seconds
+        positions: (T, N, 3) x, y, z of each drone at each sample
+        labels: List[name of drone (string), ...] of length N
+        colors: List[color (string), ...] used in turn for the drones
+        frame_duration: duration of each frame in seconds, by default the time between the kept frames
+        max_frames: the samples are decimated to at most this number of frames
+        tolerance: distance in meters for simplifying the traces, 0 to keep all samples
+    Returns:
+        go.Figure with the play button and slider of the animation, the layout of the scene is left to the caller
+    """
+    time = np.asarray(time, dtype="float64")
+    positions = np.asarray(positions, dtype="float64")
+    frames = decimate(len(time), max_frames)
+    if frame_duration is None:
+        frame_duration = (time[frames[-1]] - time[frames[0]]) / max(len(frames) - 1, 1)
+
+    fig = go.Figure()
+    for n, label in enumerate(labels):
+        fig.add_trace(
+            go.Scatter3d(
+                x=positions[frames[:1], n, 0], y=positions[frames[:1], n, 1], z=positions[frames[:1], n, 2],
+                mode='markers',
+                name=label,
+                marker=dict(size=drone_size, color=colors[n % len(colors)], opacity=1),
+            )
+        )
+    for n, label in enumerate(labels):
+        kept = simplify_polyline(positions[:, n], tolerance) if tolerance > 0 else np.arange(len(time))
+        fig.add_trace(
+            go.Scatter3d(
+                x=positions[kept, n, 0], y=positions[kept, n, 1], z=positions[kept, n, 2],
+                mode='lines',
+                name="trace of " + label,
+                line=dict(color=colors[n % len(colors)]),
+            )
+        )
+
+    marker_traces = list(range(len(labels)))
+    fig.frames = [
+        go.Frame(
+            data=[go.Scatter3d(x=positions[k, n, 0:1], y=positions[k, n, 1:2], z=positions[k, n, 2:3]) for n in marker_traces],
+            traces=marker_traces,
+            name=str(round(time[k], 3)),
+        )
+        for k in frames
+    ]
+    animation_settings = dict(frame=dict(duration=frame_duration * 1000, redraw=True), transition=dict(duration=1), mode="immediate")
+    fig.update_layout(
+        updatemenus=[
+            dict(
+                type="buttons",
+                direction="left",
+                x=0.1, y=0, xanchor="right", yanchor="top", pad=dict(r=10, t=70),
+                buttons=[
+                    dict(label="&#9654;", method="animate", args=[None, dict(fromcurrent=True, **animation_settings)]),
+                    dict(label="&#9724;", method="animate", args=[[None], dict(frame=dict(duration=0, redraw=False), transition=dict(duration=0), mode="immediate")]),
+                ],
+            )
+        ],
+        sliders=[
+            dict(
+                x=0.1, y=0, len=0.9, xanchor="left", yanchor="top", pad=dict(b=10, t=50),
+                currentvalue=dict(prefix="time (s)="),
+                steps=[dict(label=frame.name, method="animate", args=[[frame.name], animation_settings]) for frame in fig.frames],
+            )
+        ],
+    )
+    return fig
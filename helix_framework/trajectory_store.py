@@ -0,0 +1,137 @@
+import csv
+import glob
+import json
+import os
+import numpy as np
+
+CSV_HEADER = ['x(m)', 'y(m)', 'z(m)', 'time(s)', 'drone id', 'offboard mode status', 'type of experiment']
+
+
+class Trajectory:
+    """
+    Samples of one drone, x is north, y is east and z is up (minus down of NED) as in the csv files of
+    the visualisers
+        time: (M,) seconds
+        position: (M,3) x, y, z in meters
+        offboard_mode_status: (M,) 1 when the drone was in offboard mode
+        experiment_type: 'Python_simulation', 'sitl' or 'real'
+    """
+
+    def __init__(self, drone_id, time, position, offboard_mode_status=None, experiment_type=""):
+        self.drone_id = drone_id
+        self.time = np.asarray(time, dtype="float64")
+        self.position = np.asarray(position, dtype="float64").reshape(-1, 3)
+        if offboard_mode_status is None:
+            offboard_mode_status = np.ones(len(self.time), dtype="int8")
+        self.offboard_mode_status = np.asarray(offboard_mode_status, dtype="int8")
+        self.experiment_type = experiment_type
+
+
+def write_trajectories(file_path, trajectories):
+    """
+    Saves trajectories in one npz file with separate arrays for each drone, "<drone id>/time",
+    "<drone id>/position" and "<drone id>/offboard_mode_status", so a whole dataset is read at once.
+    Arguments:
+        trajectories: List[Trajectory, ...]
+    """
+    arrays = {}
+    metadata = []
+    for trajectory in trajectories:
+        arrays[trajectory.drone_id + "/time"] = trajectory.time
+        arrays[trajectory.drone_id + "/position"] = trajectory.position
+        arrays[trajectory.drone_id + "/offboard_mode_status"] = trajectory.offboard_mode_status
+        metadata.append([trajectory.drone_id, trajectory.experiment_type])
+    arrays["metadata"] = np.array(json.dumps(metadata))
+    with open(file_path, "wb") as f:  # a file object, so np.savez does not append .npz to the name
+        np.savez(f, **arrays)
+
+
+def read_trajectories(file_path):
+    """
+    Returns:
+        Dict{drone id: Trajectory} of a file of write_trajectories or a csv file with CSV_HEADER
+    """
+    if file_path.endswith(".csv"):
+        return read_csv(file_path)
+    output = {}
+    with np.load(file_path) as data:
+        for drone_id, experiment_type in json.loads(str(data["metadata"])):
+            output[drone_id] = Trajectory(
+                drone_id,
+                data[drone_id + "/time"],
+                data[drone_id + "/position"],
+                data[drone_id + "/offboard_mode_status"],
+                experiment_type,
+            )
+    return output
+
+
+def read_folder(folder):
+    """
+    Returns:
+        List[Trajectory, ...] of all npz and csv files of a folder, a drone in several files
+            (e.g. a simulation and a real flight) has one trajectory for each file
+    """
+    output = []
+    for file_path in sorted(glob.glob(os.path.join(folder, "*.npz")) + glob.glob(os.path.join(folder, "*.csv"))):
+        output.extend(read_trajectories(file_path).values())
+    return output
+
+
+def resample(trajectories, dt, start_time=None, finish_time=None):
+    """
+    Linearly interpolates all trajectories at the same times, one np.interp call per drone and axis
+    Arguments:
+        trajectories: List[Trajectory, ...]
+        dt: time step in seconds
+        start_time, finish_time: by default the latest start and the earliest finish of the trajectories
+    Returns:
+        time: (T,) start_time + dt * k, computed from the step number so there is no drift of adding dt
+        position: (T, N, 3) positions of the trajectories in the same order
+    """
+    if start_time is None:
+        start_time = max(trajectory.time.min() for trajectory in trajectories)
+    if finish_time is None:
+        finish_time = min(trajectory.time.max() for trajectory in trajectories)
+    steps = int(np.floor((finish_time - start_time) / dt + 1e-9)) + 1 if finish_time >= start_time else 0
+    time = start_time + dt * np.arange(steps)
+    position = np.zeros((steps, len(trajectories), 3), dtype="float64")
+    for n, trajectory in enumerate(trajectories):
+        order = np.argsort(trajectory.time, kind="stable")
+        for axis in range(3):
+            position[:, n, axis] = np.interp(time, trajectory.time[order], trajectory.position[order, axis])
+    return time, position
+
+
+def write_csv(file_path, trajectories):
+    # exports trajectories to a csv file with CSV_HEADER, one row per sample
+    with open(file_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        for trajectory in trajectories:
+            for (x, y, z), t, status in zip(
+                trajectory.position.tolist(), trajectory.time.tolist(), trajectory.offboard_mode_status.tolist()
+            ):
+                writer.writerow([x, y, z, t, trajectory.drone_id, status, trajectory.experiment_type])
+
+
+def read_csv(file_path):
+    # reads a csv file with CSV_HEADER (vertical order), converting each column at once
+    with open(file_path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        columns = list(zip(*reader))
+    if not columns:
+        return {}
+    column = {name: columns[header.index(name)] for name in CSV_HEADER}
+    position = np.array([column['x(m)'], column['y(m)'], column['z(m)']], dtype="float64").T
+    time = np.array(column['time(s)'], dtype="float64")
+    status = np.array(column['offboard mode status'], dtype="float64").astype("int8")
+    drone_ids = np.array(column['drone id'])
+    output = {}
+    for drone_id in dict.fromkeys(column['drone id']):  # in the order of the file
+        rows = drone_ids == drone_id
+        output[drone_id] = Trajectory(
+            drone_id, time[rows], position[rows], status[rows], column['type of experiment'][np.argmax(rows)]
+        )
+    return output
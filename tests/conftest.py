@@ -0,0 +1,30 @@
+import os
+import sys
+import pytest
+
+# modules of helix_framework import each other as top level modules (e.g. "import flocking"),
+# as they are run from inside the helix_framework folder
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "helix_framework")
+)
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Post_flight_tools")
+)
+
+
+def pytest_addoption(parser):
+    parser.addoption("--benchmark", action="store_true", help="run the timing tests marked with benchmark")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: timing test, only run with --benchmark")
+
+
+def pytest_collection_modifyitems(config, items):
+    # timings depend on the machine, so the timing tests are run on their own
+    if config.getoption("--benchmark"):
+        return
+    skip = pytest.mark.skip(reason="timing test, run with --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
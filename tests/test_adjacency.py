@@ -0,0 +1,34 @@
+import glob
+import json
+import os
+import numpy as np
+import pytest
+import corridor_cache
+
+EXPERIMENT_FILES = sorted(
+    glob.glob(
+        os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            "helix_framework",
+            "experiments",
+            "*.json",
+        )
+    )
+)
+
+# test of corridor_cache.compile_adjacency against corridor_cache.compile_adjacency_brute_force ----------------------------------------------------------------
+
+
+@pytest.mark.parametrize("experiment_file_path", EXPERIMENT_FILES, ids=os.path.basename)
+def test_compile_adjacency(experiment_file_path):
+    with open(experiment_file_path, "r") as f:
+        experiment_parameters = json.load(f)
+    if "switching_points" not in experiment_parameters or "pass_permission_list" not in experiment_parameters:
+        pytest.skip("experiment without switching points")
+
+    arrays = corridor_cache.compile_corridors(experiment_parameters)
+    brute_force = corridor_cache.compile_adjacency_brute_force(
+        experiment_parameters, arrays["points"], arrays["offsets"], arrays["radii"]
+    )
+    for name in ["adjacency", "adjacency_distance", "adjacency_vector"]:
+        np.testing.assert_array_equal(arrays[name], brute_force[name])
@@ -0,0 +1,150 @@
+import asyncio
+import os
+import types
+import paho.mqtt.client as mqtt
+import corridor_cache
+from agent_host import AgentClient, SharedConnection
+from communication import DroneCommunication
+from data_structures import AgentTelemetry
+from telemetry import SwarmManager, TelemetryUpdater
+from telemetry_packet import TelemetryDecoder
+
+EXPERIMENTS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "helix_framework", "experiments"
+)
+
+
+class FakeDroneTelemetry:
+    # the telemetry streams of mavsdk used by TelemetryUpdater, only position has values
+    def __init__(self, positions):
+        self.positions = positions
+
+    async def position(self):
+        for position in self.positions:
+            yield position
+
+    def __getattr__(self, name):
+        if name.startswith("set_rate"):
+            return self.set_rate
+        return self.empty_stream
+
+    async def set_rate(self, rate):
+        pass
+
+    async def empty_stream(self):
+        return
+        yield
+
+
+def message(topic, payload):
+    msg = mqtt.MQTTMessage(topic=topic.encode())
+    msg.payload = payload.encode()
+    return msg
+
+
+# test of SharedConnection and AgentClient ------------------------------------------------------------------------------------------------------------------
+
+
+def test_shared_connection():
+    asyncio.run(check_shared_connection())
+
+
+async def check_shared_connection():
+    connection = SharedConnection("localhost")
+    connection.started = True  # no broker in the tests
+    published = []
+    connection.client.publish = lambda topic, payload=None, qos=0, retain=False: published.append((topic, payload))
+    swarm_manager = SwarmManager()
+    comms = []
+    for drone_id in ["S001", "S002"]:
+        agent = types.SimpleNamespace(id=drone_id, broker_ip="localhost")
+        comms.append(DroneCommunication(agent, swarm_manager, AgentClient(connection)))
+        await comms[-1].run_comms()
+
+    # per agent topics are routed to their agent, the swarm telemetry is decoded once
+    assert len(connection.routes["detection"]) == 2
+    assert len(connection.routes["commands/S001"]) == 1
+    assert len(connection.routes["+/telemetry/position_ned"]) == 1
+    assert connection.will == ("S001/connection_status", "Disconnected", 2, True)
+
+    # both agents reply to a new agent, which is added once to the shared telemetry
+    connection.dispatch("detection", None, message("detection", "S003"))
+    await asyncio.sleep(0)
+    assert list(swarm_manager.telemetry.keys()) == ["S003"]
+    assert sorted(payload for topic, payload in published if topic == "detection") == ["S001", "S002"]
+    connection.dispatch("+/telemetry/position_ned", None, message("S003/telemetry/position_ned", "(1.0, 2.0, -3.0)"))
+    await asyncio.sleep(0)
+    assert list(swarm_manager.telemetry["S003"].position_ned) == [1.0, 2.0, -3.0]
+
+    comms[0].client.disconnect()
+    assert len(connection.routes["detection"]) == 1
+    assert len(connection.routes["+/telemetry/position_ned"]) == 1
+    assert "commands/S001" in connection.routes and not connection.routes["commands/S001"]
+
+
+def test_load_shared():
+    experiment_file_path = os.path.join(EXPERIMENTS_DIR, "divergence_S_to_N_NZ.json")
+    (parameters, corridors) = corridor_cache.load_shared(experiment_file_path)
+    (other_parameters, other_corridors) = corridor_cache.load_shared(experiment_file_path)
+    assert other_corridors is corridors
+    assert other_parameters == parameters and other_parameters is not parameters
+
+
+def test_co_hosted_agents_are_neighbours():
+    asyncio.run(check_co_hosted_agents_are_neighbours())
+
+
+async def check_co_hosted_agents_are_neighbours():
+    # the agents of a host write their own positions into the shared SwarmManager and never receive them over MQTT
+    swarm_manager = SwarmManager()
+    swarm_manager.neighbour_grid.set_cell_size(5)
+    client = types.SimpleNamespace(publish=lambda topic, payload=None, qos=0, retain=False: None)
+    reference = [52.8, -4.1, 18.0]
+    for drone_id, latitude in [("S001", 52.8), ("S002", 52.80002)]:  # about 2 m apart
+        swarm_manager.telemetry[drone_id] = AgentTelemetry()
+        position = types.SimpleNamespace(latitude_deg=latitude, longitude_deg=-4.1, absolute_altitude_m=28.0)
+        drone = types.SimpleNamespace(telemetry=FakeDroneTelemetry([position]))
+        TelemetryUpdater(
+            drone_id, drone, client, swarm_manager.telemetry, asyncio.get_running_loop(), reference, None,
+            neighbour_grid=swarm_manager.neighbour_grid,
+        )
+    for k in range(5):
+        await asyncio.sleep(0)
+    for drone_id in ["S001", "S002"]:
+        neighbours = swarm_manager.neighbour_grid.neighbours(swarm_manager.telemetry[drone_id].position_ned)
+        assert sorted(neighbours) == ["S001", "S002"]
+
+
+# test of TelemetryUpdater.publish_frames -------------------------------------------------------------------------------------------------------------------
+
+
+def test_frames_wait_for_position():
+    asyncio.run(check_frames_wait_for_position())
+
+
+async def check_frames_wait_for_position():
+    # S001 has no position fix yet, so it publishes no frame which would place it at the origin
+    published = []
+    client = types.SimpleNamespace(
+        publish=lambda topic, payload=None, qos=0, retain=False: published.append((topic, payload))
+    )
+    swarm_telem = {"S001": AgentTelemetry(), "S002": AgentTelemetry()}
+    reference = [52.8, -4.1, 18.0]
+    position = types.SimpleNamespace(latitude_deg=52.80002, longitude_deg=-4.1, absolute_altitude_m=28.0)
+    for drone_id, positions in [("S001", []), ("S002", [position])]:
+        drone = types.SimpleNamespace(telemetry=FakeDroneTelemetry(positions))
+        TelemetryUpdater(
+            drone_id, drone, client, swarm_telem, asyncio.get_running_loop(), reference, None,
+            telemetry_format="binary", telemetry_rate=1000,
+        )
+    await asyncio.sleep(0.05)
+
+    assert not [payload for topic, payload in published if topic == "S001/telemetry/packed"]
+    frames = [payload for topic, payload in published if topic == "S002/telemetry/packed"]
+    assert frames
+    swarm_manager = SwarmManager()
+    swarm_manager.telemetry["S002"] = AgentTelemetry()
+    decoder = TelemetryDecoder(swarm_manager)
+    for frame in frames:
+        decoder.decode(frame)
+        assert list(swarm_manager.telemetry["S002"].position_ned) == list(swarm_telem["S002"].position_ned)
@@ -0,0 +1,78 @@
+import math
+import os
+import pytest
+
+pytest.importorskip("pyulog")  # optional, only needed by the post flight tools
+import campaign
+from campaign import SUMMARY_NAMES, process_campaign
+from ulog_helpers import GPS_FIELDS, OFFBOARD_FIELDS, write_ulog
+
+
+def create_drone(path, lat_offset, time_offset=0):
+    # a drone flying north at about 1.1 m/s, in offboard mode from 2 s to 8 s of its log
+    gps_rows = [
+        (1000000 * k, 1656934523000000 + time_offset + 1000000 * k, 528170083 + 100 * k + lat_offset, -41285024, 18500)
+        for k in range(11)
+    ]
+    offboard_rows = [(1000000 * k, 1) for k in range(2, 9)]
+    write_ulog(path, {"vehicle_gps_position": (GPS_FIELDS, gps_rows), "offboard_control_mode": (OFFBOARD_FIELDS, offboard_rows)})
+
+
+# test of process_campaign ----------------------------------------------------------------------------------------------------------------------------------
+
+
+def test_process_campaign(tmp_path):
+    os.makedirs(tmp_path / "day_1" / "flight_1")
+    os.makedirs(tmp_path / "day_1" / "flight_2")
+    create_drone(str(tmp_path / "day_1" / "flight_1" / "S001.ulg"), 0)
+    create_drone(str(tmp_path / "day_1" / "flight_1" / "S002.ulg"), 90, time_offset=1000000)
+    create_drone(str(tmp_path / "day_1" / "flight_2" / "S001.ulg"), 0)
+    output_CSV_file_dir = str(tmp_path / "summary.csv")
+    output = process_campaign(str(tmp_path), output_CSV_file_dir=output_CSV_file_dir, processes=2)
+
+    assert [summary["flight"] for summary in output] == [os.path.join("day_1", "flight_1"), os.path.join("day_1", "flight_2")]
+    (first, second) = output
+    assert first["drones"] == 2
+    assert first["start_time"] == 1656934523
+    assert first["duration"] == 11
+    assert first["offboard_start"] == 1656934526  # S002 enters offboard mode 1 s later
+    assert first["offboard_span"] == 5
+    assert abs(first["max_speed"] - 1.113) < 0.01
+    # S002 started 90e-7 degrees (1 m) north one second later, so it trails S001 by 0.1 m
+    assert abs(first["min_distance"] - 0.11) < 0.01
+    assert first["min_distance_drones"] == "S001 S002"
+    assert second["drones"] == 1
+    assert second["offboard_span"] == 6
+    assert math.isnan(second["min_distance"])
+    with open(output_CSV_file_dir) as f:
+        lines = f.read().splitlines()
+    assert lines[0].split(",") == SUMMARY_NAMES
+    assert len(lines) == 3
+
+
+def test_process_campaign_cache(tmp_path, monkeypatch):
+    create_drone(str(tmp_path / "S001.ulg"), 0)
+    create_drone(str(tmp_path / "S002.ulg"), 90, time_offset=1000000)
+    output = process_campaign(str(tmp_path), processes=1)
+
+    parsed = []
+    hashed = []
+    extract_log = campaign.extract_log
+    file_hash = campaign.file_hash
+    monkeypatch.setattr(campaign, "extract_log", lambda arguments: parsed.append(arguments[0]) or extract_log(arguments))
+    monkeypatch.setattr(campaign, "file_hash", lambda file_path: hashed.append(file_path) or file_hash(file_path))
+    assert process_campaign(str(tmp_path), processes=1) == output
+    assert parsed == []
+    assert hashed == []  # the files did not change since they were hashed
+    assert not [name for name in os.listdir(tmp_path / ".ulog_cache") if name.endswith(".tmp")]
+
+    create_drone(str(tmp_path / "S003.ulg"), 180, time_offset=2000000)
+    output = process_campaign(str(tmp_path), processes=1)
+    assert parsed == [str(tmp_path / "S003.ulg")]
+    assert hashed == [str(tmp_path / "S003.ulg")]
+    assert output[0]["drones"] == 3
+
+    # the caches of another version of extract_log are not used
+    monkeypatch.setattr(campaign, "CACHE_VERSION", campaign.CACHE_VERSION + 1)
+    assert process_campaign(str(tmp_path), processes=1) == output
+    assert len(parsed) == 4
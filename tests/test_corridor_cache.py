@@ -0,0 +1,80 @@
+import json
+import os
+import shutil
+import numpy as np
+import corridor_cache
+
+EXPERIMENTS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "helix_framework", "experiments"
+)
+
+# test of corridor_cache.load ------------------------------------------------------------------------------------------------------------------------------
+
+
+def test_load(tmp_path, monkeypatch):
+    experiment_file_path = str(tmp_path / "Four_way_switching_roundabout.json")
+    shutil.copy(os.path.join(EXPERIMENTS_DIR, "Four_way_switching_roundabout.json"), experiment_file_path)
+    with open(experiment_file_path, "r") as f:
+        experiment_parameters = json.load(f)
+
+    compiled_parameters, compiled = corridor_cache.load(experiment_file_path)  # compiles and saves the cache
+    cached_parameters, cached = corridor_cache.load(experiment_file_path)  # loads the cache
+    assert len(os.listdir(tmp_path / corridor_cache.CACHE_FOLDER)) == 1
+    assert isinstance(cached.points.base, np.memmap)
+    assert cached_parameters == compiled_parameters
+    assert "corridor_points" not in cached_parameters
+    for name in corridor_cache.ARRAY_NAMES:
+        np.testing.assert_array_equal(getattr(cached, name), getattr(compiled, name))
+
+    # directions are the same as the ones calculated point by point
+    points = cached.split("points")
+    directions = cached.split("directions")
+    for j, path in enumerate(experiment_parameters["corridor_points"]):
+        np.testing.assert_array_equal(points[j], np.array(path, dtype="float64"))
+        for i in range(len(path) - 1):
+            segment = np.array(path[i + 1], dtype="float64") - np.array(path[i], dtype="float64")
+            np.testing.assert_array_equal(directions[j][i], segment / np.linalg.norm(segment))
+
+    # a changed experiment gets a new cache, the old one is only removed after the grace period
+    shutil.copy(experiment_file_path, tmp_path / "Four_way_switching_roundabout-2.json")
+    corridor_cache.load(str(tmp_path / "Four_way_switching_roundabout-2.json"))
+    experiment_parameters["k_migration"] = 3
+    with open(experiment_file_path, "w") as f:
+        json.dump(experiment_parameters, f)
+    changed_parameters, changed = corridor_cache.load(experiment_file_path)
+    assert changed_parameters["k_migration"] == 3
+    assert len(os.listdir(tmp_path / corridor_cache.CACHE_FOLDER)) == 3
+    monkeypatch.setattr(corridor_cache, "CACHE_GRACE_PERIOD", 0)
+    experiment_parameters["k_migration"] = 4
+    with open(experiment_file_path, "w") as f:
+        json.dump(experiment_parameters, f)
+    corridor_cache.load(experiment_file_path)
+    # the cache of the experiment Four_way_switching_roundabout-2 is kept
+    assert sorted(folder.rsplit("-", 1)[0] for folder in os.listdir(tmp_path / corridor_cache.CACHE_FOLDER)) == [
+        "Four_way_switching_roundabout",
+        "Four_way_switching_roundabout-2",
+    ]
+
+
+def test_cache_version(tmp_path, monkeypatch):
+    # a cache compiled by another version of compile_corridors is not loaded, and is removed like an older experiment
+    experiment_file_path = str(tmp_path / "Four_way_switching_roundabout.json")
+    shutil.copy(os.path.join(EXPERIMENTS_DIR, "Four_way_switching_roundabout.json"), experiment_file_path)
+    corridor_cache.load(experiment_file_path)
+    (old_folder,) = os.listdir(tmp_path / corridor_cache.CACHE_FOLDER)
+
+    monkeypatch.setattr(corridor_cache, "CACHE_VERSION", corridor_cache.CACHE_VERSION + 1)
+    monkeypatch.setattr(corridor_cache, "CACHE_GRACE_PERIOD", 0)
+    compiled = []
+    compile_corridors = corridor_cache.compile_corridors
+
+    def counted_compile_corridors(experiment_parameters):
+        compiled.append(experiment_parameters["experiment_id"])
+        return compile_corridors(experiment_parameters)
+
+    monkeypatch.setattr(corridor_cache, "compile_corridors", counted_compile_corridors)
+    corridor_cache.load(experiment_file_path)
+    assert compiled == [1]
+    (new_folder,) = os.listdir(tmp_path / corridor_cache.CACHE_FOLDER)
+    assert new_folder != old_folder
+    assert new_folder.rsplit("-", 1)[0] == old_folder.rsplit("-", 1)[0]
@@ -0,0 +1,56 @@
+import numpy as np
+from data_structures import AgentTelemetry, SwarmTelemetry
+from telemetry import SwarmManager
+
+# test of SwarmTelemetry -----------------------------------------------------------------------------------------------------------
+
+
+def test_swarm_telemetry_is_used_like_a_dict():
+    swarm_telem = SwarmTelemetry(capacity=2)
+    for i in range(5):  # more agents than the capacity
+        telemetry = AgentTelemetry()
+        telemetry.position_ned = [i, 2 * i, -3 * i]
+        telemetry.flight_mode = "OFFBOARD"
+        swarm_telem["S00" + str(i)] = telemetry
+    assert len(swarm_telem) == 5
+    assert list(swarm_telem.keys()) == ["S000", "S001", "S002", "S003", "S004"]
+    assert "S003" in swarm_telem and "S005" not in swarm_telem
+    assert list(swarm_telem["S003"].position_ned) == [3, 6, -9]
+    assert swarm_telem["S003"].flight_mode == "OFFBOARD"
+    assert swarm_telem["S003"].arm_status is False
+    assert np.array_equal(swarm_telem.position_ned[: len(swarm_telem), 1], [0, 2, 4, 6, 8])
+
+    view = swarm_telem["S001"]
+    position = view.position_ned
+    view.position_ned = [10, 20, 30]
+    view.heading = 45.0
+    assert list(position) == [1, 2, -3]  # values read before are not changed
+    assert list(swarm_telem.position_ned[1]) == [10, 20, 30]
+    assert swarm_telem["S001"].heading == 45.0
+
+
+def test_predict_positions():
+    swarm_telem = SwarmTelemetry()
+    for i in range(3):
+        telemetry = AgentTelemetry()
+        telemetry.position_ned = [10.0 * i, 0, -10]
+        telemetry.velocity_ned = [0, 2.0, 0]
+        swarm_telem["S00" + str(i)] = telemetry
+    swarm_telem["S000"].timestamp = 100.0
+    swarm_telem["S001"].timestamp = 99.8
+    swarm_telem["S002"].timestamp = 90.0  # old telemetry is only extrapolated by the horizon
+    predicted = swarm_telem.predict_positions(["S002", "S001", "S000"], 100.0, 1.0)
+    assert np.allclose(predicted, [[20, 2, -10], [10, 0.4, -10], [0, 0, -10]])
+    # a position received after now is not extrapolated backwards
+    assert np.allclose(swarm_telem.predict_positions(["S000"], 99.0, 1.0), [[0, 0, -10]])
+
+
+def test_check_swarm_positions():
+    swarm_manager = SwarmManager()
+    for id, position in [("S001", [0, 0, -10]), ("S002", [5, 5, -12])]:
+        telemetry = AgentTelemetry()
+        telemetry.position_ned = position
+        swarm_manager.telemetry[id] = telemetry
+    assert swarm_manager.check_swarm_positions({"S001": [0.1, 0, -10], "S002": [5, 5, -12.2]})
+    assert not swarm_manager.check_swarm_positions({"S001": [0, 0, -10], "S002": [5, 5, -11]})
+    assert swarm_manager.check_swarm_positions({"S001": [0, 0, -10], "S002": [5, 5, -11]}, check_alt=False)
@@ -0,0 +1,53 @@
+import os
+import types
+import numpy as np
+import pytest
+import experiment
+from data_structures import AgentTelemetry, SwarmTelemetry
+from experiment import Experiment
+
+EXPERIMENTS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "helix_framework", "experiments"
+)
+
+
+def make_swarm(neighbour_position, swarm_telem):
+    # S001 at rest and S002 flying towards it at 4 m/s
+    for id, position, velocity in [("S001", [0, 0, -10], [0, 0, 0]), ("S002", neighbour_position, [0, -4.0, 0])]:
+        telemetry = AgentTelemetry()
+        telemetry.position_ned = position
+        telemetry.velocity_ned = velocity
+        swarm_telem[id] = telemetry
+    return swarm_telem
+
+
+def make_experiment(swarm_telem):
+    drone_experiment = Experiment("S001", swarm_telem, os.path.join(EXPERIMENTS_DIR, "Four_way_switching_roundabout.json"))
+    drone_experiment.get_path_and_permission(drone_experiment.get_swarm_priorities(swarm_telem))
+    drone_experiment.initial_nearest_point(swarm_telem)
+    return drone_experiment
+
+
+# test of Experiment.path_following with prediction_horizon ------------------------------------------------------------------------------------------------
+
+
+def test_path_following_prediction(monkeypatch):
+    monkeypatch.setattr(experiment, "time", types.SimpleNamespace(monotonic=lambda: 100.0))
+    swarm_telem = make_swarm([0, 6.0, -10], SwarmTelemetry())
+    swarm_telem["S002"].timestamp = 99.0  # received 1 s ago, extrapolated by 0.5 s at most
+    predicting = make_experiment(swarm_telem)
+    output = predicting.path_following(swarm_telem, 5, 0.1, 10, prediction_horizon=0.5)
+    assert predicting.min_distance[0] == pytest.approx(4)  # within r_conflict, 6 m away as received
+    assert predicting.min_distance[2] == "S002"
+    assert np.allclose(predicting.min_distance[4], [0, 4, -10])
+    # the separation is the one of a neighbour received at the extrapolated position
+    extrapolated = make_swarm([0, 4.0, -10], {})
+    assert output == make_experiment(extrapolated).path_following(extrapolated, 5, 0.1, 10)
+
+    # without a horizon the received positions are used, as for a dict of AgentTelemetry
+    received = make_swarm([0, 6.0, -10], {})
+    expected = make_experiment(received).path_following(received, 5, 0.1, 10)
+    not_predicting = make_experiment(swarm_telem)
+    assert not_predicting.path_following(swarm_telem, 5, 0.1, 10, prediction_horizon=0) == expected
+    assert not_predicting.min_distance[0] == pytest.approx(6)
+    assert output != expected
@@ -0,0 +1,43 @@
+import math
+import numpy as np
+import pytest
+from flight_segments import label_mode, mode_window
+
+
+def label_mode_nested_loop(gps_timestamp, offboard_timestamp, time):
+    # the previous labelling of visualize_ulg
+    status = [0 for n in range(len(gps_timestamp))]
+    start = math.inf
+    finish = -math.inf
+    for l in range(len(offboard_timestamp) - 1):
+        for m in range(len(gps_timestamp)):
+            if gps_timestamp[m] >= offboard_timestamp[l] and gps_timestamp[m] <= offboard_timestamp[l + 1]:
+                status[m] = 1
+                start = min(start, time[m])
+                finish = max(finish, time[m])
+    return status, start, finish
+
+
+# test of label_mode and mode_window ---------------------------------------------------------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_label_mode(seed):
+    rng = np.random.default_rng(seed)
+    gps_timestamp = np.sort(rng.uniform(0, 100, 300))
+    time = gps_timestamp + 1656934523
+    offboard_timestamp = np.sort(rng.uniform(20, 80, 40))
+    if seed == 4:  # messages out of order
+        offboard_timestamp = rng.permutation(offboard_timestamp)
+    (status, start, finish) = label_mode_nested_loop(gps_timestamp, offboard_timestamp, time)
+    assert label_mode(gps_timestamp, offboard_timestamp).tolist() == status
+    assert mode_window(time, label_mode(gps_timestamp, offboard_timestamp)) == (start, finish)
+
+
+def test_label_mode_edge_cases():
+    assert label_mode([1, 2, 3], []).tolist() == [0, 0, 0]
+    assert label_mode([1, 2, 3], [2]).tolist() == [0, 0, 0]
+    assert label_mode([1, 2, 3], [2, 3]).tolist() == [0, 1, 1]
+    assert mode_window([10, 11, 12], [0, 0, 0]) == (math.inf, -math.inf)
+    # the mode is left between 2 and 10
+    assert label_mode([1.5, 5, 10.5], [1, 2, 10, 11], max_gap=1).tolist() == [1, 0, 1]
@@ -0,0 +1,34 @@
+import numpy as np
+import pymap3d as pm
+import pytest
+from geodetic import GeodeticConverter
+
+REFERENCE = (52.816522986211055, -4.1271978280723225, 6)
+
+# test of GeodeticConverter against pymap3d --------------------------------------------------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize("reference", [REFERENCE, (-33.9, 151.2, 40), (78.2, 15.6, 0)])
+def test_geodetic2ned(reference):
+    rng = np.random.default_rng(0)
+    lat = reference[0] + rng.uniform(-0.05, 0.05, 200)
+    lon = reference[1] + rng.uniform(-0.05, 0.05, 200)
+    alt = reference[2] + rng.uniform(-10, 200, 200)
+    converter = GeodeticConverter(*reference)
+    expected = np.array(pm.geodetic2ned(lat, lon, alt, *reference))
+    assert np.allclose(converter.geodetic2ned(lat, lon, alt), expected, rtol=0, atol=1e-6)
+    scalar = [converter.geodetic2ned_scalar(*sample) for sample in zip(lat.tolist(), lon.tolist(), alt.tolist())]
+    assert np.allclose(np.array(scalar).T, expected, rtol=0, atol=1e-6)
+    assert np.allclose(converter.geodetic2ned(lat.reshape(20, 10), lon.reshape(20, 10), alt.reshape(20, 10)), expected.reshape(3, 20, 10), rtol=0, atol=1e-6)
+
+
+def test_ned2geodetic():
+    rng = np.random.default_rng(1)
+    (north, east, down) = rng.uniform(-2000, 2000, (3, 200))
+    converter = GeodeticConverter(*REFERENCE)
+    (lat, lon, alt) = converter.ned2geodetic(north, east, down)
+    (expected_lat, expected_lon, expected_alt) = pm.ned2geodetic(north, east, down, *REFERENCE)
+    assert np.allclose(lat, expected_lat, rtol=0, atol=1e-10)
+    assert np.allclose(lon, expected_lon, rtol=0, atol=1e-10)
+    assert np.allclose(alt, expected_alt, rtol=0, atol=1e-6)
+    assert np.allclose(converter.ned2geodetic(10, 5, -3), pm.ned2geodetic(10, 5, -3, *REFERENCE), rtol=0, atol=1e-9)
@@ -1,11 +1,13 @@
 from helix_framework.gtools import (
     alt_calc,
+    close_pairs,
     proximity_check,
 )  # importing the module we want to test its function (the test file should be in the same directory as module file)
 import pytest
 import numpy as np
 from helix_framework.data_structures import AgentTelemetry
 from math import sqrt
+import time
 
 # test of alt_dict function ------------------------------------------------------------------------------------------------------------------------------------
 
@@ -241,3 +243,76 @@ def test_proximity_check(positions, min_proximity, output):
         value[2] = round(value[2], 3)
 
     assert Function_output == output
+
+
+def test_proximity_check_500_agents():
+    # 500 agents in a 100 m cube, compared with the previous double loop
+    rng = np.random.default_rng(0)
+    positions = rng.uniform(-50, 50, (500, 3))
+    swarm_telem = {}
+    for i in range(len(positions)):
+        agent = AgentTelemetry()
+        agent.position_ned = positions[i]
+        swarm_telem["S" + str(i + 1).zfill(3)] = agent
+
+    Function_output = proximity_check(swarm_telem, 5)
+
+    keys = list(swarm_telem.keys())
+    expected = []
+    for i in range(len(keys)):
+        for j in range(i + 1, len(keys)):
+            seperation = np.linalg.norm(positions[j] - positions[i])
+            if seperation < 5:
+                expected.append([keys[i], keys[j], seperation])
+    assert [value[:2] for value in Function_output] == [value[:2] for value in expected]
+    assert np.allclose([value[2] for value in Function_output], [value[2] for value in expected])
+
+    (first, second, seperation) = close_pairs(positions, 5, use_grid=True)
+    assert [[keys[i], keys[j]] for i, j in zip(first, second)] == [value[:2] for value in expected]
+
+
+def double_loop_proximity_check(swarm_telemetry, min_proximity):
+    # the previous proximity_check, compared in test_proximity_check_scaling
+    swarm_positions = {}
+    output = []
+    for key in swarm_telemetry.keys():
+        swarm_positions[key] = np.array(swarm_telemetry[key].position_ned)
+
+    for key_1 in swarm_positions.keys():
+        for key_2 in swarm_positions.keys():
+            if key_1 == key_2:
+                continue
+            seperation = np.linalg.norm(swarm_positions[key_2] - swarm_positions[key_1])
+            if seperation < min_proximity and [key_2, key_1, seperation] not in output:
+                output.append([key_1, key_2, seperation])
+
+    return output
+
+
+@pytest.mark.benchmark
+def test_proximity_check_scaling():
+    # the duration of proximity_check relative to the double loop at 100, 250 and 500 agents in a 100 m cube,
+    # the fastest of 5 runs of proximity_check is timed, the double loop is long enough to be timed once
+    rng = np.random.default_rng(0)
+    speed_up = {}
+    for agent_num in [100, 250, 500]:
+        swarm_telem = {}
+        for i, position in enumerate(rng.uniform(-50, 50, (agent_num, 3))):
+            agent = AgentTelemetry()
+            agent.position_ned = position
+            swarm_telem["S" + str(i + 1).zfill(3)] = agent
+
+        start = time.perf_counter()
+        expected = double_loop_proximity_check(swarm_telem, 5)
+        double_loop_duration = time.perf_counter() - start
+        durations = []
+        for k in range(5):
+            start = time.perf_counter()
+            Function_output = proximity_check(swarm_telem, 5)
+            durations.append(time.perf_counter() - start)
+        assert [value[:2] for value in Function_output] == [value[:2] for value in expected]
+        speed_up[agent_num] = double_loop_duration / min(durations)
+
+    # about 80, 100 and 280 times faster when measured
+    assert all(value > 10 for value in speed_up.values())
+    assert speed_up[500] > speed_up[100]
@@ -0,0 +1,38 @@
+import math
+import os
+from parameter_sweep import RESULT_NAMES, grid_combinations, random_combinations, sweep
+from simulation import simulate
+
+EXPERIMENTS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "helix_framework", "experiments"
+)
+
+# test of sweep ------------------------------------------------------------------------------------------------------------------------------------------------
+
+
+def test_combinations():
+    assert grid_combinations({"k_migration": [1, 2], "r_conflict": [5]}) == [
+        {"k_migration": 1, "r_conflict": 5},
+        {"k_migration": 2, "r_conflict": 5},
+    ]
+    combinations = random_combinations({"k_seperation": [1, 3]}, 10)
+    assert len(combinations) == 10
+    assert all(1 <= gains["k_seperation"] <= 3 for gains in combinations)
+
+
+def test_sweep(tmp_path):
+    experiment_file_path = os.path.join(EXPERIMENTS_DIR, "divergence_S_to_N_NZ.json")
+    combinations = grid_combinations({"k_seperation": [0, 4], "r_conflict": [3, 6]})
+    output_CSV_file_dir = str(tmp_path / "sweep.csv")
+    output = sweep(experiment_file_path, combinations, 6, simulation_time=20, output_CSV_file_dir=output_CSV_file_dir, processes=2)
+
+    assert len(output) == 4
+    for gains, row in zip(combinations, output):
+        result = simulate(experiment_file_path, 6, simulation_time=20, gains=gains)
+        assert row[:2] == [gains["k_seperation"], gains["r_conflict"]]
+        assert row[2] == result.min_separation
+        assert math.isnan(row[4])  # no drone completes its path in 20 s
+    with open(output_CSV_file_dir) as f:
+        lines = f.read().splitlines()
+    assert lines[0].split(",") == ["k_seperation", "r_conflict"] + RESULT_NAMES
+    assert len(lines) == 5
@@ -0,0 +1,44 @@
+import types
+import publish_rate
+from data_structures import AgentTelemetry, SwarmTelemetry
+from publish_rate import ProximityRate
+
+
+def make_swarm(positions):
+    swarm_telem = SwarmTelemetry()
+    for n, position in enumerate(positions):
+        telemetry = AgentTelemetry()
+        telemetry.position_ned = position
+        swarm_telem["S00" + str(n + 1)] = telemetry
+    return swarm_telem
+
+
+# test of ProximityRate -------------------------------------------------------------------------------------------------------------------------------------
+
+
+def test_close_agent():
+    swarm_telem = make_swarm([[0, 0, -10], [20, 0, -10], [0, 40, -10]])
+    rate = ProximityRate("S001", swarm_telem, proximity_factor=3)
+    assert rate.close_agent()  # every update is published until r_conflict is set
+    rate.r_conflict = 5
+    assert not rate.close_agent()
+    swarm_telem["S002"].position_ned = [15, 0, -10]
+    assert rate.close_agent()
+
+
+def test_due(monkeypatch):
+    clock = types.SimpleNamespace(now=0.0)
+    monkeypatch.setattr(publish_rate, "time", types.SimpleNamespace(monotonic=lambda: clock.now))
+    swarm_telem = make_swarm([[0, 0, -10], [100, 0, -10]])
+    rate = ProximityRate("S001", swarm_telem, base_rate=0, heartbeat=0.05)
+    rate.r_conflict = 5
+    # without a close agent only the heartbeat is published
+    assert [rate.due("position") for k in range(10)] == [True] + [False] * 9
+    assert rate.due("velocity")  # each topic has its own heartbeat
+    clock.now += 0.06
+    assert rate.due("position")
+    assert rate.skipped == 9
+
+    swarm_telem["S002"].position_ned = [10, 0, -10]
+    assert all(rate.due("position") for k in range(10))
+    assert rate.published == 13
@@ -0,0 +1,67 @@
+import asyncio
+import pytest
+import rate_scheduler
+from rate_scheduler import FixedRateScheduler
+
+
+class FakeClock:
+    # stands in for time.monotonic and asyncio.sleep, so the timing does not depend on the load of the machine
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_scheduler, "time", clock)
+    monkeypatch.setattr(rate_scheduler, "asyncio", clock)
+    return clock
+
+
+async def run_loop(scheduler, clock, compute_times):
+    # runs a tick for each compute time, returns the start times of the ticks
+    starts = []
+    scheduler.start()
+    for compute_time in compute_times:
+        starts.append(clock.now)
+        clock.now += compute_time
+        await scheduler.wait()
+    return starts
+
+
+# test of FixedRateScheduler --------------------------------------------------------------------------------------------------------------------------------
+
+
+def test_fixed_rate(clock):
+    scheduler = FixedRateScheduler(0.02)
+    starts = asyncio.run(run_loop(scheduler, clock, [0.005] * 50))
+    # the deadlines are absolute, so the compute time does not make the loop drift
+    assert starts[-1] - starts[0] == pytest.approx(49 * 0.02)
+    statistics = scheduler.statistics()
+    assert statistics["ticks"] == 50
+    assert statistics["overruns"] == 0
+    assert statistics["compute_time_mean"] == pytest.approx(0.005)
+    assert statistics["jitter_max"] == pytest.approx(0)
+    assert sum(statistics["compute_histogram"]["counts"]) == 50
+    assert sum(statistics["jitter_histogram"]["counts"]) == 50
+
+
+def test_overrun(clock):
+    scheduler = FixedRateScheduler(0.02)
+    starts = asyncio.run(run_loop(scheduler, clock, [0.005, 0.05, 0.005, 0.005]))
+    statistics = scheduler.statistics()
+    assert statistics["overruns"] == 1
+    assert statistics["missed_deadlines"] == 1  # the tick of 50 ms ran over two deadlines
+    assert statistics["compute_histogram"]["counts"][-1] == 1  # more than two periods
+    # the tick after the overrun starts at once and the loop keeps its phase
+    assert starts[2] - starts[1] == pytest.approx(0.05)
+    assert starts[3] - starts[0] == pytest.approx(4 * 0.02)
+
+    scheduler.reset_statistics()
+    assert scheduler.statistics()["ticks"] == 0
@@ -0,0 +1,42 @@
+import os
+import time
+import numpy as np
+import pytest
+from simulation import simulate
+
+EXPERIMENTS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "helix_framework", "experiments"
+)
+
+# test of simulate ---------------------------------------------------------------------------------------------------------------------------------------------
+
+
+def test_simulate_10_drones_300_s():
+    experiment_file_path = os.path.join(EXPERIMENTS_DIR, "divergence_S_to_N_NZ.json")
+    simulate(experiment_file_path, 10, simulation_time=1)  # compiling the corridor cache
+    result = simulate(experiment_file_path, 10, simulation_time=300, dt=0.1)
+
+    assert result.positions.shape == (3001, 10, 3)
+    assert result.lane_error.shape == (3001, 10)
+    assert result.time[0] == 0.1 and result.time[-1] == 300.1
+    assert 0 < result.min_separation == np.min(result.swarm_experiment.min_distance)
+    assert len(result.switch_events) == sum(len(p) for p in result.swarm_experiment.switched_positions)
+    assert np.all(np.isfinite(result.completion_time))
+
+    # the simulation is deterministic
+    repeated = simulate(experiment_file_path, 10, simulation_time=300, dt=0.1)
+    assert np.array_equal(repeated.positions, result.positions)
+    assert repeated.switch_events[0][:4] == result.switch_events[0][:4]
+
+
+@pytest.mark.benchmark
+def test_simulate_speed():
+    # the best of 3 runs is timed, so other processes of the machine dont fail the test
+    experiment_file_path = os.path.join(EXPERIMENTS_DIR, "divergence_S_to_N_NZ.json")
+    simulate(experiment_file_path, 10, simulation_time=1)
+    times = []
+    for k in range(3):
+        start = time.perf_counter()
+        simulate(experiment_file_path, 10, simulation_time=300, dt=0.1)
+        times.append(time.perf_counter() - start)
+    assert min(times) < 0.75
@@ -0,0 +1,126 @@
+import socket
+import subprocess
+import sys
+import threading
+import time
+from sitl_launcher import SitlLauncher, tcp_port_open
+
+# stands in for a mavsdk_server: listens on its UDP port at once and on its gRPC port after a delay
+FAKE_SERVER = """
+import socket, sys, time
+(grpc_port, udp_port, delay) = (int(sys.argv[1]), int(sys.argv[2]), float(sys.argv[3]))
+udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+udp.bind(("", udp_port))
+time.sleep(delay)
+grpc = socket.socket()
+grpc.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+grpc.bind(("localhost", grpc_port))
+grpc.listen()
+time.sleep(60)
+"""
+
+
+def udp_port_bound(port):
+    # True if a process already uses the UDP port, only to find free ports for the tests
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as udp:
+        try:
+            udp.bind(("", port))
+        except OSError:
+            return True
+    return False
+
+
+def free_ports(n):
+    # a base port whose n TCP and UDP ports are free
+    for base in range(42000, 60000, 97):
+        if not any(tcp_port_open(base + i) or udp_port_bound(base + i) or udp_port_bound(base + 1000 + i) for i in range(n)):
+            return base
+    raise RuntimeError("no free ports")
+
+
+class FakeLauncher(SitlLauncher):
+    def __init__(self, delays, **kwargs):
+        super().__init__(len(delays), **kwargs)
+        self.delays = delays
+        self.started = []
+
+    def start_mavsdk_server(self, i):
+        return subprocess.Popen([sys.executable, "-c", FAKE_SERVER, str(self.grpc_base_port + i), str(self.udp_base_port + i), str(self.delays[i])], start_new_session=True)
+
+    def start_script(self, i):
+        self.started.append((i, time.monotonic()))
+        return subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"], start_new_session=True)
+
+
+# test of port probes and SitlLauncher ---------------------------------------------------------------------------------------------------------------------
+
+
+def test_port_probes():
+    with socket.socket() as server:
+        server.bind(("localhost", 0))
+        port = server.getsockname()[1]
+        assert not tcp_port_open(port)
+        server.listen()
+        assert tcp_port_open(port)
+
+
+def test_is_ready_does_not_bind_udp():
+    # a server is ready once its gRPC port accepts connections, its UDP port is left to the server
+    base = free_ports(1)
+    launcher = SitlLauncher(1, grpc_base_port=base, udp_base_port=base + 1000)
+    assert not launcher.is_ready(0)
+    with socket.socket() as grpc:
+        grpc.bind(("localhost", base))
+        grpc.listen()
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as udp:
+            udp.bind(("", base + 1000))
+            assert launcher.is_ready(0)
+        assert launcher.is_ready(0)  # the UDP port of a server is not probed
+
+
+def test_launch_order():
+    base = free_ports(3)
+    launcher = FakeLauncher([1.5, 0, 0.5], timeout=20, grpc_base_port=base, udp_base_port=base + 1000)
+    try:
+        assert launcher.launch() == []
+        # each script starts as soon as its own server is ready, not after the slowest one
+        assert [i for i, t in launcher.started] == [1, 2, 0]
+        assert all(process.poll() is None for process in launcher.script_process.values())
+    finally:
+        processes = launcher.mavsdk_process + list(launcher.script_process.values())
+        launcher.stop()
+    for process in processes:
+        process.wait(5)
+
+
+def test_launch_timeout():
+    base = free_ports(2)
+    launcher = FakeLauncher([0, 30], timeout=1.5, grpc_base_port=base, udp_base_port=base + 1000)
+    try:
+        assert launcher.launch() == [1]
+        assert [i for i, t in launcher.started] == [0]
+        # only the script of the drone whose backend was ready is restarted
+        first = launcher.script_process[0]
+        launcher.restart_scripts()
+        assert [i for i, t in launcher.started] == [0, 0]
+        assert list(launcher.script_process) == [0]
+        assert first.wait(5) is not None
+    finally:
+        launcher.stop()
+
+
+def test_stop_during_launch():
+    # stop is called from another thread, as in sitl_gui.py
+    base = free_ports(2)
+    launcher = FakeLauncher([0, 30], timeout=20, grpc_base_port=base, udp_base_port=base + 1000)
+    thread = threading.Thread(target=launcher.launch)
+    thread.start()
+    while not launcher.started and thread.is_alive():
+        time.sleep(0.05)
+    processes = launcher.mavsdk_process + list(launcher.script_process.values())
+    launcher.stop()
+    thread.join(10)
+    assert not thread.is_alive()
+    assert launcher.script_process == {} and launcher.mavsdk_process == []
+    for process in processes:
+        assert process.wait(5) is not None
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from spatial_index import NeighbourGrid, SegmentTree
+
+# test of NeighbourGrid.neighbours ------------------------------------------------------------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize(
+    "cell_size, new_cell_size",
+    [
+        (5, 5),  # Set1: cell size equal to the query radius
+        (2, 5),  # Set2: grid rebuilt with a bigger cell size
+        (5, 7.5),  # Set3: grid rebuilt with a non integer cell size
+    ],
+)
+def test_neighbours(cell_size, new_cell_size):
+    rng = np.random.default_rng(0)
+    positions = rng.uniform(-30, 30, size=(200, 3))
+    grid = NeighbourGrid(cell_size)
+    for i, position in enumerate(positions):
+        grid.update("S" + str(i).zfill(3), list(position))
+    # moving some agents to other cells
+    for i in range(0, 200, 3):
+        positions[i] = rng.uniform(-30, 30, size=3)
+        grid.update("S" + str(i).zfill(3), list(positions[i]))
+    grid.set_cell_size(new_cell_size)
+
+    for position in positions[:20]:
+        neighbours = set(grid.neighbours(position))
+        distances = np.linalg.norm(positions - position, axis=1)
+        for i in np.flatnonzero(distances <= new_cell_size):
+            assert "S" + str(i).zfill(3) in neighbours
+
+
+def test_remove():
+    grid = NeighbourGrid(5)
+    grid.update("S001", [0, 0, 0])
+    grid.update("S002", [1, 1, 1])
+    grid.remove("S001")
+    assert grid.neighbours([0, 0, 0]) == ["S002"]
+
+
+# test of SegmentTree.nearest ---------------------------------------------------------------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize("closed", [True, False])
+def test_segment_tree(closed):
+    rng = np.random.default_rng(1)
+    angles = np.linspace(0, 2 * np.pi, 101)[:-1]
+    points = np.stack([50 * np.cos(angles), 50 * np.sin(angles), -20 + 5 * np.sin(3 * angles)], axis=1)
+    tree = SegmentTree(points, closed)
+    ends = np.roll(points, -1, axis=0) if closed else points[1:]
+    starts = points if closed else points[:-1]
+    lengths = np.linalg.norm(ends - starts, axis=1)
+    for position in rng.uniform(-70, 70, size=(200, 3)):
+        (segment, arc_length, distance) = tree.nearest(position)
+        # comparing with every segment
+        t = np.clip(np.sum((position - starts) * (ends - starts), axis=1) / lengths**2, 0, 1)
+        distances = np.linalg.norm(starts + t[:, None] * (ends - starts) - position, axis=1)
+        assert distance == pytest.approx(distances.min())
+        assert distances[segment] == pytest.approx(distances.min())
+        assert arc_length == pytest.approx(np.sum(lengths[:segment]) + t[segment] * lengths[segment])
@@ -0,0 +1,55 @@
+import os
+import numpy as np
+from data_structures import AgentTelemetry, SwarmTelemetry
+from experiment import Experiment
+from stage_profiler import STAGES, StageProfiler
+
+EXPERIMENTS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "helix_framework", "experiments"
+)
+
+
+# test of StageProfiler -------------------------------------------------------------------------------------------------------------------------------------
+
+
+def test_percentiles():
+    profiler = StageProfiler(stages=["a", "b"], window=100, sample_every=1)
+    for k in range(150):
+        # stage a takes k micro seconds, stage b 1 micro second
+        profiler.marks = [0.0, k * 1e-6, (k + 1) * 1e-6]
+        profiler.finish()
+    summary = profiler.summary()
+    assert summary["calls"] == 150
+    # only the last 100 calls are kept
+    assert np.isclose(summary["a"]["p50"], np.percentile(range(50, 150), 50))
+    assert np.isclose(summary["a"]["max"], 149)
+    assert np.isclose(summary["b"]["p99"], 1)
+    assert np.isclose(summary["total"]["max"], 150)
+
+
+def test_sample():
+    profiler = StageProfiler(sample_every=4)
+    assert [profiler.sample() for k in range(8)] == [True, False, False, False] * 2
+    assert StageProfiler().summary() == {"calls": 0, "sample_every": 4}
+
+
+def test_path_following_profile():
+    swarm_telem = SwarmTelemetry()
+    for n in range(3):
+        telemetry = AgentTelemetry()
+        telemetry.position_ned = [3.0 * n, 0, -10]
+        swarm_telem["S00" + str(n + 1)] = telemetry
+    experiment = Experiment("S001", swarm_telem, os.path.join(EXPERIMENTS_DIR, "Four_way_switching_roundabout.json"))
+    experiment.get_path_and_permission(experiment.get_swarm_priorities(swarm_telem))
+    experiment.initial_nearest_point(swarm_telem)
+    without_profiler = experiment.path_following(swarm_telem, 5, 0.1, 10)
+
+    experiment.profiler = StageProfiler(sample_every=2)
+    for k in range(10):
+        output = experiment.path_following(swarm_telem, 5, 0.1, 10)
+    assert output == without_profiler
+    summary = experiment.profiler.summary()
+    assert summary["calls"] == 5
+    for stage in STAGES:
+        assert 0 <= summary[stage]["p50"] <= summary[stage]["max"]
+    assert summary["total"]["max"] >= max(summary[stage]["max"] for stage in STAGES)
@@ -0,0 +1,68 @@
+import os
+import numpy as np
+import pytest
+from experiment import Experiment
+from swarm_experiment import SwarmExperiment
+from data_structures import AgentTelemetry
+
+EXPERIMENTS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "helix_framework", "experiments"
+)
+
+# test of SwarmExperiment.path_following against Experiment.path_following -------------------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize(
+    "experiment_name, drone_num",
+    [
+        ("Circle_S_to_N_NZ", 8),  # Set1: repeating circle
+        ("Two_way_Roundabout_S_to_N_NZ", 8),  # Set2: switching between paths
+        ("divergence_S_to_N_NZ", 6),  # Set3: switching and stopping at the last point
+        ("Same_level_vertiport", 8),  # Set4: staying at the last point with start delays, some of which end during the test
+    ],
+)
+def test_swarm_path_following(experiment_name, drone_num):
+    experiment_file_path = os.path.join(EXPERIMENTS_DIR, experiment_name + ".json")
+    dt = 0.1
+    ids = ["S" + str(i + 1).zfill(3) for i in range(drone_num)]
+    swarm_telem = {id: AgentTelemetry() for id in ids}
+    experiments = {id: Experiment(id, swarm_telem, experiment_file_path) for id in ids}
+    for id in ids:
+        swarm_priorities = experiments[id].get_swarm_priorities(swarm_telem)
+        swarm_telem[id].position_ned = experiments[id].get_pre_start_positions(swarm_telem, swarm_priorities)[id]
+    for id in ids:
+        experiments[id].get_path_and_permission(experiments[id].get_swarm_priorities(swarm_telem))
+
+    swarm_experiment = SwarmExperiment(ids, experiment_file_path)
+    positions = swarm_experiment.get_pre_start_positions()
+
+    for step in range(300):
+        current_time = int((step + 1) * dt * 1000000)  # micro seconds since the start, so the start delays end
+        velocities = []
+        for id in ids:
+            swarm_telem[id].current_time = current_time
+            velocity = experiments[id].path_following(swarm_telem, 5, dt, 5)
+            velocities.append([velocity.north_m_s, velocity.east_m_s, velocity.down_m_s])
+        velocities = np.array(velocities)
+        swarm_velocities = swarm_experiment.path_following(positions, 5, current_time)
+
+        np.testing.assert_allclose(swarm_velocities, velocities, atol=1e-9)
+        assert list(swarm_experiment.current_path) == [experiments[id].current_path for id in ids]
+        assert list(swarm_experiment.current_index) == [experiments[id].current_index for id in ids]
+
+        for n, id in enumerate(ids):
+            swarm_telem[id].position_ned = np.array(swarm_telem[id].position_ned) + velocities[n] * dt
+        positions = positions + swarm_velocities * dt
+
+
+def test_pre_start_positions_fallback():
+    # with 4 pre start positions for 6 drones, the last 2 drones start from their current positions
+    experiment_file_path = os.path.join(EXPERIMENTS_DIR, "Circle_S_to_N_NZ.json")
+    ids = ["S" + str(i + 1).zfill(3) for i in range(6)]
+    swarm_experiment = SwarmExperiment(ids, experiment_file_path)
+    swarm_experiment.experiment.pre_start_positions = swarm_experiment.experiment.pre_start_positions[:4]
+    current_positions = np.arange(18, dtype="float64").reshape(6, 3)
+    positions = swarm_experiment.get_pre_start_positions(current_positions)
+    np.testing.assert_array_equal(positions[:4], swarm_experiment.experiment.pre_start_positions)
+    np.testing.assert_array_equal(positions[4:], current_positions[4:])
+    np.testing.assert_array_equal(swarm_experiment.get_pre_start_positions()[4:], 0)
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+from telemetry_inbox import TelemetryInbox
+
+
+def run_in_thread(function):
+    # stands in for the network thread of paho
+    thread = threading.Thread(target=function)
+    thread.start()
+    thread.join()
+
+
+# test of TelemetryInbox ------------------------------------------------------------------------------------------------------------------------------------
+
+
+def test_latest_value_wins():
+    asyncio.run(check_latest_value_wins())
+
+
+async def check_latest_value_wins():
+    inbox = TelemetryInbox()
+    inbox.bind(asyncio.get_running_loop())
+    applied = []
+    loop_thread = threading.get_ident()
+    wakeups = []
+    wakeup = inbox.wakeup
+    inbox.wakeup = lambda: wakeups.append(1) or wakeup()
+
+    def receive():
+        for k in range(1000):
+            inbox.put("S001/telemetry/position_ned", lambda k: applied.append((threading.get_ident(), "S001", k)), k)
+            inbox.put("S002/telemetry/position_ned", lambda k: applied.append((threading.get_ident(), "S002", k)), k)
+
+    run_in_thread(receive)
+    await asyncio.sleep(0)
+    # one wakeup of the loop for the whole batch, only the latest value of each topic is applied on the loop
+    assert len(wakeups) == 1
+    assert applied == [(loop_thread, "S001", 999), (loop_thread, "S002", 999)]
+    assert inbox.coalesced == 1998
+    assert inbox.pending == {}
+
+
+def test_ticks():
+    asyncio.run(check_ticks())
+
+
+async def check_ticks():
+    inbox = TelemetryInbox()
+    applied = []
+    run_in_thread(lambda: inbox.call(applied.append, "detection S003"))
+    inbox.bind(asyncio.get_running_loop())
+    await asyncio.sleep(0)
+    assert applied == ["detection S003"]  # received before the loop was bound
+
+    inbox.start_ticks()
+    run_in_thread(lambda: inbox.put("S003/telemetry/velocity_ned", applied.append, "velocity"))
+    run_in_thread(lambda: inbox.call(applied.append, "detection S004"))
+    await asyncio.sleep(0)
+    # events are not held back, telemetry waits for the next tick
+    assert applied == ["detection S003", "detection S004"]
+    assert inbox.apply() == 1
+    assert applied[-1] == "velocity"
+    assert inbox.latency >= 0
+
+    run_in_thread(lambda: inbox.put("S003/telemetry/velocity_ned", applied.append, "last velocity"))
+    inbox.stop_ticks()
+    await asyncio.sleep(0)
+    assert applied[-1] == "last velocity"
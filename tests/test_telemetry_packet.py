@@ -0,0 +1,32 @@
+from data_structures import AgentTelemetry
+from telemetry import SwarmManager
+from telemetry_packet import PACKET, TelemetryDecoder, pack_telemetry
+
+# test of pack_telemetry and TelemetryDecoder.decode -----------------------------------------------------------------------------------------------------------
+
+
+def test_pack_and_decode():
+    telemetry = AgentTelemetry()
+    telemetry.current_time = 1656934523123456
+    telemetry.geodetic = (52.817008335016816, -4.128502426303207, 18.5)
+    telemetry.position_ned = (12.25, -3.5, -20.125)
+    telemetry.velocity_ned = (1.5, 0.25, -0.125)
+    telemetry.heading = 93.75
+    telemetry.flight_mode = "OFFBOARD"
+    telemetry.arm_status = True
+    payload = pack_telemetry("S001", telemetry)
+    assert len(payload) == PACKET.size
+
+    swarm_manager = SwarmManager()
+    swarm_manager.telemetry["S001"] = AgentTelemetry()
+    decoder = TelemetryDecoder(swarm_manager)
+    assert decoder.decode(payload) == "S001"
+    received = swarm_manager.telemetry["S001"]
+    assert received.current_time == telemetry.current_time
+    assert list(received.geodetic) == list(telemetry.geodetic)
+    assert list(received.position_ned) == list(telemetry.position_ned)
+    assert list(received.velocity_ned) == list(telemetry.velocity_ned)
+    assert received.heading == 93.75
+    assert received.flight_mode == "OFFBOARD"
+    assert received.arm_status is True
+    assert swarm_manager.neighbour_grid.neighbours(telemetry.position_ned) == ["S001"]
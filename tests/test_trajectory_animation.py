@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("plotly")  # optional, only needed by the visualisers
+from trajectory_animation import build_animation, decimate, simplify_polyline
+
+
+# test of decimate and simplify_polyline --------------------------------------------------------------------------------------------------------------------
+
+
+def test_decimate():
+    assert decimate(5, 10).tolist() == [0, 1, 2, 3, 4]
+    indices = decimate(3001, 300)
+    assert len(indices) == 300
+    assert indices[0] == 0 and indices[-1] == 3000
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_simplify_polyline():
+    line = np.column_stack([np.arange(100.0), 2 * np.arange(100.0), np.zeros(100)])
+    assert simplify_polyline(line, 0.01).tolist() == [0, 99]
+    corner = np.concatenate([line[:50], line[49] + np.column_stack([np.zeros(50), np.zeros(50), np.arange(1.0, 51)])])
+    assert simplify_polyline(corner, 0.01).tolist() == [0, 49, 99]
+
+
+def test_simplify_polyline_tolerance():
+    t = np.linspace(0, 2 * np.pi, 2000)
+    circle = np.column_stack([10 * np.cos(t), 10 * np.sin(t), t])
+    kept = simplify_polyline(circle, 0.1)
+    assert len(kept) < 200
+    # every removed point is within the tolerance of the simplified polyline
+    for first, last in zip(kept[:-1], kept[1:]):
+        segment = circle[last] - circle[first]
+        relative = circle[first:last + 1] - circle[first]
+        s = np.clip(relative @ segment / np.dot(segment, segment), 0, 1)
+        assert np.linalg.norm(relative - s[:, None] * segment, axis=1).max() <= 0.1
+
+
+# test of build_animation -----------------------------------------------------------------------------------------------------------------------------------
+
+
+def test_build_animation():
+    time = 0.1 * np.arange(3001)
+    positions = np.zeros((3001, 2, 3))
+    positions[:, 0, 0] = time
+    positions[:, 1, 1] = np.sin(time)
+    fig = build_animation(time, positions, ["S001", "S002"], ["blue", "red"], max_frames=300)
+    assert len(fig.frames) == 300
+    assert [trace.name for trace in fig.data] == ["S001", "S002", "trace of S001", "trace of S002"]
+    assert len(fig.data[2].x) == 2  # a straight line
+    assert len(fig.data[3].x) < 3001
+    last = fig.frames[-1]
+    assert last.name == "300.0" and list(last.traces) == [0, 1]
+    assert last.data[1].y[0] == np.sin(300.0)
+    assert len(fig.layout.sliders[0].steps) == 300
+    # the time between the kept frames is played in real time
+    assert abs(fig.layout.updatemenus[0].buttons[0].args[1]["frame"]["duration"] - 1000 * 300 / 299) < 1e-6
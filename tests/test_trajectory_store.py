@@ -0,0 +1,58 @@
+import numpy as np
+from trajectory_store import CSV_HEADER, Trajectory, read_folder, read_trajectories, resample, write_csv, write_trajectories
+
+
+def create_trajectories():
+    rng = np.random.default_rng(0)
+    return [
+        Trajectory("S001", np.arange(50) * 0.1, rng.uniform(-10, 10, (50, 3)), None, "Python_simulation"),
+        Trajectory("P101", np.arange(30) * 0.2, rng.uniform(-10, 10, (30, 3)), rng.integers(0, 2, 30), "real"),
+    ]
+
+
+def assert_same(trajectories, output):
+    assert list(output.keys()) == [trajectory.drone_id for trajectory in trajectories]
+    for trajectory in trajectories:
+        assert np.array_equal(output[trajectory.drone_id].time, trajectory.time)
+        assert np.array_equal(output[trajectory.drone_id].position, trajectory.position)
+        assert np.array_equal(output[trajectory.drone_id].offboard_mode_status, trajectory.offboard_mode_status)
+        assert output[trajectory.drone_id].experiment_type == trajectory.experiment_type
+
+
+# test of write_trajectories, read_trajectories and the csv conversion -----------------------------------------------------------------------------------------
+
+
+def test_npz_round_trip(tmp_path):
+    trajectories = create_trajectories()
+    write_trajectories(str(tmp_path / "flight.npz"), trajectories)
+    assert_same(trajectories, read_trajectories(str(tmp_path / "flight.npz")))
+
+
+def test_csv_round_trip(tmp_path):
+    trajectories = create_trajectories()
+    write_csv(str(tmp_path / "flight.csv"), trajectories)
+    with open(tmp_path / "flight.csv") as f:
+        assert f.readline().strip() == ",".join(CSV_HEADER)
+    assert_same(trajectories, read_trajectories(str(tmp_path / "flight.csv")))
+
+
+def test_read_folder(tmp_path):
+    trajectories = create_trajectories()
+    write_trajectories(str(tmp_path / "a.npz"), trajectories[:1])
+    write_csv(str(tmp_path / "b.csv"), trajectories[1:])
+    assert [trajectory.drone_id for trajectory in read_folder(str(tmp_path))] == ["S001", "P101"]
+
+
+# test of resample ---------------------------------------------------------------------------------------------------------------------------------------------
+
+
+def test_resample():
+    trajectories = create_trajectories()
+    (time, position) = resample(trajectories, 0.1)
+    assert position.shape == (len(time), 2, 3)
+    assert time[0] == 0 and np.isclose(time[-1], 4.9)  # until the end of the shorter flight
+    assert np.allclose(np.diff(time), 0.1)
+    for n, trajectory in enumerate(trajectories):
+        for axis in range(3):
+            assert np.allclose(position[:, n, axis], np.interp(time, trajectory.time, trajectory.position[:, axis]))
+    assert np.allclose(position[:, 0], trajectories[0].position)  # samples at the same times are kept
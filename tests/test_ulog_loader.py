@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("pyulog")  # optional, only needed by the post flight tools
+from ulog_loader import FlightLog, load_topics
+from ulog_helpers import GPS_FIELDS, OFFBOARD_FIELDS, write_ulog
+
+
+def create_flight(path):
+    gps_rows = [(1000000 * k, 1656934523000000 + 1000000 * k, 528170083 + k, -41285024 - k, 18500 + 10 * k) for k in range(10)]
+    offboard_rows = [(2500000, 1), (3500000, 1), (4500000, 1)]
+    write_ulog(path, {"vehicle_gps_position": (GPS_FIELDS, gps_rows), "offboard_control_mode": (OFFBOARD_FIELDS, offboard_rows)})
+
+
+# test of load_topics and FlightLog ----------------------------------------------------------------------------------------------------------------------------
+
+
+def test_load_topics(tmp_path):
+    path = str(tmp_path / "S001.ulg")
+    create_flight(path)
+    data = load_topics(path, {"vehicle_gps_position": ["lat"], "vehicle_status": None}, start_time=2, end_time=5)
+    assert list(data["vehicle_gps_position"]["timestamp"]) == [2000000, 3000000, 4000000, 5000000]
+    assert list(data["vehicle_gps_position"]["lat"]) == [528170085, 528170086, 528170087, 528170088]
+    assert sorted(data["vehicle_gps_position"].keys()) == ["lat", "timestamp"]
+    assert len(data["vehicle_status"]["timestamp"]) == 0
+
+
+def test_flight_log(tmp_path):
+    path = str(tmp_path / "S001.ulg")
+    create_flight(path)
+    flight = FlightLog(path)
+    assert np.allclose(flight.gps_timestamp, np.arange(10))
+    assert np.allclose(flight.time, 1656934523 + np.arange(10))
+    assert np.allclose(flight.latitude, (528170083 + np.arange(10)) / 10000000)
+    assert np.allclose(flight.longitude, (-41285024 - np.arange(10)) / 10000000)
+    assert np.allclose(flight.altitude, 18.5 + 0.01 * np.arange(10))
+    assert np.allclose(flight.offboard_timestamp, [2.5, 3.5, 4.5])
+
+
+def test_flight_log_without_utc_time(tmp_path):
+    path = str(tmp_path / "S001.ulg")
+    gps_fields = [field for field in GPS_FIELDS if field[1] != "time_utc_usec"]
+    gps_rows = [(1000000 * k, 528170083, -41285024, 18500) for k in range(5)]
+    write_ulog(path, {"vehicle_gps_position": (gps_fields, gps_rows)})
+    flight = FlightLog(path)
+    assert np.allclose(flight.time, np.arange(5))
+    assert len(flight.time) == len(flight.latitude)
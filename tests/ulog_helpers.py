@@ -0,0 +1,25 @@
+# minimal ulog files for the tests of the post flight tools, written without pyulog
+import struct
+
+GPS_FIELDS = [("uint64_t", "timestamp"), ("uint64_t", "time_utc_usec"), ("int32_t", "lat"), ("int32_t", "lon"), ("int32_t", "alt")]
+OFFBOARD_FIELDS = [("uint64_t", "timestamp"), ("uint8_t", "position")]
+STRUCT_TYPES = {"uint64_t": "Q", "int32_t": "i", "uint8_t": "B"}
+
+
+def write_ulog(path, topics):
+    # writes a minimal ulog file, topics is Dict{name: (List[(type, field)], List[row, ...])}
+    def message(msg_type, payload):
+        return struct.pack("<HB", len(payload), ord(msg_type)) + payload
+
+    content = b"ULog\x01\x12\x35\x01" + struct.pack("<Q", 0)
+    content += message("B", bytes(40))  # flag bits
+    for name, (fields, rows) in topics.items():
+        content += message("F", (name + ":" + "".join(t + " " + f + ";" for t, f in fields)).encode())
+    for msg_id, name in enumerate(topics):
+        content += message("A", struct.pack("<BH", 0, msg_id) + name.encode())
+    for msg_id, (fields, rows) in enumerate(topics.values()):
+        row_struct = struct.Struct("<" + "".join(STRUCT_TYPES[t] for t, f in fields))
+        for row in rows:
+            content += message("D", struct.pack("<H", msg_id) + row_struct.pack(*row))
+    with open(path, "wb") as f:
+        f.write(content)